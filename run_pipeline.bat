@@ -1,4 +1,3 @@
 @echo off
-python -m src.ingest
-python -m src.load_duckdb
+python -m src.cli run-all
 streamlit run src/app.py
\ No newline at end of file
@@ -1,14 +1,19 @@
 import streamlit as st
-import duckdb
+import sys
 from pathlib import Path
 import pandas as pd
 
-# Path to DuckDB database
-DUCKDB_PATH = Path("data/processed/hospitals.duckdb")
+# `streamlit run src/app.py` only puts src/ on sys.path; make the src package importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.config import DUCKDB_PATH
+from src.query_service import QueryService, ResultCache
+from src.search_index import code_lookup_sql, search_sql
+from src.summaries import COMPARE_VIEWS, compare_prices_sql
 
-# Connection function
-def get_connection():
-    return duckdb.connect(str(DUCKDB_PATH), read_only=True)
+# Shared query service: one pooled read-only connection and result cache per server process
+@st.cache_resource
+def get_query_service():
+    return QueryService(DUCKDB_PATH, cache=ResultCache(max_bytes=512 * 2**20, ttl_seconds=600))
 
 # Streamlit app
 st.set_page_config(page_title="Hospital Price Transparency Explorer", layout="wide")
@@ -16,38 +21,117 @@ st.set_page_config(page_title="Hospital Price Transparency Explorer", layout="wi
 st.title("🏥 Hospital Price Transparency Explorer")
 st.write("Run your own SQL queries on the unified hospital pricing database.")
 
-# SQL query input
-default_query = "SELECT * FROM hospital_charges LIMIT 150;"
-query = st.text_area("✍️ Enter your SQL query:", value=default_query, height=150)
+service = get_query_service()
 
-if st.button("Run Query"):
-    try:
-        with get_connection() as con:
-            df = con.execute(query).fetchdf()
-
-        if df.empty:
-            st.warning("⚠️ Query returned no results.")
-        else:
-            st.success(f"✅ Query executed successfully. Showing {len(df)} rows.")
-            st.dataframe(df, use_container_width=True)
-
-            # Option to download results
-            csv = df.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                label="⬇️ Download results as CSV",
-                data=csv,
-                file_name="query_results.csv",
-                mime="text/csv",
-            )
+with st.sidebar:
+    st.subheader("⚙️ Query settings")
+    page_size = st.selectbox("Rows per page", [100, 500, 1000, 5000], index=1)
+    timeout = st.slider("Query timeout (seconds)", min_value=5, max_value=300, value=30, step=5)
+    stats = service.cache.stats()
+    st.caption(f"Result cache: {stats['entries']} pages, {stats['bytes'] / 2**20:.1f} MB, "
+               f"{stats['hits']} hits / {stats['misses']} misses")
+
+tab_search, tab_compare, tab_sql = st.tabs(["🔎 Search procedures", "💲 Compare prices for a code",
+                                           "✍️ SQL query"])
+
+# Ranked code search over the search_* index tables (built by load_duckdb), then a code_1 lookup
+with tab_search:
+    terms = st.text_input("Procedure or code", placeholder="e.g. MRI brain w contrast").strip()
+    if terms:
+        try:
+            result = service.query_page(search_sql(terms), page_size=5000, timeout_seconds=timeout)
+            matches = result["table"].to_pandas()
+            if matches.empty:
+                st.warning(f"⚠️ No procedures match \"{terms}\".")
+            else:
+                source = "cache" if result["cached"] else f"{result['seconds'] * 1000:.0f} ms"
+                st.caption(f"{len(matches)} matching codes ({source}).")
+                st.dataframe(matches, use_container_width=True)
+                pick = st.selectbox("Show charges for", matches.index,
+                                    format_func=lambda i: f"{matches.at[i, 'code_1']} · {matches.at[i, 'description']}")
+                row = matches.loc[pick]
+                code_type = row["code_1_type"] if pd.notna(row["code_1_type"]) else None
+                charges = service.query_page(code_lookup_sql(row["code_1"], code_type),
+                                             page_size=page_size, timeout_seconds=timeout)
+                source = "cache" if charges["cached"] else f"{charges['seconds'] * 1000:.0f} ms"
+                st.caption(f"First {charges['table'].num_rows} charges for {row['code_1']} ({source}).")
+                st.dataframe(charges["table"].to_pandas(), use_container_width=True)
+        except TimeoutError as e:
+            st.error(f"⏱️ {e}")
+        except Exception as e:
+            st.error(f"❌ Error: {e} (run `python -m src.load_duckdb` to build the search index)")
+
+# Fast path: one code's pre-aggregated price statistics from price_summary (built by load_duckdb)
+with tab_compare:
+    code_col, view_col = st.columns([1, 2])
+    code = code_col.text_input("Billing code (code_1)", placeholder="e.g. 70551").strip()
+    view = view_col.radio("Compare by", list(COMPARE_VIEWS), horizontal=True)
+    if code:
+        try:
+            result = service.query_page(compare_prices_sql(code, COMPARE_VIEWS[view]), page_size=5000,
+                                        timeout_seconds=timeout)
+            df = result["table"].to_pandas()
+            if df.empty:
+                st.warning(f"⚠️ No prices found for code {code}.")
+            else:
+                source = "cache" if result["cached"] else f"{result['seconds'] * 1000:.0f} ms"
+                st.caption(f"{df['description'].iloc[0]} · {len(df)} rows ({source}).")
+                st.dataframe(df.drop(columns=["code_1", "description"]), use_container_width=True)
+        except Exception as e:
+            st.error(f"❌ Error: {e} (run `python -m src.load_duckdb` to build the price summaries)")
+
+with tab_sql:
+    # SQL query input
+    default_query = "SELECT * FROM hospital_charges LIMIT 150;"
+    query = st.text_area("✍️ Enter your SQL query:", value=default_query, height=150)
+
+    if st.button("Run Query"):
+        # remember the query so paging re-runs it without another click
+        st.session_state["active_query"] = query
+        st.session_state["page"] = 0
 
+    active_query = st.session_state.get("active_query")
+    if active_query:
+        page = st.session_state.get("page", 0)
+        try:
+            result = service.query_page(active_query, page=page, page_size=page_size, timeout_seconds=timeout)
+            df = result["table"].to_pandas()
+
+            if df.empty:
+                st.warning("⚠️ Query returned no results.")
+            else:
+                first_row = page * page_size + 1 if result["paged"] else 1
+                source = "cache" if result["cached"] else f"{result['seconds']:.2f}s"
+                st.success(f"✅ Query executed successfully. Showing rows {first_row}–{first_row + len(df) - 1} ({source}).")
+                st.dataframe(df, use_container_width=True)
+
+                if result["paged"]:
+                    prev_col, next_col, _ = st.columns([1, 1, 6])
+                    if prev_col.button("⬅️ Previous", disabled=page == 0):
+                        st.session_state["page"] = page - 1
+                        st.rerun()
+                    if next_col.button("Next ➡️", disabled=not result["has_more"]):
+                        st.session_state["page"] = page + 1
+                        st.rerun()
+
+                # Option to download results
+                csv = df.to_csv(index=False).encode("utf-8")
+                st.download_button(
+                    label="⬇️ Download this page as CSV",
+                    data=csv,
+                    file_name="query_results.csv",
+                    mime="text/csv",
+                )
+
+        except TimeoutError as e:
+            st.error(f"⏱️ {e} Add filters or raise the timeout in the sidebar.")
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
+
+    # Show available tables
+    st.subheader("📋 Available Tables in Database")
+    try:
+        tables = service.list_tables().to_pandas()
+        st.table(tables)
     except Exception as e:
-        st.error(f"❌ Error: {e}")
-
-# Show available tables
-st.subheader("📋 Available Tables in Database")
-try:
-    with get_connection() as con:
-        tables = con.execute("SHOW TABLES;").fetchdf()
-    st.table(tables)
-except Exception as e:
-    st.error(f"❌ Could not fetch table list: {e}")
+        st.error(f"❌ Could not fetch table list: {e}")
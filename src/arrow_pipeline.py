@@ -0,0 +1,201 @@
+# src/arrow_pipeline.py
+"""
+Arrow-native ingest path: readers yield pyarrow Tables and unify_table applies the
+unify_record semantics with Arrow operations, so rows never become pandas object
+columns on the way from the raw file to Parquet.
+
+- CSV is parsed by pyarrow's multithreaded streaming reader, all columns as strings
+- renaming and reordering to CANONICAL_COLUMNS follows the cached transform.SchemaPlan
+  for the header and only rebuilds the schema (zero-copy);
+  missing columns are null arrays, metadata columns are a single value taken n times
+- money columns go through transform.parse_money_arrow
+- state is extracted once per distinct hospital_address and broadcast back
+"""
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from src.json_stream import open_json_records, mrf_metadata, flatten_mrf_item
+from src.profiling import stage, timed_iter
+from src.unpivot import parse_wide_header, unpivot_table
+from src.transform import (CANONICAL_SCHEMA, LOW_CARDINALITY_COLUMNS, canonical_schema, compile_schema_plan,
+                           extract_state_from_address, parse_money_arrow)
+from src.sniff import sniff_csv
+from src.utils import DEFAULT_CHUNK_ROWS, extract_metadata_from_lines, iter_excel_chunks, normalize_colname
+
+# bytes per CSV block handed to the Arrow reader (bounds memory per batch)
+ARROW_BLOCK_SIZE = 16 << 20
+
+METADATA_FIELDS = ["last_updated_on", "version", "hospital_location", "hospital_address", "license_number"]
+
+
+def iter_csv_tables(file_path: Path, block_size: int = ARROW_BLOCK_SIZE,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[Iterator[pa.Table], Dict]:
+    """
+    Stream a CSV as Arrow tables (all-string columns, normalized names). Returns (tables, metadata).
+    Wide (per-payer column) files are unpivoted to the tall layout, at most chunk_rows rows per table.
+    The reader starts at the sniffed data offset, so the top of the file is read only once.
+    """
+    sniff = sniff_csv(file_path)
+    meta = extract_metadata_from_lines(sniff.metadata_lines, sniff.delimiter)
+    raw_names = sniff.header
+    names = [normalize_colname(c) for c in raw_names]
+    plan = parse_wide_header(raw_names)
+    source = pa.OSFile(str(file_path))
+    source.seek(sniff.data_offset)
+    reader = pacsv.open_csv(
+        source,
+        read_options=pacsv.ReadOptions(column_names=raw_names, block_size=block_size, encoding=sniff.encoding),
+        parse_options=pacsv.ParseOptions(delimiter=sniff.delimiter, quote_char=sniff.quotechar,
+                                         newlines_in_values=True),
+        # empty cells and NA markers become nulls, as with pandas
+        convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in raw_names},
+                                             strings_can_be_null=True),
+    )
+
+    def _tables():
+        with source:
+            for batch in reader:
+                table = pa.Table.from_batches([batch]).rename_columns(names)
+                if plan is None:
+                    yield table
+                else:
+                    yield from unpivot_table(table, plan, max_rows=chunk_rows)
+    return _tables(), meta
+
+
+def iter_json_tables(file_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[Iterator[pa.Table], Dict]:
+    """Stream a JSON file as Arrow tables of about chunk_rows flattened rows. Returns (tables, metadata)."""
+    records, top = open_json_records(file_path)
+    meta = {normalize_colname(k): v for k, v in mrf_metadata(top).items()}
+
+    def _tables():
+        rows = []
+        for rec in records:
+            rows.extend(flatten_mrf_item(rec) if isinstance(rec, dict) else [{"value": rec}])
+            if len(rows) >= chunk_rows:
+                yield _rows_to_table(rows)
+                rows = []
+        if rows:
+            yield _rows_to_table(rows)
+    return _tables(), meta
+
+
+def _rows_to_table(rows: List[Dict]) -> pa.Table:
+    """Build an all-string Arrow table from dict rows (column order of first appearance)."""
+    names = list(dict.fromkeys(k for row in rows for k in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        columns[normalize_colname(name)] = pa.array(
+            [v if v is None or isinstance(v, str) else str(v) for v in values], type=pa.string()
+        )
+    return pa.table(columns)
+
+
+def iter_arrow_tables(file_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[Iterator[pa.Table], Dict]:
+    """Arrow counterpart of utils.read_generic_chunks."""
+    ext = file_path.suffix.lower()
+    if ext == ".json":
+        tables, meta = iter_json_tables(file_path, chunk_rows=chunk_rows)
+    elif ext in {".csv", ".txt"}:
+        tables, meta = iter_csv_tables(file_path, chunk_rows=chunk_rows)
+    elif ext in {".xlsx", ".xls"}:
+        # Excel is parsed by openpyxl either way; its string chunks convert to all-string tables
+        frames, meta = iter_excel_chunks(file_path, chunk_rows=chunk_rows)
+        tables = (_string_table(df) for df in frames)
+    else:
+        raise ValueError(f"Unsupported extension: {ext}")
+    return timed_iter("parse", tables, bytes_read=file_path.stat().st_size, rows=lambda t: t.num_rows), meta
+
+
+def _string_table(df: pd.DataFrame) -> pa.Table:
+    schema = pa.schema([(str(c), pa.string()) for c in df.columns])
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _constant(value, n: int) -> pa.Array:
+    """A string column holding one value n times (built with take, no Python list of n items)."""
+    return pa.array([str(value)], type=pa.string()).take(np.zeros(n, dtype=np.int32))
+
+
+def _state_column(addresses: pa.Array) -> pa.Array:
+    """extract_state_from_address applied once per distinct address, then broadcast."""
+    uniques = pc.unique(addresses)
+    states = pa.array([extract_state_from_address(a) for a in uniques.to_pylist()], type=pa.string())
+    return states.take(pc.index_in(addresses, value_set=uniques))
+
+
+def unify_table(table: pa.Table, source_file: str, metadata: Optional[Dict],
+                categorical: bool = False) -> pa.Table:
+    """
+    Arrow version of transform.unify_record: fill hospital metadata, map to the canonical
+    schema, add source_file and state, and parse money columns. Returns a table with
+    CANONICAL_SCHEMA, or CANONICAL_SCHEMA_CATEGORICAL (LOW_CARDINALITY_COLUMNS
+    dictionary-encoded) with categorical=True.
+    """
+    n = table.num_rows
+    meta_norm = {k.lower(): v for k, v in (metadata or {}).items()}
+    # first occurrence wins if two raw columns map to the same canonical name
+    cols = {}
+    for name, col in zip(table.column_names, table.columns):
+        cols.setdefault(name, col)
+
+    if not ("hospital_name" in cols and cols["hospital_name"].null_count < n) and meta_norm.get("hospital_name"):
+        cols["hospital_name"] = _constant(meta_norm["hospital_name"], n)
+    for field in METADATA_FIELDS:
+        if (field not in cols or cols[field].null_count == n) and meta_norm.get(field):
+            cols[field] = _constant(meta_norm[field], n)
+
+    plan = compile_schema_plan(tuple(cols))
+    values = list(cols.values())
+    renamed = {f.name: values[pos] for f, pos in zip(CANONICAL_SCHEMA, plan.positions) if pos >= 0}
+    renamed["source_file"] = _constant(source_file, n)
+    address = renamed.get("hospital_address")
+    renamed["state"] = _state_column(pc.cast(address, pa.string())) if address is not None else pa.nulls(n, pa.string())
+
+    arrays = []
+    for field in CANONICAL_SCHEMA:
+        col = renamed.get(field.name)
+        if col is None:
+            arrays.append(pa.nulls(n, field.type))
+        elif field.type == pa.float64():
+            col = pc.cast(col, pa.string()) if col.type != pa.string() else col
+            if isinstance(col, pa.ChunkedArray):
+                col = col.combine_chunks()
+            arrays.append(parse_money_arrow(col))
+        else:
+            col = col if col.type == pa.string() else pc.cast(col, pa.string())
+            if categorical and field.name in LOW_CARDINALITY_COLUMNS:
+                col = pc.dictionary_encode(col)
+            arrays.append(col)
+    schema = canonical_schema(categorical)
+    arrays = [a if a.type == f.type else pc.cast(a, f.type) for a, f in zip(arrays, schema)]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet_arrow(file: Path, out_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        categorical: bool = False) -> int:
+    """
+    Stream `file` through unify_table and write each batch straight to Parquet as a row
+    group. Returns the number of rows written.
+    """
+    tables, meta = iter_arrow_tables(file, chunk_rows=chunk_rows)
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp_path, canonical_schema(categorical)) as writer:
+        for table in tables:
+            with stage("unify", rows_in=table.num_rows, rows_out=table.num_rows):
+                unified = unify_table(table, source_file=file.name, metadata=meta, categorical=categorical)
+            with stage("parquet_write", rows_in=unified.num_rows, rows_out=unified.num_rows):
+                writer.write_table(unified)
+            rows += unified.num_rows
+    os.replace(tmp_path, out_path)
+    return rows
@@ -0,0 +1,127 @@
+# src/benchmarks/bench_chunked_ingest.py
+"""
+Compare whole-file CSV ingestion (python and C parsers) with the chunked pandas streaming
+path and the Arrow-native path, each also in categorical mode (low-cardinality columns
+dictionary-encoded), the DuckDB SQL transform, and the chunked / Arrow paths with
+parse, transform and write overlapped on threads (*_pipelined, see src.pipeline).
+Each mode runs in a fresh process so peak RSS is measured independently.
+Run:
+    python -m src.benchmarks.bench_chunked_ingest --rows 1000000 --chunk-rows 100000
+    python -m src.benchmarks.bench_chunked_ingest --modes chunked,chunked_pipelined
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+MODES = ["in_memory_python", "in_memory", "in_memory_categorical", "chunked", "chunked_categorical",
+         "arrow", "arrow_categorical", "duckdb", "chunked_pipelined", "arrow_pipelined"]
+# transform threads in the *_pipelined modes
+PIPELINE_WORKERS = 2
+
+META_HEADER = ["hospital_name", "last_updated_on", "version", "hospital_address", "license_number"]
+META_VALUES = ["Synthetic General Hospital", "2025-01-01", "2.0.0", "1 Main St, Springfield, IL 62701", "12345"]
+DATA_HEADER = [
+    "description", "code|1", "code|1|type", "billing_class", "setting", "standard_charge|gross",
+    "standard_charge|discounted_cash", "payer_name", "plan_name", "standard_charge|negotiated_dollar",
+    "standard_charge|min", "standard_charge|max", "additional_generic_notes",
+]
+
+
+def write_synthetic_csv(path: Path, rows: int) -> None:
+    """Write a CMS-style tall CSV with two metadata rows on top."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(META_HEADER)
+        w.writerow(META_VALUES)
+        w.writerow(DATA_HEADER)
+        for i in range(rows):
+            w.writerow([
+                f"Procedure {i % 5000}", str(10000 + i % 5000), "CPT", "outpatient", "both",
+                f"${1000 + i % 997:,}.00", f"{800 + i % 991}.50", f"Payer {i % 40}", f"Plan {i % 7}",
+                "other" if i % 13 == 0 else f"{500 + i % 499}.25", f"{400 + i % 7}", f"{1500 + i % 11}",
+                "see note 1",
+            ])
+
+
+def _run_mode(mode: str, csv_path: str, out_path: str, chunk_rows: int) -> dict:
+    import pandas as pd
+    from src import profiling
+    from src.utils import (read_generic, detect_header_line_csv, extract_metadata_from_lines,
+                           normalize_colname, peak_rss_mb)
+    from src.transform import unify_record
+    from src.ingest import queue_summary, write_parquet_chunked, write_parquet_pipelined
+    from src.pipeline import bottleneck
+    from src.arrow_pipeline import write_parquet_arrow
+    from src.duckdb_pipeline import write_parquet_duckdb
+
+    categorical = mode.endswith("_categorical")
+    mode_base = mode.replace("_categorical", "")
+    frame_mb, queues = None, None
+    start = time.perf_counter()
+    if mode_base == "in_memory_python":
+        # the previous read_generic behaviour: whole file through the python parser
+        header_idx, lines = detect_header_line_csv(Path(csv_path))
+        meta = extract_metadata_from_lines(lines[: max(5, header_idx + 2)])
+        df = pd.read_csv(csv_path, skiprows=header_idx, dtype=str, engine="python")
+        df.columns = [normalize_colname(c) for c in df.columns]
+        df = unify_record(df, source_file=Path(csv_path).name, metadata=meta)
+        df.to_parquet(out_path, index=False)
+        rows = len(df)
+    elif mode_base == "in_memory":
+        df, meta = read_generic(Path(csv_path))
+        df = unify_record(df, source_file=Path(csv_path).name, metadata=meta, categorical=categorical)
+        frame_mb = df.memory_usage(deep=True).sum() / 2**20
+        df.to_parquet(out_path, index=False)
+        rows = len(df)
+    elif mode_base == "arrow":
+        rows = write_parquet_arrow(Path(csv_path), Path(out_path), categorical=categorical)
+    elif mode_base == "duckdb":
+        rows = write_parquet_duckdb(Path(csv_path), Path(out_path), chunk_rows=chunk_rows)
+    elif mode_base.endswith("_pipelined"):
+        engine = "arrow" if mode_base.startswith("arrow") else "pandas"
+        with profiling.collect() as stages:
+            rows = write_parquet_pipelined(Path(csv_path), Path(out_path), chunk_rows=chunk_rows, engine=engine,
+                                           workers=PIPELINE_WORKERS)
+        queues = queue_summary([{"stages": stages}])
+    else:
+        rows = write_parquet_chunked(Path(csv_path), Path(out_path), chunk_rows=chunk_rows,
+                                     categorical=categorical)
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed,
+            "peak_rss_mb": peak_rss_mb(), "frame_mb": frame_mb, "output_mb": Path(out_path).stat().st_size / 2**20,
+            "queues": queues, "bottleneck": bottleneck(queues) if queues else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of: " + ", ".join(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "synthetic_standardcharges.csv"
+        write_synthetic_csv(csv_path, args.rows)
+        print(f"Input: {args.rows} rows, {csv_path.stat().st_size / 2**20:.1f} MB")
+        for mode in args.modes.split(","):
+            # one single-use spawned worker per mode keeps the RSS high-water marks separate
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                res = pool.submit(_run_mode, mode, str(csv_path), str(Path(tmp) / f"{mode}.parquet"),
+                                  args.chunk_rows).result()
+            frame = f", frame {res['frame_mb']:.0f} MB" if res["frame_mb"] is not None else ""
+            print(f"{res['mode']:>21}: {res['rows']} rows in {res['seconds']:.2f}s "
+                  f"({res['rows_per_sec']:,.0f} rows/s), peak RSS {res['peak_rss_mb']:.0f} MB{frame}, "
+                  f"Parquet {res['output_mb']:.1f} MB")
+            for name, q in (res["queues"] or {}).items():
+                print(f"{'queue ' + name:>21}: mean depth {q['mean_depth']:.1f} / {q['capacity']}, "
+                      f"{q['put_wait_s']:.2f}s blocked, {q['get_wait_s']:.2f}s starved")
+            if res["bottleneck"]:
+                print(f"{'bottleneck':>21}: {res['bottleneck']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# src/benchmarks/bench_excel.py
+"""
+Compare the previous Excel read path (an openpyxl pass to find the header, then
+pd.read_excel re-parsing the whole first sheet) with the single-pass streaming reader
+(utils.iter_excel_chunks), and time a full chunked ingest of the workbook to Parquet.
+Each mode runs in a fresh process so peak RSS is measured independently.
+Run:
+    python -m src.benchmarks.bench_excel --rows 1000000 --chunk-rows 100000
+"""
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.benchmarks.bench_chunked_ingest import DATA_HEADER, META_HEADER, META_VALUES
+
+
+def write_synthetic_xlsx(path: Path, rows: int) -> None:
+    """Write a CMS-style tall sheet (two metadata rows on top) with openpyxl's write-only mode."""
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("standard_charges")
+    ws.append(META_HEADER)
+    ws.append(META_VALUES)
+    ws.append(DATA_HEADER)
+    for i in range(rows):
+        ws.append([
+            f"Procedure {i % 5000}", 10000 + i % 5000, "CPT", "outpatient", "both",
+            1000.0 + i % 997, 800.5 + i % 991, f"Payer {i % 40}", f"Plan {i % 7}",
+            "other" if i % 13 == 0 else 500.25 + i % 499, 400 + i % 7, 1500 + i % 11, "see note 1",
+        ])
+    wb.save(path)
+
+
+def _run_mode(mode: str, xlsx_path: str, out_path: str, chunk_rows: int) -> dict:
+    import pandas as pd
+    from src.utils import (KNOWN_HEADER_TOKENS, extract_metadata_from_lines, iter_excel_chunks,
+                           normalize_colname, peak_rss_mb)
+    from src.ingest import write_parquet_chunked
+
+    path = Path(xlsx_path)
+    start = time.perf_counter()
+    if mode == "two_pass_read_excel":
+        # the previous read_generic behaviour: preview open for the header, then read_excel
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True)
+        preview, header_row_idx = [], 0
+        for i, row in enumerate(wb[wb.sheetnames[0]].iter_rows(max_row=25, max_col=50, values_only=True)):
+            row_str = ",".join([str(c) if c is not None else "" for c in row])
+            preview.append(row_str)
+            if any(tok in row_str.lower() for tok in KNOWN_HEADER_TOKENS):
+                header_row_idx = i
+                break
+        extract_metadata_from_lines(preview[: max(5, header_row_idx + 2)])
+        df = pd.read_excel(path, header=header_row_idx, engine="openpyxl", dtype=str)
+        df.columns = [normalize_colname(c) for c in df.columns]
+        rows = len(df)
+    elif mode == "single_pass_stream":
+        chunks, _ = iter_excel_chunks(path, chunk_rows=chunk_rows)
+        rows = sum(len(c) for c in chunks)
+    elif mode == "single_pass_to_parquet":
+        rows = write_parquet_chunked(path, Path(out_path), chunk_rows=chunk_rows)
+    else:
+        raise ValueError(mode)
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "rows": rows, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx_path = Path(tmp) / "synthetic_standardcharges.xlsx"
+        start = time.perf_counter()
+        write_synthetic_xlsx(xlsx_path, args.rows)
+        print(f"Input: {args.rows:,} rows, {xlsx_path.stat().st_size / 2**20:.0f} MB "
+              f"(written in {time.perf_counter() - start:.0f}s)")
+        for mode in ["two_pass_read_excel", "single_pass_stream", "single_pass_to_parquet"]:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                res = pool.submit(_run_mode, mode, str(xlsx_path), str(Path(tmp) / f"{mode}.parquet"),
+                                  args.chunk_rows).result()
+            assert res["rows"] == args.rows, (res["rows"], args.rows)
+            print(f"{mode:>24}: {res['rows']:,} rows in {res['seconds']:.1f}s "
+                  f"({res['rows'] / res['seconds']:,.0f} rows/s), peak RSS {res['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
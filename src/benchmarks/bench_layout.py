@@ -0,0 +1,116 @@
+# src/benchmarks/bench_layout.py
+"""
+Fixed lookup query set against the storage layouts:
+- per-file Parquet as ingest writes it (unsorted)            -- before
+- state-partitioned, code_1/payer_name-sorted Parquet dataset -- after
+- unordered hospital_charges table                           -- before
+- hospital_charges ordered by (state, code_1, payer_name)    -- after
+- the ordered table plus ART indexes (--create-indexes)
+Each query is run --repeat times per layout; the median is reported.
+Run:
+    python -m src.benchmarks.bench_layout --rows 5000000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from src.layout import write_partitioned_dataset
+from src.load_duckdb import CLUSTER_KEYS, INDEX_COLUMNS
+
+STATES = ["CA", "TX", "NY", "FL", "IL", "PA", "OH", "GA", "NC", "MI"]
+
+QUERIES = {
+    "code lookup": "SELECT count(*), avg(standard_charge_negotiated_dollar) FROM {src} WHERE code_1 = '12345'",
+    "code + payer": "SELECT * FROM {src} WHERE code_1 = '23456' AND payer_name = 'Payer 7'",
+    "payer in state": "SELECT code_1, min(standard_charge_negotiated_dollar) FROM {src} "
+                      "WHERE state = 'TX' AND payer_name = 'Payer 3' GROUP BY 1",
+    "hospital": "SELECT count(*) FROM {src} WHERE hospital_name = 'Hospital 42'",
+}
+
+
+def write_synthetic_parquet(out_dir: Path, rows: int, files: int) -> list:
+    """`files` canonical-style Parquet files in random row order, like per-hospital ingest outputs."""
+    con = duckdb.connect()
+    paths = []
+    per_file = rows // files
+    for i in range(files):
+        path = out_dir / f"hospital_{i}.parquet"
+        con.execute(f"""
+            COPY (
+                SELECT
+                    'Procedure ' || (h % 20000)                     AS description,
+                    CAST(10000 + h % 20000 AS VARCHAR)              AS code_1,
+                    'CPT'                                           AS code_1_type,
+                    'Payer ' || (h // 20000 % 50)                   AS payer_name,
+                    'Plan ' || (h // 1000000 % 7)                   AS plan_name,
+                    (h % 250000) / 10.0                             AS standard_charge_negotiated_dollar,
+                    'Hospital ' || {i} * 10 + (h // 7 % 10)         AS hospital_name,
+                    {STATES}[1 + ({i} + h // 7 % 10) % {len(STATES)}] AS state,
+                    'hospital_{i}.csv'                              AS source_file
+                FROM (SELECT CAST(hash(range + {i * per_file}) % 1000000007 AS BIGINT) AS h FROM range({per_file}))
+            ) TO '{path}' (FORMAT PARQUET)
+        """)
+        paths.append(str(path))
+    con.close()
+    return paths
+
+
+def _time(con, sql: str, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        con.execute(sql).fetchall()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        files = write_synthetic_parquet(tmp, args.rows, args.files)
+        files_sql = "[" + ", ".join(f"'{f}'" for f in files) + "]"
+
+        start = time.perf_counter()
+        write_partitioned_dataset(files, tmp / "dataset")
+        print(f"{args.rows:,} rows in {args.files} files; partitioned dataset built in {time.perf_counter() - start:.1f}s")
+
+        con = duckdb.connect(str(tmp / "bench.duckdb"))
+        con.execute(f"CREATE TABLE unordered AS SELECT * FROM read_parquet({files_sql})")
+        start = time.perf_counter()
+        con.execute(f"CREATE TABLE ordered AS SELECT * FROM read_parquet({files_sql}) "
+                    f"ORDER BY {', '.join(CLUSTER_KEYS)}")
+        print(f"ordered table built in {time.perf_counter() - start:.1f}s")
+        con.execute("CREATE TABLE indexed AS SELECT * FROM ordered")
+        start = time.perf_counter()
+        for col in INDEX_COLUMNS:
+            con.execute(f"CREATE INDEX idx_indexed_{col} ON indexed ({col})")
+        print(f"ART indexes built in {time.perf_counter() - start:.1f}s")
+
+        layouts = {
+            "parquet files (unsorted)": f"read_parquet({files_sql})",
+            "partitioned dataset": f"read_parquet('{tmp / 'dataset'}/*/*.parquet', hive_partitioning = true)",
+            "table (unordered)": "unordered",
+            "table (ordered)": "ordered",
+            "table (ordered + ART)": "indexed",
+        }
+        width = max(len(q) for q in QUERIES)
+        print(f"\nmedian of {args.repeat} runs, seconds")
+        print(" " * (width + 2) + "".join(f"{name:>28}" for name in layouts))
+        for qname, template in QUERIES.items():
+            timings = [_time(con, template.format(src=src), args.repeat) for src in layouts.values()]
+            print(f"{qname:<{width + 2}}" + "".join(f"{t:>28.4f}" for t in timings))
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
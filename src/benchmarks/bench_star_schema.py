@@ -0,0 +1,98 @@
+# src/benchmarks/bench_star_schema.py
+"""
+Flat vs star schema (load_duckdb --schema): database size, full-load time and the
+bench_layout query set through hospital_charges (the table, or the star schema's view).
+The synthetic files carry the full canonical text columns (hospital metadata on every
+row, long descriptions, plan names) and --dup-rate repeated charge rows, as real MRFs do.
+Run:
+    python -m src.benchmarks.bench_star_schema --rows 2000000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+import src.load_duckdb as load_duckdb
+from src.benchmarks.bench_layout import QUERIES, STATES, _time
+
+
+def write_synthetic_canonical(out_dir: Path, rows: int, files: int, dup_rate: float) -> None:
+    con = duckdb.connect()
+    per_file = rows // files
+    for i in range(files):
+        con.execute(f"""
+            COPY (
+                SELECT
+                    'Hospital ' || {i}                                   AS hospital_name,
+                    '2025-01-01'                                         AS last_updated_on,
+                    '2.0.0'                                              AS version,
+                    'Main Campus {i}'                                    AS hospital_location,
+                    {i} || ' Health Parkway, Springfield, '
+                        || {STATES}[1 + {i} % {len(STATES)}] || ' 12345' AS hospital_address,
+                    'LIC-' || (100000 + {i})                             AS license_number,
+                    'PROCEDURE ' || (h % 20000) || ' WITH CONTRAST, BILATERAL, INCLUDING PROFESSIONAL COMPONENT'
+                                                                         AS description,
+                    CAST(10000 + h % 20000 AS VARCHAR)                   AS code_1,
+                    'CPT'                                                AS code_1_type,
+                    CAST(h % 900 AS VARCHAR)                             AS code_2,
+                    'RC'                                                 AS code_2_type,
+                    ['facility', 'professional'][1 + h % 2]              AS billing_class,
+                    ['inpatient', 'outpatient', 'both'][1 + h % 3]       AS setting,
+                    (h % 250000) / 10.0                                  AS standard_charge_gross,
+                    (h % 250000) / 20.0                                  AS standard_charge_discounted_cash,
+                    'Payer ' || (h // 20000 % 50)                        AS payer_name,
+                    'Payer ' || (h // 20000 % 50) || ' Commercial PPO Plan ' || (h // 1000000 % 7)
+                                                                         AS plan_name,
+                    (h % 125000) / 10.0                                  AS standard_charge_negotiated_dollar,
+                    'fee schedule'                                       AS standard_charge_methodology,
+                    'hospital_{i}.csv'                                   AS source_file,
+                    {STATES}[1 + {i} % {len(STATES)}]                    AS state
+                -- the last dup_rate of the rows repeat earlier ones
+                FROM (SELECT CAST(hash(range % {max(1, int(per_file * (1 - dup_rate)))} + {i * per_file})
+                                  % 1000000007 AS BIGINT) AS h
+                      FROM range({per_file}))
+            ) TO '{out_dir / f"hospital_{i}.parquet"}' (FORMAT PARQUET)
+        """)
+    con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        load_duckdb.PROCESSED_DIR = tmp
+        write_synthetic_canonical(tmp, args.rows, args.files, args.dup_rate)
+        results = {}
+        for schema in load_duckdb.SCHEMAS:
+            load_duckdb.DUCKDB_PATH = tmp / f"{schema}.duckdb"
+            start = time.perf_counter()
+            load_duckdb.create_unified_table(summaries=False, search=False, schema=schema)
+            seconds = time.perf_counter() - start
+            con = duckdb.connect(str(load_duckdb.DUCKDB_PATH))
+            con.execute("CHECKPOINT")
+            rows = con.execute("SELECT count(*) FROM hospital_charges").fetchone()[0]
+            timings = [_time(con, q.format(src="hospital_charges"), args.repeat) for q in QUERIES.values()]
+            con.close()
+            results[schema] = (load_duckdb.DUCKDB_PATH.stat().st_size, seconds, rows, timings)
+
+        width = max(len(q) for q in QUERIES)
+        print(f"\n{args.rows:,} rows in {args.files} files, {args.dup_rate:.0%} repeated")
+        print(" " * (width + 2) + "".join(f"{s:>14}" for s in results))
+        print(f"{'database MB':<{width + 2}}" + "".join(f"{r[0] / 1e6:>14.1f}" for r in results.values()))
+        print(f"{'load seconds':<{width + 2}}" + "".join(f"{r[1]:>14.2f}" for r in results.values()))
+        print(f"{'rows':<{width + 2}}" + "".join(f"{r[2]:>14,}" for r in results.values()))
+        print(f"median of {args.repeat} runs, seconds")
+        for i, qname in enumerate(QUERIES):
+            print(f"{qname:<{width + 2}}" + "".join(f"{r[3][i]:>14.4f}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
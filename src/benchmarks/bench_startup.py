@@ -0,0 +1,79 @@
+# src/benchmarks/bench_startup.py
+"""
+Cold-start time of the pipeline entry points, each in a fresh interpreter:
+- `--help` of src.cli and of its commands
+- a no-op incremental load (one small Parquet file already loaded, nothing changed)
+Also lists which heavy packages each command left imported.
+Each command is run --repeat times; the median wall time is reported.
+Run:
+    python -m src.benchmarks.bench_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HEAVY = ["pandas", "pyarrow", "numpy", "duckdb", "tqdm"]
+
+# prints the heavy packages imported after the command ran
+_PROBE = ("import sys, runpy; sys.argv = {argv!r}; "
+          "exit_code = 0\n"
+          "try:\n    runpy.run_module({module!r}, run_name='__main__')\n"
+          "except SystemExit as e:\n    exit_code = e.code or 0\n"
+          "print('IMPORTED', *[m for m in {heavy!r} if m in sys.modules], file=sys.stderr)")
+
+
+def _run(module: str, args: list, env: dict) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", module, *args], env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(f"{module} {' '.join(args)} failed:\n{proc.stderr}")
+    return seconds
+
+
+def _imported(module: str, args: list, env: dict) -> list:
+    code = _PROBE.format(argv=[module, *args], module=module, heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    line = [l for l in proc.stderr.splitlines() if l.startswith("IMPORTED")]
+    return line[-1].split()[1:] if line else ["?"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        env = dict(os.environ, HOSPITAL_ETL_DATA_DIR=str(tmp / "data"),
+                   PYTHONPATH=os.pathsep.join([str(Path(__file__).resolve().parents[2]),
+                                               os.environ.get("PYTHONPATH", "")]))
+        (tmp / "data" / "processed").mkdir(parents=True)
+        subprocess.run([sys.executable, "-c",
+                        "import duckdb; duckdb.sql(\"COPY (SELECT range::VARCHAR AS code_1, 'a.csv' AS source_file "
+                        f"FROM range(1000)) TO '{tmp / 'data' / 'processed' / 'a.parquet'}' (FORMAT PARQUET)\")"],
+                       env=env, check=True)
+        _run("src.cli", ["load"], env)
+
+        cases = {
+            "src.cli --help": ("src.cli", ["--help"]),
+            "src.cli ingest --help": ("src.cli", ["ingest", "--help"]),
+            "src.cli load --help": ("src.cli", ["load", "--help"]),
+            "src.cli load (no-op)": ("src.cli", ["load"]),
+            "src.ingest --help": ("src.ingest", ["--help"]),
+            "src.load_duckdb (no-op)": ("src.load_duckdb", []),
+        }
+        width = max(len(name) for name in cases)
+        print(f"median of {args.repeat} cold starts, seconds")
+        for name, (module, argv) in cases.items():
+            seconds = statistics.median(_run(module, argv, env) for _ in range(args.repeat))
+            print(f"{name:<{width + 2}}{seconds:>8.3f}   imports: {', '.join(_imported(module, argv, env)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
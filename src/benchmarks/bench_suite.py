@@ -0,0 +1,204 @@
+# src/benchmarks/bench_suite.py
+"""
+Repeatable end-to-end benchmark over synthetic MRFs (see synthetic_mrf).
+
+Every case (format x layout x size) runs in a fresh process:
+read_generic -> unify_record -> Parquet write -> create_unified_table -> app queries.
+It records each stage with profiling (wall/CPU time, rows, bytes read, peak RSS, and
+throughput), plus the latency of representative app queries run through QueryService
+with the result cache off. Results are saved as JSON named after the git commit, and
+--compare diffs a run against an earlier results file, flagging stages that got slower.
+Run:
+    python -m src.benchmarks.bench_suite --sizes 1000,100000 --formats csv,json,xlsx
+    python -m src.benchmarks.bench_suite --sizes 100000 --compare reports/benchmarks/<old>.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+RESULTS_DIR = Path("reports") / "benchmarks"
+
+# representative app queries: the default page, a code lookup, a payer comparison (from the
+# charges, and from price_summary as the compare view runs it) and a state rollup
+APP_QUERIES = {
+    "default_page": "SELECT * FROM hospital_charges LIMIT 150",
+    "code_lookup": "SELECT * FROM hospital_charges WHERE code_1 = '10042'",
+    "payer_compare": ("SELECT payer_name, count(*) AS n, median(standard_charge_negotiated_dollar) AS median_dollar "
+                      "FROM hospital_charges WHERE code_1 = '10042' GROUP BY payer_name ORDER BY median_dollar"),
+    "compare_summary": ("SELECT payer_name, n_prices, median_price FROM price_summary "
+                        "WHERE code_1 = '10042' AND level = 'code_payer' ORDER BY median_price"),
+    "state_rollup": ("SELECT state, code_1_type, count(*) AS n, avg(standard_charge_gross) AS avg_gross "
+                     "FROM hospital_charges GROUP BY ALL"),
+}
+
+# a stage this much slower than the baseline is reported as a regression
+REGRESSION_RATIO = 1.10
+
+
+def git_commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _run_case(fmt: str, layout: str, rows: int, payers: int, query_repeats: int) -> Dict:
+    import pyarrow.parquet as pq
+    import src.load_duckdb as load_duckdb
+    from src import profiling
+    from src.benchmarks.synthetic_mrf import write_synthetic_mrf
+    from src.ingest import to_canonical_table
+    from src.profiling import peak_rss_mb, stage
+    from src.query_service import QueryService, ResultCache
+    from src.transform import unify_record
+    from src.utils import read_generic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        raw = tmp / f"synthetic_{layout}_standardcharges.{fmt}"
+        expected = write_synthetic_mrf(raw, fmt, layout, rows=rows, payers=payers)
+        input_mb = raw.stat().st_size / 2**20
+        processed = tmp / "processed"
+        processed.mkdir()
+        load_duckdb.PROCESSED_DIR = processed
+        load_duckdb.DUCKDB_PATH = processed / "hospitals.duckdb"
+
+        with profiling.collect() as stages:
+            # read_generic records its own "parse" (and header_detection) stages
+            df, meta = read_generic(raw)
+            with stage("unify", rows_in=len(df)) as rec:
+                df = unify_record(df, source_file=raw.name, metadata=meta)
+                rec["rows_out"] = len(df)
+            with stage("parquet_write", rows_in=len(df), rows_out=len(df)):
+                pq.write_table(to_canonical_table(df), processed / f"{raw.stem}.parquet")
+            del df
+            # create_unified_table collects its own stages; time it as a whole here
+            with stage("create_unified_table", rows_in=expected):
+                load_duckdb.create_unified_table()
+
+        service = QueryService(load_duckdb.DUCKDB_PATH, cache=ResultCache(max_bytes=0))
+        queries = []
+        for name, sql in APP_QUERIES.items():
+            times, result = [], None
+            for _ in range(query_repeats):
+                result = service.query_page(sql)
+                times.append(result["seconds"])
+            times.sort()
+            queries.append({"query": name, "rows": result["table"].num_rows, "p50_s": times[len(times) // 2],
+                            "p95_s": times[min(len(times) - 1, int(len(times) * 0.95))], "max_s": times[-1]})
+        service.release()
+
+    for s in stages:
+        s["rows_per_s"] = (s["rows_out"] or s["rows_in"]) / s["wall_s"] if s["wall_s"] else None
+    return {"case": f"{fmt}/{layout}/{rows}", "format": fmt, "layout": layout, "rows": rows,
+            "canonical_rows": expected, "input_mb": input_mb,
+            "stages": stages, "queries": queries, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_suite(formats: List[str], layouts: List[str], sizes: List[int], payers: int = 20,
+              query_repeats: int = 5) -> Dict:
+    import duckdb
+    import pandas as pd
+    import pyarrow as pa
+
+    cases = []
+    for rows in sizes:
+        for fmt in formats:
+            # JSON has one (nested) layout
+            for layout in (["tall"] if fmt == "json" else layouts):
+                # one single-use spawned worker per case keeps the RSS high-water marks separate
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                    res = pool.submit(_run_case, fmt, layout, rows, payers, query_repeats).result()
+                cases.append(res)
+                _print_case(res)
+    return {
+        "run": {"commit": git_commit(), "started": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(), "platform": platform.platform(),
+                "pandas": pd.__version__, "pyarrow": pa.__version__, "duckdb": duckdb.__version__,
+                "payers": payers, "query_repeats": query_repeats},
+        "cases": cases,
+    }
+
+
+def _print_case(res: Dict) -> None:
+    print(f"{res['case']}: {res['canonical_rows']:,} canonical rows, peak RSS {res['peak_rss_mb']:.0f} MB")
+    for s in res["stages"]:
+        if "." in s["stage"]:
+            continue
+        rate = f"{s['rows_per_s']:,.0f} rows/s" if s["rows_per_s"] else "-"
+        print(f"    {s['stage']:>22}: {s['wall_s']:8.3f}s  {rate}")
+    for q in res["queries"]:
+        print(f"    {'query ' + q['query']:>22}: p50 {q['p50_s'] * 1000:.1f} ms, p95 {q['p95_s'] * 1000:.1f} ms")
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = REGRESSION_RATIO) -> List[Dict]:
+    """
+    Per case x stage (and query p50) timing ratios current / baseline for cases present in
+    both runs; rows with ratio above threshold are marked as regressions.
+    """
+    def _timings(run: Dict) -> Dict:
+        out = {}
+        for case in run["cases"]:
+            for s in case["stages"]:
+                out[(case["case"], s["stage"])] = s["wall_s"]
+            for q in case["queries"]:
+                out[(case["case"], "query " + q["query"])] = q["p50_s"]
+        return out
+
+    base, cur = _timings(baseline), _timings(current)
+    rows = []
+    for key in sorted(base.keys() & cur.keys()):
+        ratio = cur[key] / base[key] if base[key] else None
+        rows.append({"case": key[0], "stage": key[1], "baseline_s": base[key], "current_s": cur[key],
+                     "ratio": ratio, "regression": ratio is not None and ratio > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated canonical row counts")
+    parser.add_argument("--formats", default="csv,json,xlsx")
+    parser.add_argument("--layouts", default="tall,wide")
+    parser.add_argument("--payers", type=int, default=20)
+    parser.add_argument("--query-repeats", type=int, default=5)
+    parser.add_argument("--out-dir", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_suite(args.formats.split(","), args.layouts.split(","),
+                        [int(s) for s in args.sizes.split(",")], payers=args.payers,
+                        query_repeats=args.query_repeats)
+    results["run"]["seconds"] = time.perf_counter() - started
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    out = args.out_dir / f"{datetime.now():%Y%m%d-%H%M%S}_{results['run']['commit']}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        diff = compare_results(baseline, results)
+        print(f"Compared with {args.compare} (commit {baseline['run'].get('commit')}):")
+        for d in diff:
+            flag = "  REGRESSION" if d["regression"] else ""
+            ratio = f"{d['ratio']:.2f}x" if d["ratio"] is not None else "-"
+            print(f"    {d['case']:>20} {d['stage']:>22}: {d['baseline_s']:.3f}s -> {d['current_s']:.3f}s "
+                  f"({ratio}){flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# src/benchmarks/bench_unpivot.py
+"""
+Ingest a synthetic CMS wide CSV (one column group per payer/plan) through the chunked
+pandas and Arrow engines, which unpivot it to tall rows. Each engine runs in a fresh
+process so peak RSS is measured independently.
+Run:
+    python -m src.benchmarks.bench_unpivot --items 20000 --payers 500
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.benchmarks.bench_chunked_ingest import META_HEADER, META_VALUES
+
+
+def write_synthetic_wide_csv(path: Path, items: int, payers: int, fill: float = 0.5, seed: int = 0) -> int:
+    """Wide CSV with negotiated_dollar + estimated_amount per payer; returns the expected tall row count."""
+    rng = np.random.default_rng(seed)
+    groups = [(f"Payer {i}", f"Plan {i % 3}") for i in range(payers)]
+    header = ["description", "code|1", "code|1|type", "setting", "standard_charge|gross"]
+    for payer, plan in groups:
+        header += [f"standard_charge|{payer}|{plan}|negotiated_dollar", f"estimated_amount|{payer}|{plan}"]
+    expected = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(META_HEADER)
+        w.writerow(META_VALUES)
+        w.writerow(header)
+        for i in range(items):
+            filled = rng.random(payers) < fill
+            expected += max(int(filled.sum()), 1)
+            row = [f"Procedure {i}", str(10000 + i), "CPT", "outpatient", f"{1000 + i % 997}.00"]
+            for j in range(payers):
+                row += [f"{500 + (i + j) % 499}.25", f"{400 + j % 7}"] if filled[j] else ["", ""]
+            w.writerow(row)
+    return expected
+
+
+def _run(engine: str, csv_path: str, out_path: str, chunk_rows: int) -> dict:
+    from src.utils import peak_rss_mb
+    from src.ingest import write_parquet_chunked
+    from src.arrow_pipeline import write_parquet_arrow
+
+    start = time.perf_counter()
+    if engine == "arrow":
+        rows = write_parquet_arrow(Path(csv_path), Path(out_path), chunk_rows=chunk_rows)
+    else:
+        rows = write_parquet_chunked(Path(csv_path), Path(out_path), chunk_rows=chunk_rows)
+    elapsed = time.perf_counter() - start
+    return {"engine": engine, "rows": rows, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--payers", type=int, default=500)
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "wide_standardcharges.csv"
+        expected = write_synthetic_wide_csv(csv_path, args.items, args.payers)
+        print(f"Input: {args.items} items x {args.payers} payers ({2 * args.payers + 5} columns), "
+              f"{csv_path.stat().st_size / 2**20:.0f} MB -> {expected:,} tall rows")
+        for engine in ["pandas", "arrow"]:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                res = pool.submit(_run, engine, str(csv_path), str(Path(tmp) / f"{engine}.parquet"),
+                                  args.chunk_rows).result()
+            assert res["rows"] == expected, (res["rows"], expected)
+            print(f"{engine:>7}: {res['rows']:,} rows in {res['seconds']:.1f}s "
+                  f"({res['rows'] / res['seconds']:,.0f} rows/s), peak RSS {res['peak_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# src/benchmarks/synthetic_mrf.py
+"""
+Synthetic hospital price transparency files in every format read_generic handles.
+
+write_synthetic_mrf writes one hospital's file - CMS-style metadata rows on top, then
+charges - as a tall CSV/XLSX (one row per item x payer/plan), a wide CSV/XLSX (one
+column group per payer/plan) or a nested CMS JSON file. Money cells are deliberately
+messy ("$1,234.50", "1234.5*", " 980 ", "other", "N/A", blanks), a share of items have
+no payer rates (gross/cash-only rows), and output is generated in blocks and streamed,
+so sizes from 1K to 100M rows run in bounded memory. Workbooks past Excel's row limit
+continue on further sheets. The return value is the number of canonical (tall) rows
+the ingest should produce, so callers can check it.
+Run:
+    python -m src.benchmarks.synthetic_mrf --format csv --layout wide --rows 1000000 --out data
+"""
+import argparse
+import csv
+import json
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+FORMATS = ["csv", "json", "xlsx"]
+LAYOUTS = ["tall", "wide"]
+
+HOSPITALS = [
+    ("Beebe Healthcare", "424 Savannah Rd, Lewes, DE 19958"),
+    ("ChristianaCare Newark", "4755 Ogletown-Stanton Rd, Newark, DE 19718"),
+    ("Bayhealth Kent Campus", "640 S State St, Dover, DE 19901"),
+    ("Penn Presbyterian", "51 N 39th St, Philadelphia, PA 19104"),
+    ("Cooper University Hospital", "1 Cooper Plaza, Camden, NJ 08103"),
+    ("Johns Hopkins Bayview", "4940 Eastern Ave, Baltimore, MD 21224"),
+]
+PAYERS = ["Aetna", "Cigna", "UnitedHealthcare", "Highmark BCBS", "Humana", "AmeriHealth Caritas",
+          "Medicare Advantage", "Delaware First Health", "Anthem", "Tricare"]
+PLANS = ["PPO", "HMO", "EPO", "POS", "Commercial", "Medicare"]
+CODE_TYPES = ["CPT", "HCPCS", "MS-DRG", "RC", "NDC"]
+SETTINGS = ["inpatient", "outpatient", "both"]
+BILLING_CLASSES = ["facility", "professional"]
+METHODOLOGIES = ["fee schedule", "case rate", "percent of total billed charges", "per diem"]
+PROCEDURES = ["MRI brain w/o contrast", "CT abdomen w/ contrast", "Office visit est. patient",
+              "Comprehensive metabolic panel", "Chest x-ray 2 views", "Colonoscopy w/ biopsy",
+              "Knee arthroscopy", "Emergency dept visit level 4", "Physical therapy eval", "Normal delivery"]
+
+META_HEADER = ["hospital_name", "last_updated_on", "version", "hospital_location", "hospital_address",
+               "license_number|DE"]
+TALL_HEADER = [
+    "description", "code|1", "code|1|type", "code|2", "code|2|type", "modifiers", "setting", "billing_class",
+    "standard_charge|gross", "standard_charge|discounted_cash", "payer_name", "plan_name",
+    "standard_charge|negotiated_dollar", "standard_charge|negotiated_percentage", "standard_charge|methodology",
+    "standard_charge|min", "standard_charge|max", "estimated_amount", "additional_generic_notes",
+]
+WIDE_BASE_HEADER = ["description", "code|1", "code|1|type", "setting", "billing_class",
+                    "standard_charge|gross", "standard_charge|discounted_cash",
+                    "standard_charge|min", "standard_charge|max"]
+
+# rows written per generated block
+BLOCK_ROWS = 10_000
+# Excel's hard per-sheet row limit
+XLSX_MAX_ROWS = 1_048_576
+# share of items with no negotiated rates, and of wide payer cells left empty
+NO_PAYER_SHARE = 0.1
+WIDE_FILL = 0.7
+
+
+def payer_groups(payers: int) -> List[Tuple[str, str]]:
+    return [(PAYERS[i % len(PAYERS)] + (f" {i // len(PAYERS)}" if i >= len(PAYERS) else ""),
+             PLANS[i % len(PLANS)]) for i in range(payers)]
+
+
+def messy_money(values: np.ndarray, rng: np.random.Generator) -> List[str]:
+    """Format amounts the way real files do: mostly plain, some with $/commas/footnotes, some sentinels."""
+    kinds = rng.integers(0, 100, len(values))
+    out = []
+    for v, k in zip(values.tolist(), kinds.tolist()):
+        if k < 55:
+            out.append(f"{v:.2f}")
+        elif k < 75:
+            out.append(f"${v:,.2f}")
+        elif k < 82:
+            out.append(f"{v:g}*")
+        elif k < 88:
+            out.append(f" {v:.0f} ")
+        elif k < 92:
+            out.append("other")
+        elif k < 95:
+            out.append("N/A")
+        else:
+            out.append("")
+    return out
+
+
+def _meta_rows(hospital: int) -> List[List[str]]:
+    name, address = HOSPITALS[hospital % len(HOSPITALS)]
+    return [META_HEADER, [name, "2025-07-01", "2.2.0", name.split()[0] + " Campus", address, f"{1000 + hospital}"]]
+
+
+def _items(rng: np.random.Generator, start: int, n: int) -> dict:
+    """Columns shared by both layouts for items start..start+n (vectorized per block)."""
+    idx = np.arange(start, start + n)
+    gross = np.round(rng.lognormal(7, 1.2, n), 2)
+    return {
+        "description": [f"{PROCEDURES[i % len(PROCEDURES)]} #{i}" for i in idx.tolist()],
+        "code": [str(10000 + i % 90000) for i in idx.tolist()],
+        "code_type": [CODE_TYPES[i % len(CODE_TYPES)] for i in idx.tolist()],
+        "setting": [SETTINGS[i % len(SETTINGS)] for i in idx.tolist()],
+        "billing_class": [BILLING_CLASSES[i % 2] for i in idx.tolist()],
+        "gross": gross,
+        "cash": np.round(gross * 0.6, 2),
+        "min": np.round(gross * 0.3, 2),
+        "max": np.round(gross * 0.9, 2),
+    }
+
+
+def _tall_rows(rows: int, payers: int, rng: np.random.Generator) -> Iterator[List[List[str]]]:
+    """Blocks of tall rows: each item has one row per payer/plan (or one payer-less row)."""
+    groups = payer_groups(payers)
+    written, item = 0, 0
+    while written < rows:
+        n_items = max(1, min(BLOCK_ROWS, rows - written) // payers + 1)
+        items = _items(rng, item, n_items)
+        g, c, lo, hi = (messy_money(items[k], rng) for k in ("gross", "cash", "min", "max"))
+        block = []
+        for j in range(n_items):
+            base = [items["description"][j], items["code"][j], items["code_type"][j],
+                    str(int(items["code"][j]) % 1000), "RC", "", items["setting"][j], items["billing_class"][j],
+                    g[j], c[j]]
+            tail = [lo[j], hi[j]]
+            if (item + j) % int(1 / NO_PAYER_SHARE) == 0:
+                block.append(base + ["", "", "", "", "", *tail, "", "cash price only"])
+                continue
+            rates = messy_money(items["gross"][j] * rng.uniform(0.2, 0.8, payers), rng)
+            for k, (payer, plan) in enumerate(groups):
+                block.append(base + [payer, plan, rates[k], f"{40 + k % 50}" if k % 4 == 0 else "",
+                                     METHODOLOGIES[k % len(METHODOLOGIES)], *tail, rates[k], ""])
+        block = block[: rows - written]
+        written += len(block)
+        item += n_items
+        yield block
+
+
+def _wide_rows(rows: int, payers: int, rng: np.random.Generator) -> Iterator[Tuple[List[List[str]], int]]:
+    """Blocks of wide rows and the tall rows each block unpivots to; stops at >= rows tall rows."""
+    tall, item = 0, 0
+    while tall < rows:
+        n_items = min(BLOCK_ROWS, max(1, int((rows - tall) / (payers * WIDE_FILL))))
+        items = _items(rng, item, n_items)
+        g, c, lo, hi = (messy_money(items[k], rng) for k in ("gross", "cash", "min", "max"))
+        block, expected = [], 0
+        for j in range(n_items):
+            filled = rng.random(payers) < WIDE_FILL
+            if (item + j) % int(1 / NO_PAYER_SHARE) == 0:
+                filled[:] = False
+            dollars = messy_money(items["gross"][j] * rng.uniform(0.2, 0.8, payers), rng)
+            row = [items["description"][j], items["code"][j], items["code_type"][j], items["setting"][j],
+                   items["billing_class"][j], g[j], c[j], lo[j], hi[j]]
+            for k in range(payers):
+                # the methodology cell keeps a filled payer/plan even when its dollar cell is blank
+                row += [dollars[k], METHODOLOGIES[k % len(METHODOLOGIES)]] if filled[k] else ["", ""]
+            expected += max(int(filled.sum()), 1)
+            block.append(row)
+        tall += expected
+        item += n_items
+        yield block, expected
+
+
+def _wide_header(payers: int) -> List[str]:
+    header = list(WIDE_BASE_HEADER)
+    for payer, plan in payer_groups(payers):
+        header += [f"standard_charge|{payer}|{plan}|negotiated_dollar", f"standard_charge|{payer}|{plan}|methodology"]
+    return header
+
+
+def _write_csv(path: Path, layout: str, rows: int, payers: int, rng: np.random.Generator, hospital: int) -> int:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerows(_meta_rows(hospital))
+        if layout == "tall":
+            w.writerow(TALL_HEADER)
+            for block in _tall_rows(rows, payers, rng):
+                w.writerows(block)
+            return rows
+        w.writerow(_wide_header(payers))
+        expected = 0
+        for block, n in _wide_rows(rows, payers, rng):
+            w.writerows(block)
+            expected += n
+        return expected
+
+
+def _write_xlsx(path: Path, layout: str, rows: int, payers: int, rng: np.random.Generator, hospital: int) -> int:
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    header = TALL_HEADER if layout == "tall" else _wide_header(payers)
+    state = {"ws": None, "used": 0, "sheets": 0}
+
+    def _append(row):
+        if state["ws"] is None or state["used"] >= XLSX_MAX_ROWS:
+            state["sheets"] += 1
+            state["ws"] = wb.create_sheet(f"standard_charges_{state['sheets']}")
+            state["used"] = 0
+            if state["sheets"] == 1:
+                for meta in _meta_rows(hospital):
+                    state["ws"].append(meta)
+                    state["used"] += 1
+            state["ws"].append(header)
+            state["used"] += 1
+        state["ws"].append(row)
+        state["used"] += 1
+
+    expected = 0
+    if layout == "tall":
+        for block in _tall_rows(rows, payers, rng):
+            for row in block:
+                _append(row)
+        expected = rows
+    else:
+        for block, n in _wide_rows(rows, payers, rng):
+            for row in block:
+                _append(row)
+            expected += n
+    wb.save(path)
+    return expected
+
+
+def _write_json(path: Path, rows: int, payers: int, rng: np.random.Generator, hospital: int) -> int:
+    """Nested CMS JSON (v2 layout): one standard_charge_information item per code."""
+    name, address = HOSPITALS[hospital % len(HOSPITALS)]
+    top = {"hospital_name": name, "last_updated_on": "2025-07-01", "version": "2.2.0",
+           "hospital_location": [name.split()[0] + " Campus"], "hospital_address": [address],
+           "license_information": {"license_number": f"{1000 + hospital}", "state": "DE"}}
+    groups = payer_groups(payers)
+    expected, item = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(top)[:-1] + ', "standard_charge_information": [')
+        first = True
+        while expected < rows:
+            n_items = min(BLOCK_ROWS, max(1, (rows - expected) // payers + 1))
+            items = _items(rng, item, n_items)
+            for j in range(n_items):
+                if expected >= rows:
+                    break
+                take = 0 if (item + j) % int(1 / NO_PAYER_SHARE) == 0 else min(payers, rows - expected)
+                rates = items["gross"][j] * rng.uniform(0.2, 0.8, take)
+                payers_info = [{"payer_name": p, "plan_name": pl, "standard_charge_dollar": round(float(r), 2),
+                                "methodology": METHODOLOGIES[k % len(METHODOLOGIES)]}
+                               for k, ((p, pl), r) in enumerate(zip(groups[:take], rates))]
+                record = {
+                    "description": items["description"][j],
+                    "code_information": [{"code": items["code"][j], "type": items["code_type"][j]}],
+                    "standard_charges": [{
+                        "setting": items["setting"][j], "billing_class": items["billing_class"][j],
+                        "gross_charge": float(items["gross"][j]), "discounted_cash": float(items["cash"][j]),
+                        "minimum": float(items["min"][j]), "maximum": float(items["max"][j]),
+                        "payers_information": payers_info,
+                    }],
+                }
+                f.write(("" if first else ",") + json.dumps(record))
+                first = False
+                expected += max(take, 1)
+            item += n_items
+        f.write("]}")
+    return expected
+
+
+def write_synthetic_mrf(path: Path, fmt: str = "csv", layout: str = "tall", rows: int = 1000,
+                        payers: int = 20, seed: int = 0, hospital: int = 0) -> int:
+    """
+    Write a synthetic MRF to path and return the number of canonical rows it ingests to.
+    JSON is always the nested CMS layout (its payers_information is neither tall nor wide).
+    """
+    if fmt not in FORMATS or layout not in LAYOUTS:
+        raise ValueError(f"Unsupported format/layout: {fmt}/{layout}")
+    rng = np.random.default_rng(seed)
+    path = Path(path)
+    if fmt == "csv":
+        return _write_csv(path, layout, rows, payers, rng, hospital)
+    if fmt == "xlsx":
+        return _write_xlsx(path, layout, rows, payers, rng, hospital)
+    return _write_json(path, rows, payers, rng, hospital)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="tall")
+    parser.add_argument("--rows", type=int, default=1000, help="canonical (tall) rows to generate")
+    parser.add_argument("--payers", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hospital", type=int, default=0, help="which synthetic hospital (name/address/state)")
+    parser.add_argument("--out", type=Path, default=Path("data"),
+                        help="where to write the file (default: data, the directory the ingest reads)")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    name = f"synthetic_{args.hospital}_{args.layout}_{args.rows}_standardcharges.{args.format}"
+    expected = write_synthetic_mrf(args.out / name, args.format, args.layout, args.rows, args.payers,
+                                   args.seed, args.hospital)
+    print(f"Wrote {args.out / name} ({(args.out / name).stat().st_size / 2**20:.1f} MB, {expected:,} canonical rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# src/cache.py
+"""
+Content-addressed cache for ingest outputs.
+
+An entry is keyed on the raw file's SHA-256 and name (every engine writes the name into
+the output's source_file column), the ingest mode and a version stamp covering
+the canonical schema (CANONICAL_COLUMNS/COMMON_REMAP) and the source of the modules that
+shape the output, so a schema or code change invalidates everything. Each entry is a
+`<key>.parquet` plus a `<key>.json` sidecar whose mtime is bumped on every hit; eviction
+removes least-recently-used entries. There is no shared index, so parallel ingest workers
+can read and write entries without locking.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.transform import CANONICAL_COLUMNS, COMMON_REMAP
+from src.utils import file_sha256
+
+# modules whose code determines the Parquet output
+CODE_MODULES = ["ingest.py", "transform.py", "utils.py", "json_stream.py", "arrow_pipeline.py", "unpivot.py",
+                "duckdb_pipeline.py", "sniff.py", "columns.py", "sql.py"]
+
+
+@lru_cache(maxsize=None)
+def version_stamp() -> str:
+    """Hash of the canonical schema plus the source of CODE_MODULES."""
+    h = hashlib.sha256()
+    h.update(json.dumps([CANONICAL_COLUMNS, COMMON_REMAP], sort_keys=True).encode("utf-8"))
+    src_dir = Path(__file__).parent
+    for name in CODE_MODULES:
+        h.update((src_dir / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def raw_file_hash(file: Path, cache_dir: Path) -> str:
+    """
+    SHA-256 of a raw file, memoized on (size, mtime) under cache_dir/hashes so unchanged
+    multi-GB inputs are not re-read on every run.
+    """
+    st = file.stat()
+    memo = cache_dir / "hashes" / (hashlib.sha256(str(file.resolve()).encode("utf-8")).hexdigest() + ".json")
+    try:
+        m = json.loads(memo.read_text(encoding="utf-8"))
+        if m["size"] == st.st_size and m["mtime"] == st.st_mtime:
+            return m["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+    digest = file_sha256(file)
+    memo.parent.mkdir(parents=True, exist_ok=True)
+    _write_json_atomic(memo, {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest})
+    return digest
+
+
+def cache_key(file: Path, cache_dir: Path, mode: str) -> str:
+    """
+    Cache key for one raw file under the given ingest mode (e.g. 'chunked', 'demo'). The
+    name is part of it: identical bytes under another name produce a different source_file.
+    """
+    key = f"{raw_file_hash(file, cache_dir)}|{file.name}|{mode}|{version_stamp()}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def lookup(cache_dir: Path, key: str) -> Optional[Path]:
+    """Return the cached Parquet for key (marking it recently used), or None on a miss."""
+    parquet, meta = cache_dir / f"{key}.parquet", cache_dir / f"{key}.json"
+    if not (parquet.exists() and meta.exists()):
+        return None
+    os.utime(meta)
+    return parquet
+
+
+def store(cache_dir: Path, key: str, parquet_path: Path, source: Path) -> None:
+    """Add parquet_path to the cache under key (hard link when possible, else copy)."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_dir / f"{key}.{os.getpid()}.tmp"
+    _link_or_copy(parquet_path, tmp)
+    os.replace(tmp, cache_dir / f"{key}.parquet")
+    _write_json_atomic(cache_dir / f"{key}.json", {
+        "source": str(source), "size": parquet_path.stat().st_size, "created": time.time(),
+    })
+
+
+def restore(cached: Path, out_path: Path) -> bool:
+    """
+    Put a cached Parquet at out_path. Returns False if out_path already is that file
+    (nothing written, so downstream mtime checks see it as unchanged).
+    """
+    if out_path.exists():
+        if os.path.samefile(cached, out_path):
+            return False
+        out_path.unlink()
+    _link_or_copy(cached, out_path)
+    return True
+
+
+def entries(cache_dir: Path) -> List[Dict]:
+    """All cache entries as {"key", "size", "last_used"} dicts."""
+    out = []
+    for meta in cache_dir.glob("*.json"):
+        parquet = meta.with_suffix(".parquet")
+        if parquet.exists():
+            out.append({"key": meta.stem, "size": parquet.stat().st_size, "last_used": meta.stat().st_mtime})
+    return out
+
+
+def evict(cache_dir: Path, max_bytes: int) -> List[str]:
+    """Delete least-recently-used entries until the cache fits in max_bytes; returns evicted keys."""
+    items = sorted(entries(cache_dir), key=lambda e: e["last_used"])
+    total = sum(e["size"] for e in items)
+    evicted = []
+    for e in items:
+        if total <= max_bytes:
+            break
+        for suffix in (".json", ".parquet"):
+            (cache_dir / f"{e['key']}{suffix}").unlink(missing_ok=True)
+        total -= e["size"]
+        evicted.append(e["key"])
+    return evicted
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _write_json_atomic(path: Path, obj: Dict) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj), encoding="utf-8")
+    os.replace(tmp, path)
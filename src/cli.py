@@ -0,0 +1,208 @@
+# src/cli.py
+"""
+One entry point for every pipeline stage, run in a single process:
+
+    python -m src.cli ingest      raw files in the data dir -> canonical Parquet
+    python -m src.cli transform   Parquet -> state-partitioned, sorted dataset (src.layout)
+    python -m src.cli load        Parquet -> DuckDB (incremental unless --full-rebuild)
+    python -m src.cli run-all     ingest, then load (--with-dataset: transform in between)
+    python -m src.cli bench NAME  src/benchmarks/bench_NAME.py with the remaining arguments
+
+Building the parser imports nothing beyond the standard library; each command imports its
+stage (pandas, pyarrow, duckdb, tqdm, ...) only when it runs, so `--help` returns at once and
+a no-op incremental load never loads pandas. Paths come from src.config's environment
+variables; --data-dir / --processed-dir / --db-path (given before the command) set them.
+`python -m src.ingest`, `python -m src.load_duckdb` and `python -m src.layout` still work
+and take the same flags as their commands.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent / "benchmarks"
+
+# global flag -> the src.config environment variable it sets
+PATH_FLAGS = {
+    "data_dir": "HOSPITAL_ETL_DATA_DIR",
+    "processed_dir": "HOSPITAL_ETL_PROCESSED_DIR",
+    "db_path": "HOSPITAL_ETL_DUCKDB_PATH",
+}
+
+
+def _ingest_arguments(parser: argparse.ArgumentParser, report: bool = True) -> None:
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream files in chunks of this many rows (bounded memory)")
+    parser.add_argument("--engine", choices=["pandas", "arrow", "duckdb"], default="pandas",
+                        help="arrow: Arrow-native read/transform/write of the full file; "
+                             "duckdb: transform CSVs in SQL, spilling to disk as needed")
+    parser.add_argument("--duckdb-memory-limit", default=None,
+                        help="memory cap of each --engine duckdb transform (e.g. 4GB); beyond it DuckDB "
+                             "spills to a temporary directory (default: DuckDB's own, 80%% of RAM)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of files to convert in parallel (0 = one per CPU)")
+    parser.add_argument("--file-timeout", type=float, default=None,
+                        help="kill and report any single file that takes longer than this many seconds")
+    parser.add_argument("--cache-dir", type=Path, default=None,
+                        help="ingest cache location, unchanged raw files skip parsing "
+                             "(default: $HOSPITAL_ETL_CACHE_DIR or <data dir>/cache)")
+    parser.add_argument("--no-cache", action="store_true", help="always re-parse every file")
+    parser.add_argument("--cache-max-gb", type=float, default=20.0,
+                        help="evict least recently used cache entries beyond this size")
+    if report:
+        parser.add_argument("--report", type=Path, default=None,
+                            help="write per-file, per-stage timings to this .json or .csv file")
+    parser.add_argument("--profile-dir", type=Path, default=None,
+                        help="write a cProfile dump per file (<name>.prof) to this directory")
+    parser.add_argument("--categorical", action="store_true",
+                        help="dictionary-encode low-cardinality columns (payer_name, state, ...) in memory and Parquet")
+    parser.add_argument("--pipeline-workers", type=int, default=0,
+                        help="overlap read / transform / Parquet write within each file, with this many "
+                             "transform threads (pandas chunked and arrow engines); reports queue depths")
+
+
+def _load_arguments(parser: argparse.ArgumentParser, report: bool = True) -> None:
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="drop and rebuild hospital_charges from every Parquet file")
+    parser.add_argument("--create-indexes", action="store_true",
+                        help="also build ART indexes on code_1, payer_name and hospital_name")
+    if report:
+        parser.add_argument("--report", type=Path, default=None,
+                            help="write per-file load timings to this .json or .csv file")
+    parser.add_argument("--no-summaries", action="store_true",
+                        help="skip building/refreshing the price_summary table")
+    parser.add_argument("--no-search-index", action="store_true",
+                        help="skip building the procedure search index")
+    parser.add_argument("--schema", choices=["flat", "star"], default=None,
+                        help="storage layout: one wide table (flat) or dimension + fact tables behind a "
+                             "hospital_charges view (star); default: keep the current one (flat if new)")
+
+
+def _transform_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--row-group-size", type=int, default=None,
+                        help="rows per Parquet row group (default: DuckDB's own, 122880)")
+
+
+def benchmarks() -> List[str]:
+    """Names accepted by `bench` (src/benchmarks/bench_<name>.py)."""
+    return sorted(p.stem[len("bench_"):] for p in BENCH_DIR.glob("bench_*.py"))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli",
+                                     description="Hospital price transparency ETL: ingest, transform, load, bench.")
+    parser.add_argument("--data-dir", type=Path, default=None,
+                        help="raw hospital files (default: $HOSPITAL_ETL_DATA_DIR or ./data)")
+    parser.add_argument("--processed-dir", type=Path, default=None,
+                        help="Parquet output (default: $HOSPITAL_ETL_PROCESSED_DIR or <data dir>/processed)")
+    parser.add_argument("--db-path", type=Path, default=None,
+                        help="DuckDB database (default: $HOSPITAL_ETL_DUCKDB_PATH or "
+                             "<processed dir>/hospitals.duckdb)")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    _ingest_arguments(commands.add_parser("ingest", help="convert raw hospital files to Parquet"))
+    _transform_arguments(commands.add_parser("transform", help="build the state-partitioned, sorted Parquet dataset"))
+    _load_arguments(commands.add_parser("load", help="load processed Parquet files into DuckDB"))
+
+    run_all = commands.add_parser("run-all", help="ingest, then load, in one process")
+    _ingest_arguments(run_all, report=False)
+    _load_arguments(run_all, report=False)
+    run_all.add_argument("--with-dataset", action="store_true",
+                         help="also build the partitioned Parquet dataset between ingest and load")
+    _transform_arguments(run_all)
+    run_all.add_argument("--report-dir", type=Path, default=None,
+                         help="write ingest.json and load.json run reports here")
+
+    bench = commands.add_parser("bench", help="run a benchmark (arguments after NAME go to it)")
+    bench.add_argument("name", choices=benchmarks(), metavar="NAME", help=", ".join(benchmarks()))
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER)
+    return parser
+
+
+def _configure(args: argparse.Namespace) -> None:
+    """Export the global path flags for src.config (read when the first stage module is imported)."""
+    if "src.config" in sys.modules and any(getattr(args, flag) for flag in PATH_FLAGS):
+        raise RuntimeError("path flags must be applied before src.config is imported")
+    for flag, var in PATH_FLAGS.items():
+        value = getattr(args, flag)
+        if value is not None:
+            os.environ[var] = str(value)
+
+
+def run_ingest(args: argparse.Namespace, report: Optional[Path]) -> List[Path]:
+    from src.config import CACHE_DIR
+    from src.ingest import run_ingest as ingest
+
+    workers = args.workers or os.cpu_count() or 1
+    results = ingest(chunk_rows=args.chunk_rows, workers=workers, file_timeout=args.file_timeout,
+                     cache_dir=None if args.no_cache else args.cache_dir or CACHE_DIR,
+                     cache_max_bytes=int(args.cache_max_gb * 2**30), engine=args.engine,
+                     report=report, profile_dir=args.profile_dir, categorical=args.categorical,
+                     pipeline_workers=args.pipeline_workers, duckdb_memory_limit=args.duckdb_memory_limit)
+    for r in results:
+        if r["status"] in {"failed", "timeout"}:
+            print(f"{r['status'].upper()} {r['file']}: {r['error']}")
+    parquet_files = [r["parquet"] for r in results if r["status"] == "ok"]
+    print(f"Done. {len(parquet_files)} ok, "
+          f"{sum(r['status'] == 'skipped' for r in results)} skipped, "
+          f"{sum(r['status'] in {'failed', 'timeout'} for r in results)} failed. Parquet files: {parquet_files}")
+    return parquet_files
+
+
+def run_transform(args: argparse.Namespace) -> int:
+    from src.config import PROCESSED_DIR
+    from src.layout import DATASET_DIR, ROW_GROUP_SIZE, write_partitioned_dataset
+
+    files = sorted(str(f) for f in PROCESSED_DIR.glob("*.parquet"))
+    if not files:
+        raise FileNotFoundError(f"No parquet files found in {PROCESSED_DIR}")
+    rows = write_partitioned_dataset(files, DATASET_DIR, row_group_size=args.row_group_size or ROW_GROUP_SIZE)
+    print(f"Wrote {rows} rows to {DATASET_DIR}")
+    return rows
+
+
+def run_load(args: argparse.Namespace, report: Optional[Path]) -> None:
+    from src.load_duckdb import create_unified_table, load_incremental
+
+    options = dict(indexes=args.create_indexes, report=report, summaries=not args.no_summaries,
+                   search=not args.no_search_index, schema=args.schema)
+    if args.full_rebuild:
+        create_unified_table(**options)
+    else:
+        load_incremental(**options)
+
+
+def run_bench(args: argparse.Namespace) -> None:
+    import importlib
+
+    module = importlib.import_module(f"src.benchmarks.bench_{args.name}")
+    # benchmarks parse sys.argv themselves
+    sys.argv = [f"{sys.argv[0]} bench {args.name}", *args.bench_args]
+    module.main()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    _configure(args)
+    if args.command == "ingest":
+        run_ingest(args, args.report)
+    elif args.command == "transform":
+        run_transform(args)
+    elif args.command == "load":
+        run_load(args, args.report)
+    elif args.command == "run-all":
+        started = time.perf_counter()
+        reports = args.report_dir
+        run_ingest(args, reports / "ingest.json" if reports else None)
+        if args.with_dataset:
+            run_transform(args)
+        run_load(args, reports / "load.json" if reports else None)
+        print(f"run-all finished in {time.perf_counter() - started:.1f}s")
+    elif args.command == "bench":
+        run_bench(args)
+
+
+if __name__ == "__main__":
+    main()
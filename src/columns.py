@@ -0,0 +1,33 @@
+# src/columns.py
+"""
+The canonical column layout, kept free of pandas / pyarrow so the DuckDB load path and the
+CLI can use it without paying for those imports (src.transform re-exports these names).
+"""
+from typing import List
+
+CANONICAL_COLUMNS = [
+    # metadata
+    "hospital_name", "last_updated_on", "version", "hospital_location", "hospital_address", "license_number",
+    # main data
+    "description", "code_1", "code_1_type", "code_2", "code_2_type", "code_3", "code_3_type",
+    "billing_class", "setting", "modifiers", "drug_unit_of_measurement", "drug_type_of_measurement",
+    "standard_charge_gross", "standard_charge_discounted_cash", "payer_name", "plan_name",
+    "standard_charge_negotiated_dollar", "standard_charge_negotiated_percentage",
+    "standard_charge_negotiated_algorithm", "estimated_amount", "standard_charge_methodology",
+    "standard_charge_min", "standard_charge_max", "additional_generic_notes",
+    # bookkeeping
+    "source_file", "state"
+]
+
+# substrings that mark a column as money-like (numeric after cleaning)
+MONEY_TOKENS = ["charge", "amount", "estimated", "min", "max"]
+
+def money_columns(columns) -> List[str]:
+    """Return the subset of column names that clean_money_columns converts to floats."""
+    return [c for c in columns if any(tok in c for tok in MONEY_TOKENS)]
+
+MONEY_COLUMNS = set(money_columns(CANONICAL_COLUMNS))
+
+# what float() accepts once everything but digits, '.', '-', 'e' and 'E' is stripped
+# (parse_money_arrow and the DuckDB engine's money_sql test values against it)
+FLOAT_RE = r"^-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE]-?[0-9]+)?$"
@@ -1,15 +1,24 @@
 # src/config.py
-from pathlib import Path
+"""
+Pipeline paths, from environment variables (relative defaults resolve against the working
+directory, so the same settings work on Windows and Linux):
 
-# Base directory -- change if you put the repo somewhere else
-BASE_DIR = Path(r"D:\ML_Projects\DE_hospital_price_transparency")
+    HOSPITAL_ETL_DATA_DIR       raw hospital files      default: data
+    HOSPITAL_ETL_PROCESSED_DIR  canonical Parquet       default: <data dir>/processed
+    HOSPITAL_ETL_CACHE_DIR      ingest cache            default: <data dir>/cache
+    HOSPITAL_ETL_DUCKDB_PATH    DuckDB database         default: <processed dir>/hospitals.duckdb
 
-RAW_DATA_DIR = BASE_DIR / "data"
-PROCESSED_DIR = BASE_DIR / "data" / "processed"
-PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+Importing this module has no side effects; each stage creates the directories it writes to.
+src.cli's --data-dir / --processed-dir / --db-path flags set these variables before any
+stage module is imported.
+"""
+import os
+from pathlib import Path
 
-# DuckDB file
-DUCKDB_PATH = PROCESSED_DIR / "mrf.duckdb"
+DATA_DIR = Path(os.environ.get("HOSPITAL_ETL_DATA_DIR", "data"))
+PROCESSED_DIR = Path(os.environ.get("HOSPITAL_ETL_PROCESSED_DIR", DATA_DIR / "processed"))
+CACHE_DIR = Path(os.environ.get("HOSPITAL_ETL_CACHE_DIR", DATA_DIR / "cache"))
+DUCKDB_PATH = Path(os.environ.get("HOSPITAL_ETL_DUCKDB_PATH", PROCESSED_DIR / "hospitals.duckdb"))
 
 # For demo runs, limit nrows to 100; set to None or a larger value for full run
 DEMO_NROWS = 100
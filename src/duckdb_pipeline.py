@@ -0,0 +1,186 @@
+# src/duckdb_pipeline.py
+"""
+DuckDB-native transform engine: unify_record semantics compiled into one SQL statement
+per raw CSV and run by DuckDB's multithreaded vectorized engine.
+
+build_unify_sql reads the file with read_csv (skipping to the sniffed header, every
+column VARCHAR, pandas' NA markers as NULL, malformed rows set aside in DuckDB's
+reject_errors table and counted) and selects CANONICAL_COLUMNS by the
+positions of the file's compiled SchemaPlan, so COMMON_REMAP and the token heuristics
+are shared with the other engines. Metadata is filled as in unify_record, money columns
+use parse_money_arrow's strip regex and float pattern, and state uses
+extract_state_from_address's patterns (evaluated in Python when the address is a
+metadata constant). write_parquet_duckdb streams the result to Parquet with COPY; the
+connection has a temp directory (and optionally a memory limit), so sorts and buffers
+spill to disk instead of running out of memory. Wide CSVs, JSON and Excel files go
+through the Arrow engine.
+"""
+import os
+import tempfile
+import warnings
+from pathlib import Path
+from typing import Dict, Optional
+
+import duckdb
+
+from src.arrow_pipeline import METADATA_FIELDS, write_parquet_arrow
+from src.columns import FLOAT_RE, MONEY_COLUMNS
+from src.profiling import stage
+from src.transform import CANONICAL_COLUMNS, compile_schema_plan, extract_state_from_address
+from src.unpivot import parse_wide_header
+from src.sniff import CsvSniff, sniff_csv
+from src.sql import literal
+from src.utils import DEFAULT_CHUNK_ROWS, extract_metadata_from_lines, normalize_colname
+
+# strings pandas' read_csv reads as NaN by default (read_generic/iter_csv_chunks semantics)
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def money_sql(expr: str) -> str:
+    """parse_money in SQL: strip everything but digits, '.', '-', 'e', 'E'; keep what float() accepts."""
+    cleaned = f"regexp_replace({expr}, '[^0-9.\\-eE]', '', 'g')"
+    return f"CASE WHEN regexp_matches({cleaned}, '{FLOAT_RE}') THEN CAST({cleaned} AS DOUBLE) END"
+
+
+def state_sql(expr: str) -> str:
+    """extract_state_from_address in SQL: ', <City>, <ST>' first, else the last two-letter uppercase token."""
+    return (f"COALESCE(NULLIF(regexp_extract({expr}, ',\\s*([A-Za-z .]+),\\s*([A-Z]{{2}})\\b', 2), ''), "
+            f"regexp_extract_all({expr}, '\\b([A-Z]{{2}})\\b', 1)[-1])")
+
+
+def read_csv_sql(file_path: Path, skip: int, n_columns: int, delimiter: str = ",",
+                 quotechar: str = '"') -> str:
+    """
+    read_csv over the rows after the first `skip` lines, as columns c0..c<n-1>, all VARCHAR.
+    Rows read_csv can't parse (e.g. more fields than the header) are stored in reject_errors.
+    """
+    columns = "{" + ", ".join(f"'c{i}': 'VARCHAR'" for i in range(n_columns)) + "}"
+    nulls = "[" + ", ".join(literal(v) for v in NA_VALUES) + "]"
+    return (f"read_csv({literal(str(file_path))}, skip = {skip}, header = false, "
+            f"auto_detect = false, delim = {literal(delimiter)}, quote = {literal(quotechar)}, "
+            f"escape = {literal(quotechar)}, columns = {columns}, "
+            f"nullstr = {nulls}, null_padding = true, store_rejects = true)")
+
+
+def skip_lines(con: duckdb.DuckDBPyConnection, file_path: Path, sniff: CsvSniff) -> int:
+    """
+    Lines read_csv must skip to start at the first data row. sniff.header_idx counts
+    records; when a quoted field above the data spans several physical lines, the two
+    counts differ and DuckDB versions disagree on which one skip means, so the count
+    whose last skipped row reads back as the sniffed header is used.
+    """
+    logical = sniff.header_idx + 1
+    physical = sum(line.count("\n") or 1 for line in sniff.lines[:logical])
+    if physical == logical:
+        return logical
+    for skip in (physical, logical):
+        probe = read_csv_sql(file_path, skip - 1, len(sniff.header), sniff.delimiter, sniff.quotechar)
+        row = con.execute(f"SELECT c0 FROM {probe} LIMIT 1").fetchone()
+        if row and (row[0] or "").strip() == sniff.header[0].strip():
+            return skip
+    return physical
+
+
+def rejected_rows(con: duckdb.DuckDBPyConnection) -> int:
+    """Rows the connection's last read_csv scan set aside as malformed."""
+    # a rejected line can be reported more than once per scan
+    return con.execute("SELECT count(DISTINCT line) FROM reject_errors "
+                       "WHERE scan_id = (SELECT max(scan_id) FROM reject_scans)").fetchone()[0]
+
+
+def build_unify_sql(con: duckdb.DuckDBPyConnection, file_path: Path, sniff: CsvSniff,
+                    metadata: Optional[Dict], source_file: str) -> str:
+    """
+    SELECT producing unify_record's output (CANONICAL_COLUMNS, money as DOUBLE) for a
+    tall CSV with the sniffed header line and dialect.
+    """
+    raw_names = sniff.header
+    source = read_csv_sql(file_path, skip_lines(con, file_path, sniff), len(raw_names), sniff.delimiter,
+                          sniff.quotechar)
+    plan = compile_schema_plan(tuple(normalize_colname(c) for c in raw_names))
+    positions = dict(zip(CANONICAL_COLUMNS, plan.positions))
+    meta = {k.lower(): v for k, v in (metadata or {}).items()}
+
+    # unify_record keeps a metadata column from the data unless it is entirely empty;
+    # only columns that metadata could replace need the (one extra) scan
+    fill = ["hospital_name"] + METADATA_FIELDS
+    check = [c for c in fill if positions[c] >= 0 and meta.get(c)]
+    has_values = {}
+    if check:
+        counts = con.execute(f"SELECT {', '.join(f'count(c{positions[c]})' for c in check)} FROM {source}").fetchone()
+        has_values = dict(zip(check, counts))
+
+    exprs, from_data = {}, set()
+    for c in CANONICAL_COLUMNS:
+        pos = positions[c]
+        if c in fill and (pos < 0 or not has_values.get(c, True)) and meta.get(c):
+            exprs[c] = literal(meta[c])
+        elif pos >= 0:
+            exprs[c] = f"c{pos}"
+            from_data.add(c)
+        else:
+            exprs[c] = "NULL"
+    exprs["source_file"] = literal(source_file)
+    if "hospital_address" in from_data:
+        exprs["state"] = state_sql(exprs["hospital_address"])
+    else:
+        exprs["state"] = literal(extract_state_from_address(meta.get("hospital_address")))
+
+    select = []
+    for c in CANONICAL_COLUMNS:
+        if c in MONEY_COLUMNS:
+            expr = money_sql(exprs[c]) if c in from_data else f"CAST({exprs[c]} AS DOUBLE)"
+        else:
+            expr = f"CAST({exprs[c]} AS VARCHAR)"
+        select.append(f"{expr} AS {c}")
+    return f"SELECT {', '.join(select)} FROM {source}"
+
+
+def connect(spill_dir: str, memory_limit: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+    """
+    In-memory connection that spills to spill_dir. Insertion order is not kept, so COPY
+    streams without buffering; memory_limit must still hold a Parquet row group per thread.
+    """
+    config = {"temp_directory": spill_dir, "preserve_insertion_order": False}
+    if memory_limit:
+        config["memory_limit"] = memory_limit
+    con = duckdb.connect(config=config)
+    con.execute("SET enable_progress_bar = false")
+    return con
+
+
+def write_parquet_duckdb(file: Path, out_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                         memory_limit: Optional[str] = None) -> int:
+    """
+    Transform a raw tall CSV in DuckDB and COPY it to Parquet (row groups of chunk_rows).
+    Other formats, wide CSVs and CSVs that aren't UTF-8 are handed to write_parquet_arrow.
+    memory_limit (a DuckDB size such as "4GB") caps the connection; beyond it DuckDB spills
+    to a temporary directory. Malformed rows are skipped with a warning and counted in the
+    duckdb_transform stage (rows_in - rows_out). Returns the rows written.
+    """
+    if file.suffix.lower() not in {".csv", ".txt"}:
+        return write_parquet_arrow(file, out_path, chunk_rows=chunk_rows)
+    sniff = sniff_csv(file)
+    if sniff.encoding != "utf-8" or parse_wide_header(sniff.header) is not None:
+        return write_parquet_arrow(file, out_path, chunk_rows=chunk_rows)
+    meta = extract_metadata_from_lines(sniff.metadata_lines, sniff.delimiter)
+
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    with tempfile.TemporaryDirectory() as spill_dir:
+        con = connect(spill_dir, memory_limit)
+        try:
+            with stage("duckdb_transform", bytes_read=file.stat().st_size) as rec:
+                sql = build_unify_sql(con, file, sniff, meta, source_file=file.name)
+                rows = con.execute(f"COPY ({sql}) TO {literal(str(tmp_path))} "
+                                   f"(FORMAT PARQUET, ROW_GROUP_SIZE {chunk_rows})").fetchone()[0]
+                rejected = rejected_rows(con)
+                rec.update(rows_in=rows + rejected, rows_out=rows)
+        finally:
+            con.close()
+    os.replace(tmp_path, out_path)
+    if rejected:
+        warnings.warn(f"{file.name}: skipped {rejected} malformed row(s) DuckDB could not parse")
+    return rows
@@ -1,23 +1,39 @@
 import pandas as pd
-import json
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
+import sys
+import time
+from datetime import datetime
+import multiprocessing as mp
+from multiprocessing import connection as mp_connection
 from pathlib import Path
+from typing import Dict, List, Optional
 from tqdm import tqdm
 
-DATA_DIR = Path("data")
+from src import cache, profiling
+from src.config import DATA_DIR, PROCESSED_DIR
+from src.profiling import stage
+from src.utils import read_generic_chunks, iter_json_chunks, DEFAULT_CHUNK_ROWS
+from src.arrow_pipeline import iter_arrow_tables, unify_table, write_parquet_arrow
+from src.duckdb_pipeline import write_parquet_duckdb
+from src.pipeline import bottleneck, prefetching, run_pipeline
+from src.sniff import sniff_csv
+from src.columns import MONEY_COLUMNS
+from src.transform import CANONICAL_COLUMNS, canonical_schema, unify_record
+
 RAW_DIR = DATA_DIR / "raw"
-PROCESSED_DIR = DATA_DIR / "processed"
+SUPPORTED_SUFFIXES = {".csv", ".txt", ".json", ".xls", ".xlsx"}
 
 def read_csv_with_metadata(path: Path, nrows: int = 100) -> pd.DataFrame:
     """
     Reads a hospital CSV file while handling metadata rows on top.
     """
-    with open(path, "r", encoding="utf-8") as f:
-        first_lines = [next(f) for _ in range(5)]  # peek first few rows
+    sniff = sniff_csv(path, n_preview=5)  # peek first few rows
     
     # Find the row that looks like the header (starts with 'description' usually)
     header_line = None
-    for i, line in enumerate(first_lines):
+    for i, line in enumerate(sniff.lines):
         if "description" in line.lower():  # heuristic
             header_line = i
             break
@@ -25,11 +41,13 @@ def read_csv_with_metadata(path: Path, nrows: int = 100) -> pd.DataFrame:
     if header_line is None:
         raise ValueError(f"Could not find header in {path}")
     
-    # Now re-read CSV with correct header
-    df = pd.read_csv(path, skiprows=header_line, nrows=nrows)
+    # Now read the CSV from the header line on
+    with open(path, "rb") as f:
+        f.seek(sniff.line_offset(header_line))
+        df = pd.read_csv(f, nrows=nrows, sep=sniff.delimiter, encoding=sniff.encoding)
     
     # Extract hospital name from metadata (line 2 usually)
-    hospital_name = first_lines[1].split(",")[0].replace('"', "").strip()
+    hospital_name = sniff.lines[1].split(sniff.delimiter)[0].replace('"', "").strip() if len(sniff.lines) > 1 else ""
     df["hospital_name"] = hospital_name
     
     return df
@@ -38,20 +56,13 @@ def read_csv_with_metadata(path: Path, nrows: int = 100) -> pd.DataFrame:
 def read_json(path: Path, nrows: int = 100) -> pd.DataFrame:
     """
     Reads a JSON file and flattens it into a dataframe.
+    Records are streamed, so only the first nrows rows are ever parsed.
     """
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    # Flatten JSON if it's nested
-    if isinstance(data, dict):
-        df = pd.json_normalize(data)
-    elif isinstance(data, list):
-        df = pd.json_normalize(data)
-    else:
-        raise ValueError(f"Unsupported JSON format in {path}")
-    
-    df = df.head(nrows)
-    df["hospital_name"] = path.stem.split("_")[1]  # crude hospital name
+    chunks, meta = iter_json_chunks(path, chunk_rows=nrows, nrows=nrows)
+    df = next(chunks, pd.DataFrame())
+    chunks.close()
+
+    df["hospital_name"] = meta.get("hospital_name") or path.stem.split("_")[1]  # crude hospital name
     return df
 
 
@@ -64,35 +75,330 @@ def read_excel(path: Path, nrows: int = 100) -> pd.DataFrame:
     return df
 
 
-def process_files():
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-    parquet_files = []
+def to_canonical_table(df: pd.DataFrame, categorical: bool = False) -> pa.Table:
+    """
+    Convert a unify_record frame to an Arrow table with CANONICAL_SCHEMA (or, with
+    categorical=True, CANONICAL_SCHEMA_CATEGORICAL: categoricals become dictionary arrays).
+    """
+    df = df.copy()
+    for c in CANONICAL_COLUMNS:
+        if c not in MONEY_COLUMNS and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            # JSON/XLSX values may be ints or dates; Parquet column type is string
+            df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+    return pa.Table.from_pandas(df, schema=canonical_schema(categorical), preserve_index=False)
+
+
+def write_parquet_chunked(file: Path, out_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                          nrows: Optional[int] = None, categorical: bool = False) -> int:
+    """
+    Stream `file` through unify_record chunk by chunk, appending each chunk to `out_path`
+    as its own Parquet row group. Peak memory is bounded by chunk_rows, not file size.
+    With categorical=True low-cardinality columns are written as dictionary columns.
+    Returns the number of rows written.
+    """
+    chunks, meta = read_generic_chunks(file, chunk_rows=chunk_rows, nrows=nrows)
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    rows = 0
+    # write to a temp file and rename, so a crash never leaves a partial .parquet behind
+    with pq.ParquetWriter(tmp_path, canonical_schema(categorical)) as writer:
+        for chunk in chunks:
+            with stage("unify", rows_in=len(chunk)) as rec:
+                unified = unify_record(chunk, source_file=file.name, metadata=meta, categorical=categorical)
+                rec["rows_out"] = len(unified)
+            with stage("parquet_write", rows_in=len(unified), rows_out=len(unified)):
+                writer.write_table(to_canonical_table(unified, categorical=categorical))
+            rows += len(unified)
+    os.replace(tmp_path, out_path)
+    return rows
+
+
+def write_parquet_pipelined(file: Path, out_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                            engine: str = "pandas", workers: int = 2, categorical: bool = False) -> int:
+    """
+    write_parquet_chunked (engine="pandas") or write_parquet_arrow (engine="arrow") with
+    parsing, transforming and Parquet writing overlapped on their own threads (see
+    src.pipeline): `workers` transform threads, bounded queues in between. The output has
+    the same rows and row groups in the same order. Returns the number of rows written.
+    """
+    if engine == "arrow":
+        chunks, meta = iter_arrow_tables(file, chunk_rows=chunk_rows)
+
+        def transform(table: pa.Table) -> pa.Table:
+            with stage("unify", rows_in=table.num_rows, rows_out=table.num_rows):
+                return unify_table(table, source_file=file.name, metadata=meta, categorical=categorical)
+    else:
+        chunks, meta = read_generic_chunks(file, chunk_rows=chunk_rows)
+
+        def transform(chunk: pd.DataFrame) -> pa.Table:
+            with stage("unify", rows_in=len(chunk)) as rec:
+                unified = unify_record(chunk, source_file=file.name, metadata=meta, categorical=categorical)
+                rec["rows_out"] = len(unified)
+            with stage("arrow_convert", rows_in=len(unified), rows_out=len(unified)):
+                return to_canonical_table(unified, categorical=categorical)
+
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp_path, canonical_schema(categorical)) as writer:
+        def write(table: pa.Table) -> None:
+            nonlocal rows
+            with stage("parquet_write", rows_in=table.num_rows, rows_out=table.num_rows):
+                writer.write_table(table)
+            rows += table.num_rows
+
+        run_pipeline(chunks, transform, write, workers=workers)
+    os.replace(tmp_path, out_path)
+    return rows
+
+
+def convert_file(file: Path, chunk_rows: Optional[int] = None, engine: str = "pandas",
+                 categorical: bool = False, pipeline_workers: int = 0,
+                 duckdb_memory_limit: Optional[str] = None) -> Optional[str]:
+    """
+    Convert one raw file to Parquet in PROCESSED_DIR and return the output path,
+    or None if the file type is not supported. Errors propagate to the caller.
+    engine="arrow" streams the file through arrow_pipeline (no pandas in between);
+    engine="duckdb" transforms tall CSVs in SQL with duckdb_pipeline (others go through Arrow),
+    capped at duckdb_memory_limit (e.g. "4GB") before spilling to disk.
+    With the pandas engine and chunk_rows set, the file is streamed through unify_record in
+    chunks of that size (canonical schema, full file); otherwise the demo readers above are used.
+    categorical=True dictionary-encodes low-cardinality columns (pandas/arrow canonical-schema
+    engines; DuckDB's Parquet writer dictionary-encodes strings on its own).
+    pipeline_workers > 0 overlaps parse, transform and write for the arrow engine and the
+    chunked pandas engine (write_parquet_pipelined, chunk_rows defaulting to DEFAULT_CHUNK_ROWS).
+    """
+    out_path = PROCESSED_DIR / f"{file.stem}.parquet"
+    if pipeline_workers and engine in {"pandas", "arrow"} and file.suffix.lower() in SUPPORTED_SUFFIXES:
+        write_parquet_pipelined(file, out_path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS, engine=engine,
+                                workers=pipeline_workers, categorical=categorical)
+        return str(out_path)
+    if engine == "duckdb" and file.suffix.lower() in SUPPORTED_SUFFIXES:
+        write_parquet_duckdb(file, out_path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS,
+                             memory_limit=duckdb_memory_limit)
+        return str(out_path)
+    if engine == "arrow" and file.suffix.lower() in SUPPORTED_SUFFIXES:
+        write_parquet_arrow(file, out_path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS, categorical=categorical)
+        return str(out_path)
+    if chunk_rows and file.suffix.lower() in SUPPORTED_SUFFIXES:
+        write_parquet_chunked(file, out_path, chunk_rows=chunk_rows, categorical=categorical)
+        return str(out_path)
+
+    if file.suffix == ".csv":
+        df = read_csv_with_metadata(file)
+    elif file.suffix == ".json":
+        df = read_json(file)
+    elif file.suffix in [".xls", ".xlsx"]:
+        df = read_excel(file)
+    else:
+        return None
+
+    # Standardize some column names
+    df = df.rename(columns=lambda x: x.strip().lower().replace("|", "_").replace(" ", "_"))
+    # load_duckdb keys incremental reloads on source_file
+    df["source_file"] = file.name
+
+    # replace rather than overwrite: out_path may be hard-linked to an ingest cache entry
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+    return str(out_path)
 
-    for file in tqdm(list(DATA_DIR.glob("*"))):
+
+def ingest_one(file: Path, chunk_rows: Optional[int] = None, cache_dir: Optional[Path] = None,
+               engine: str = "pandas", profile_dir: Optional[Path] = None,
+               categorical: bool = False, pipeline_workers: int = 0,
+               duckdb_memory_limit: Optional[str] = None) -> Dict:
+    """
+    Run convert_file and capture the outcome as a result dict:
+    {"file", "status" (ok/skipped/failed/timeout), "parquet", "error", "seconds", "cache", "stages"}.
+    With cache_dir set, a raw file whose content, ingest mode and pipeline version match a
+    cache entry reuses that Parquet instead of being parsed ("cache": "hit"/"miss").
+    "stages" holds the per-stage metrics recorded while converting (see src.profiling);
+    with profile_dir set, a cProfile dump <profile_dir>/<file name>.prof is written too.
+    """
+    start = time.perf_counter()
+    result = {"file": str(file), "status": "ok", "parquet": None, "error": None, "seconds": 0.0,
+              "cache": None, "stages": []}
+    profile_path = profile_dir / f"{file.name}.prof" if profile_dir else None
+    with profiling.collect() as result["stages"], profiling.profile_to(profile_path):
         try:
-            if file.suffix == ".csv":
-                df = read_csv_with_metadata(file)
-            elif file.suffix == ".json":
-                df = read_json(file)
-            elif file.suffix in [".xls", ".xlsx"]:
-                df = read_excel(file)
-            else:
-                print(f"Skipping unsupported file: {file}")
-                continue
-            
-            # Standardize some column names
-            df = df.rename(columns=lambda x: x.strip().lower().replace("|", "_").replace(" ", "_"))
-            
-            out_path = PROCESSED_DIR / f"{file.stem}.parquet"
-            df.to_parquet(out_path, index=False)
-            parquet_files.append(str(out_path))
-        
+            key = None
+            if cache_dir and file.suffix.lower() in SUPPORTED_SUFFIXES:
+                with stage("cache_lookup"):
+                    # pipelined output is identical to the chunked engine's
+                    mode = engine if engine != "pandas" else ("chunked" if chunk_rows or pipeline_workers else "demo")
+                    if categorical and mode != "demo":
+                        mode += "+categorical"
+                    key = cache.cache_key(file, cache_dir, mode=mode)
+                    cached = cache.lookup(cache_dir, key)
+                    if cached:
+                        out_path = PROCESSED_DIR / f"{file.stem}.parquet"
+                        cache.restore(cached, out_path)
+                if cached:
+                    result.update(parquet=str(out_path), cache="hit", seconds=time.perf_counter() - start)
+                    return result
+                result["cache"] = "miss"
+            result["parquet"] = convert_file(file, chunk_rows=chunk_rows, engine=engine, categorical=categorical,
+                                             pipeline_workers=pipeline_workers,
+                                             duckdb_memory_limit=duckdb_memory_limit)
+            if result["parquet"] is None:
+                result["status"] = "skipped"
+            elif key:
+                cache.store(cache_dir, key, Path(result["parquet"]), source=file)
         except Exception as e:
-            print(f"Failed processing {file}: {e}")
-    
-    return parquet_files
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _ingest_worker(file: Path, ingest_kwargs: Dict, conn) -> None:
+    """Child-process entry point: send the ingest_one result back over the pipe."""
+    conn.send(ingest_one(file, **ingest_kwargs))
+    conn.close()
+
+
+def ingest_parallel(files: List[Path], workers: int, file_timeout: Optional[float] = None,
+                    **ingest_kwargs) -> List[Dict]:
+    """
+    Fan files out to at most `workers` child processes, largest files first so the
+    biggest jobs don't start last and straggle. Each file gets its own process and pipe,
+    so a file that exceeds file_timeout seconds (or crashes its process) is terminated
+    and recorded without affecting the other jobs.
+    """
+    ctx = mp.get_context()
+    pending = sorted(files, key=lambda f: f.stat().st_size, reverse=True)
+    running = {}  # pipe connection -> (process, file, start time)
+    results = []
+
+    with tqdm(total=len(pending)) as bar:
+        while pending or running:
+            while pending and len(running) < workers:
+                file = pending.pop(0)
+                recv_conn, send_conn = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_ingest_worker, args=(file, ingest_kwargs, send_conn), daemon=True)
+                proc.start()
+                send_conn.close()
+                running[recv_conn] = (proc, file, time.monotonic())
+
+            for conn in mp_connection.wait(list(running), timeout=0.5):
+                proc, file, started = running.pop(conn)
+                try:
+                    results.append(conn.recv())
+                except EOFError:
+                    # process died before sending a result (segfault, OOM kill, ...)
+                    proc.join()
+                    results.append({"file": str(file), "status": "failed", "parquet": None,
+                                    "error": f"worker exited with code {proc.exitcode}",
+                                    "seconds": time.monotonic() - started, "cache": None, "stages": []})
+                conn.close()
+                proc.join()
+                bar.update(1)
+
+            if file_timeout:
+                now = time.monotonic()
+                for conn, (proc, file, started) in list(running.items()):
+                    if now - started > file_timeout:
+                        proc.terminate()
+                        proc.join()
+                        conn.close()
+                        del running[conn]
+                        results.append({"file": str(file), "status": "timeout", "parquet": None,
+                                        "error": f"exceeded {file_timeout:g}s", "seconds": now - started,
+                                        "cache": None, "stages": []})
+                        bar.update(1)
+    return results
+
+
+def queue_summary(results: List[Dict]) -> Dict[str, Dict]:
+    """Pipeline queue stats ("queue.<name>" entries) summed over every file's result, keyed by name."""
+    queues = {}
+    for r in results:
+        for s in r.get("stages") or []:
+            if not s["stage"].startswith("queue."):
+                continue
+            q = queues.setdefault(s["stage"][len("queue."):], {f: 0 for f in profiling.QUEUE_FIELDS})
+            total = q["items"] + s["items"]
+            q["mean_depth"] = (q["mean_depth"] * q["items"] + s["mean_depth"] * s["items"]) / total if total else 0.0
+            q["items"] = total
+            for f in ("capacity", "max_depth"):
+                q[f] = max(q[f], s[f])
+            for f in ("put_wait_s", "get_wait_s"):
+                q[f] += s[f]
+    return queues
+
+
+def run_ingest(chunk_rows: Optional[int] = None, workers: int = 1,
+               file_timeout: Optional[float] = None, cache_dir: Optional[Path] = None,
+               cache_max_bytes: Optional[int] = None, engine: str = "pandas",
+               report: Optional[Path] = None, profile_dir: Optional[Path] = None,
+               categorical: bool = False, pipeline_workers: int = 0,
+               duckdb_memory_limit: Optional[str] = None) -> List[Dict]:
+    """
+    Convert every raw file in DATA_DIR and return one result dict per file (see ingest_one).
+    workers > 1 (or a file_timeout) runs files in separate processes via ingest_parallel.
+    With cache_dir set, unchanged inputs reuse cached Parquet and the cache is trimmed to
+    cache_max_bytes (least recently used first) at the end of the run.
+    With report set, the per-file, per-stage metrics are written there (.json or .csv).
+    pipeline_workers > 0 overlaps each file's parse / transform / write (write_parquet_pipelined),
+    prefetches the head of the next file while one is converted, and prints how full the pipeline's
+    queues ran and which step held it back.
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    files = [f for f in DATA_DIR.glob("*") if f.is_file()]
+    started = datetime.now()
+    if workers > 1 or file_timeout:
+        results = ingest_parallel(files, workers=workers, file_timeout=file_timeout,
+                                  chunk_rows=chunk_rows, cache_dir=cache_dir, engine=engine,
+                                  profile_dir=profile_dir, categorical=categorical,
+                                  pipeline_workers=pipeline_workers, duckdb_memory_limit=duckdb_memory_limit)
+    else:
+        results = [ingest_one(file, chunk_rows=chunk_rows, cache_dir=cache_dir, engine=engine,
+                              profile_dir=profile_dir, categorical=categorical, pipeline_workers=pipeline_workers,
+                              duckdb_memory_limit=duckdb_memory_limit)
+                   for file in tqdm(prefetching(files) if pipeline_workers else files, total=len(files))]
+
+    if report:
+        profiling.write_report(results, report, run_info={
+            "command": "ingest", "argv": sys.argv, "started": started.isoformat(),
+            "seconds": (datetime.now() - started).total_seconds(), "engine": engine,
+            "chunk_rows": chunk_rows, "workers": workers, "categorical": categorical,
+            "pipeline_workers": pipeline_workers, "duckdb_memory_limit": duckdb_memory_limit,
+        })
+        print(f"Run report written to {report}. Slowest files:")
+        for r in profiling.slowest_files(results):
+            print(f"  {r['seconds']:8.2f}s  {r['file']} (slowest stage: {r['slowest_stage']})")
+
+    queues = queue_summary(results)
+    if queues:
+        print("Pipeline queues (mean / max depth of capacity, producer blocked, consumer starved per thread):")
+        for name, q in queues.items():
+            print(f"  {name:>12}: {q['mean_depth']:.1f} / {q['max_depth']} of {q['capacity']}, "
+                  f"{q['put_wait_s']:.2f}s blocked, {q['get_wait_s']:.2f}s starved")
+        print(f"  bottleneck: {bottleneck(queues)}")
+
+    if cache_dir:
+        evicted = cache.evict(cache_dir, cache_max_bytes) if cache_max_bytes is not None else []
+        cached_mb = sum(e["size"] for e in cache.entries(cache_dir)) / 2**20
+        print(f"Cache: {sum(r['cache'] == 'hit' for r in results)} hits, "
+              f"{sum(r['cache'] == 'miss' for r in results)} misses, "
+              f"{len(evicted)} evicted, {cached_mb:.1f} MB cached.")
+    return results
+
+
+def process_files(chunk_rows: Optional[int] = None, workers: int = 1,
+                  file_timeout: Optional[float] = None, cache_dir: Optional[Path] = None,
+                  cache_max_bytes: Optional[int] = None, engine: str = "pandas",
+                  report: Optional[Path] = None, profile_dir: Optional[Path] = None,
+                  categorical: bool = False, pipeline_workers: int = 0):
+    """Convert every raw file in DATA_DIR to Parquet in PROCESSED_DIR; returns the Parquet paths."""
+    results = run_ingest(chunk_rows=chunk_rows, workers=workers, file_timeout=file_timeout,
+                         cache_dir=cache_dir, cache_max_bytes=cache_max_bytes, engine=engine,
+                         report=report, profile_dir=profile_dir, categorical=categorical,
+                         pipeline_workers=pipeline_workers)
+    return [r["parquet"] for r in results if r["status"] == "ok"]
 
 
 if __name__ == "__main__":
-    parquet_files = process_files()
-    print(f"Done. Parquet files: {parquet_files}")
+    # flags are defined once, in src.cli
+    from src.cli import main
+    main(["ingest", *sys.argv[1:]])
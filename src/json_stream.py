@@ -0,0 +1,224 @@
+# src/json_stream.py
+"""
+Incremental reader for large CMS machine-readable JSON files.
+
+Instead of json.load-ing the whole document, the file is scanned with a bounded buffer:
+top-level keys before the record array (hospital_name, last_updated_on, ...) are decoded
+into a metadata dict, then standard_charge_information is decoded one element at a time.
+Other arrays before it (v2's modifier_information, ...) are decoded into the metadata dict;
+an object without standard_charge_information streams its first array of objects from
+there instead. Each CMS item is flattened into canonical tall rows, one per standard
+charge x payer.
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+_WS = " \t\n\r"
+# top-level array of a CMS file holding the charge items
+RECORDS_KEY = "standard_charge_information"
+
+
+class _Scanner:
+    """Minimal pull scanner over a text file; decodes one JSON value at a time."""
+
+    def __init__(self, f, block_size: int):
+        self.f = f
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        # drop the consumed prefix only once it is most of the buffer, so every character is
+        # copied a bounded number of times however many values a block holds
+        if self.pos > len(self.buf) // 2:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += data
+        return True
+
+    def _skip_ws(self, i: int) -> int:
+        while True:
+            while i < len(self.buf) and self.buf[i] in _WS:
+                i += 1
+            if i < len(self.buf):
+                return i
+            # _fill may drop the consumed prefix; keep i relative to pos
+            offset = i - self.pos
+            if not self._fill(self.block_size):
+                return i
+            i = self.pos + offset
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file), without consuming it."""
+        self.pos = self._skip_ws(self.pos)
+        return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def peek_into_array(self) -> str:
+        """First non-whitespace character after the '[' at the current position."""
+        i = self._skip_ws(self.pos + 1)
+        return self.buf[i] if i < len(self.buf) else ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"Expecting {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more of the file as needed."""
+        self.peek()
+        size = self.block_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number at the very end of the buffer may be cut short; make sure it isn't
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # grow reads geometrically so a large value isn't re-parsed once per block
+            self._fill(size)
+            size *= 2
+
+
+def open_json_records(file_path: Path, block_size: int = 1 << 20) -> Tuple[Iterator[Dict], Dict]:
+    """
+    Returns (record iterator, top-level values). For a top-level array every element is a
+    record; for an object, the RECORDS_KEY array is streamed and every key before it is
+    decoded into the returned dict. An object without RECORDS_KEY is decoded whole and its
+    first array of objects is returned as the records (empty iterator if it has none).
+    """
+    f = open(file_path, "r", encoding="utf-8", errors="replace")
+    try:
+        sc = _Scanner(f, block_size)
+        top = {}
+        c = sc.peek()
+        if c == "[":
+            sc.pos += 1
+            return _array_items(sc, f), top
+        if c != "{":
+            raise ValueError(f"{file_path} is not a JSON object or array")
+        sc.pos += 1
+        while sc.peek() != "}":
+            key = sc.value()
+            sc.expect(":")
+            if key == RECORDS_KEY and sc.peek() == "[":
+                sc.pos += 1
+                return _array_items(sc, f), top
+            top[key] = sc.value()
+            if sc.peek() == ",":
+                sc.pos += 1
+        sc.pos += 1
+        if sc.peek():
+            raise ValueError(f"Extra data after top-level object in {file_path}")
+    except BaseException:
+        f.close()
+        raise
+    f.close()
+    key = next((k for k, v in top.items() if isinstance(v, list) and v and isinstance(v[0], dict)), None)
+    records = top.pop(key) if key is not None else []
+    return (item for item in records), top
+
+
+def _array_items(sc: _Scanner, f) -> Iterator:
+    try:
+        if sc.peek() == "]":
+            return
+        while True:
+            yield sc.value()
+            c = sc.peek()
+            sc.pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise json.JSONDecodeError("Expecting ',' or ']'", sc.buf, sc.pos - 1)
+    finally:
+        f.close()
+
+
+def is_ndjson(file_path: Path) -> bool:
+    """True if the first line is a complete JSON value followed by more data (JSON Lines)."""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        first = f.readline(1 << 20)
+        if not first.endswith("\n"):
+            return False
+        try:
+            json.loads(first)
+        except json.JSONDecodeError:
+            return False
+        return f.read(4096).strip() != ""
+
+
+def mrf_metadata(top: Dict) -> Dict:
+    """Hospital-level metadata from the top-level keys of a CMS JSON file (v1 and v2 layouts)."""
+    meta = {}
+    for k, v in top.items():
+        if isinstance(v, list) and all(not isinstance(x, (dict, list)) for x in v):
+            # v2 hospital_location / hospital_address are lists of strings
+            meta[k] = "; ".join(str(x) for x in v)
+        elif not isinstance(v, (dict, list)):
+            meta[k] = v
+    lic = top.get("license_information")
+    if isinstance(lic, dict) and lic.get("license_number") is not None:
+        meta["license_number"] = str(lic["license_number"])
+    return meta
+
+
+def flatten_mrf_item(item: Dict) -> List[Dict]:
+    """
+    Flatten one standard_charge_information item into canonical tall rows: one row per
+    standard_charges entry x payers_information entry (one row per entry if no payers).
+    Items without standard_charges are returned unchanged.
+    """
+    if "standard_charges" not in item:
+        return [item]
+    base = {"description": item.get("description")}
+    for i, code in enumerate((item.get("code_information") or [])[:3], start=1):
+        base[f"code_{i}"] = code.get("code")
+        base[f"code_{i}_type"] = code.get("type")
+    drug = item.get("drug_information") or {}
+    base["drug_unit_of_measurement"] = drug.get("unit")
+    base["drug_type_of_measurement"] = drug.get("type")
+
+    rows = []
+    for sc in item.get("standard_charges") or []:
+        charge = dict(base)
+        charge.update({
+            "setting": sc.get("setting"),
+            "billing_class": sc.get("billing_class"),
+            "modifiers": "|".join(str(m) for m in sc.get("modifier_code") or []) or None,
+            "standard_charge_gross": sc.get("gross_charge"),
+            "standard_charge_discounted_cash": sc.get("discounted_cash"),
+            "standard_charge_min": sc.get("minimum"),
+            "standard_charge_max": sc.get("maximum"),
+            "additional_generic_notes": sc.get("additional_generic_notes"),
+        })
+        payers = sc.get("payers_information") or []
+        if not payers:
+            rows.append(charge)
+        for p in payers:
+            row = dict(charge)
+            row.update({
+                "payer_name": p.get("payer_name"),
+                "plan_name": p.get("plan_name"),
+                "standard_charge_negotiated_dollar": p.get("standard_charge_dollar"),
+                "standard_charge_negotiated_percentage": p.get("standard_charge_percentage"),
+                "standard_charge_negotiated_algorithm": p.get("standard_charge_algorithm"),
+                "estimated_amount": p.get("estimated_amount"),
+                "standard_charge_methodology": p.get("methodology"),
+            })
+            if p.get("additional_payer_notes"):
+                notes = [charge["additional_generic_notes"], p["additional_payer_notes"]]
+                row["additional_generic_notes"] = "; ".join(str(n) for n in notes if n)
+            rows.append(row)
+    return rows
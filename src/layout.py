@@ -0,0 +1,97 @@
+# src/layout.py
+"""
+Query-optimized Parquet layout: a Hive-partitioned dataset (state=XX/) built from the
+per-file ingest outputs, sorted by code_1/payer_name inside each partition and written
+with a fixed row-group size, so row-group min/max statistics let DuckDB (and any other
+Parquet reader) skip most of the data for the usual code/payer/state lookups.
+Rows without a state go to state=__HIVE_DEFAULT_PARTITION__, the directory Hive, Spark
+and pyarrow read back as NULL; DuckDB reads it as that string, so DuckDB queries go
+through dataset_sql.
+Run:
+    python -m src.layout
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+import duckdb
+
+from src.config import PROCESSED_DIR
+from src.sql import literal
+
+DATASET_DIR = PROCESSED_DIR / "dataset"
+
+PARTITION_KEY = "state"
+SORT_KEYS = ["code_1", "payer_name"]
+# partition directory value of a NULL key (Hive's own; a literal "NULL" would read back as a string)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# matches DuckDB's own row-group size: small enough for selective zone maps,
+# large enough to keep per-group overhead negligible
+ROW_GROUP_SIZE = 122_880
+
+
+def present_columns(con, relation_sql: str, wanted: List[str]) -> List[str]:
+    """The subset of `wanted` columns that the relation actually has (legacy outputs may lack some)."""
+    cols = {r[0] for r in con.execute(f"DESCRIBE {relation_sql}").fetchall()}
+    return [c for c in wanted if c in cols]
+
+
+def dataset_sql(dataset_dir: Path = DATASET_DIR) -> str:
+    """A DuckDB relation over the partitioned dataset, with NULL_PARTITION read back as a NULL state."""
+    files = literal(str(Path(dataset_dir) / "*" / "*.parquet"))
+    return (f"(SELECT * REPLACE (NULLIF({PARTITION_KEY}, {literal(NULL_PARTITION)}) AS {PARTITION_KEY}) "
+            f"FROM read_parquet({files}, hive_partitioning = true))")
+
+
+def write_partitioned_dataset(parquet_files: List[str], dataset_dir: Path = DATASET_DIR,
+                              row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    Rebuild dataset_dir as <dataset_dir>/state=<XX>/data_0.parquet from parquet_files
+    (state=__HIVE_DEFAULT_PARTITION__ for rows without a state).
+    Rows are staged once sorted by (state, code_1, payer_name), spilling to disk if needed,
+    then each partition is written by its own ordered COPY. (COPY ... PARTITION_BY writes
+    row groups from several threads and does not keep them in sort order.)
+    Returns the number of rows written.
+    """
+    dataset_dir = Path(dataset_dir)
+    files_sql = "[" + ", ".join(literal(f) for f in parquet_files) + "]"
+    source = f"read_parquet({files_sql}, union_by_name = true)"
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        con = duckdb.connect()
+        con.execute(f"SET temp_directory = {literal(spill_dir)}")
+        has_state = bool(present_columns(con, f"SELECT * FROM {source}", [PARTITION_KEY]))
+        sort_keys = present_columns(con, f"SELECT * FROM {source}", SORT_KEYS)
+        state_expr = PARTITION_KEY if has_state else f"NULL::VARCHAR AS {PARTITION_KEY}"
+        exclude = f" EXCLUDE ({PARTITION_KEY})" if has_state else ""
+        order = ", ".join([PARTITION_KEY] + sort_keys)
+        con.execute(f"CREATE TEMP TABLE staged AS SELECT *{exclude}, {state_expr} FROM {source} ORDER BY {order}")
+
+        tmp_dir = dataset_dir.with_name(dataset_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        inner_order = f" ORDER BY {', '.join(sort_keys)}" if sort_keys else ""
+        for (state,) in con.execute(f"SELECT DISTINCT {PARTITION_KEY} FROM staged ORDER BY 1").fetchall():
+            part = tmp_dir / f"{PARTITION_KEY}={NULL_PARTITION if state is None else state}"
+            part.mkdir()
+            con.execute(
+                f"COPY (SELECT * EXCLUDE ({PARTITION_KEY}) FROM staged "
+                f"WHERE {PARTITION_KEY} IS NOT DISTINCT FROM ?{inner_order}) "
+                f"TO {literal(str(part / 'data_0.parquet'))} (FORMAT PARQUET, ROW_GROUP_SIZE {row_group_size})",
+                [state],
+            )
+        rows = con.execute("SELECT count(*) FROM staged").fetchone()[0]
+        con.close()
+
+    # swap in the new dataset only once it is complete
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    tmp_dir.rename(dataset_dir)
+    return rows
+
+
+if __name__ == "__main__":
+    # flags are defined once, in src.cli
+    from src.cli import main
+    main(["transform", *sys.argv[1:]])
@@ -1,10 +1,28 @@
 import duckdb
 from pathlib import Path
+from datetime import datetime
 import glob
+import sys
+import time
 
-DATA_DIR = Path("data")
-PROCESSED_DIR = DATA_DIR / "processed"
-DUCKDB_PATH = PROCESSED_DIR / "hospitals.duckdb"
+from src import profiling, star_schema
+from src.config import DUCKDB_PATH, PROCESSED_DIR
+from src.layout import PARTITION_KEY, SORT_KEYS, present_columns
+from src.profiling import stage
+from src.search_index import DOCS_TABLE, build_search_index
+from src.summaries import SUMMARY_TABLE, build_summaries, mark_codes, refresh_summaries
+
+# one row per loaded Parquet file; drives incremental loads
+MANIFEST_TABLE = "load_manifest"
+
+# the table is stored in (state, code_1, payer_name) order so DuckDB's per-row-group
+# min/max zone maps can skip most of it for the usual lookups
+CLUSTER_KEYS = [PARTITION_KEY] + SORT_KEYS
+# optional ART indexes for highly selective point lookups (--create-indexes)
+INDEX_COLUMNS = ["code_1", "payer_name", "hospital_name"]
+# storage layouts (--schema): one wide hospital_charges table, or normalized tables behind a
+# hospital_charges view (see star_schema)
+SCHEMAS = ["flat", "star"]
 
 # def create_unified_table():
 #     # Connect to DuckDB
@@ -35,23 +53,306 @@ DUCKDB_PATH = PROCESSED_DIR / "hospitals.duckdb"
     
 #     con.close()
 
-def create_unified_table():
-    con = duckdb.connect(str(DUCKDB_PATH))
+def _ensure_manifest(con):
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path VARCHAR,
+            size BIGINT,
+            mtime DOUBLE,
+            content_hash VARCHAR,
+            source_files VARCHAR[],
+            row_count BIGINT,
+            loaded_at TIMESTAMP
+        );
+    """)
+
+
+def _table_exists(con, name: str) -> bool:
+    # names are our own table constants; inlined because binding any Python parameter makes
+    # duckdb import pandas, which a no-op incremental load otherwise never needs
+    return con.execute(
+        f"SELECT count(*) FROM information_schema.tables WHERE table_name = '{name}'"
+    ).fetchone()[0] > 0
+
+
+def _record_manifest(con, path: Path, content_hash: str, source_files) -> int:
+    """Store size/mtime/hash plus the source_file values and row count the file contributed; returns the count."""
+    st = path.stat()
+    row_count = con.execute(
+        "SELECT count(*) FROM hospital_charges WHERE list_contains(?, source_file)", [source_files]
+    ).fetchone()[0]
+    con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE path = ?", [str(path)])
+    con.execute(
+        f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [str(path), st.st_size, st.st_mtime, content_hash, source_files, row_count, datetime.now()],
+    )
+    return row_count
+
+
+def _source_files(con, path: Path):
+    """Distinct source_file values in a Parquet file (its own name if it has no such column)."""
+    cols = [c[0] for c in con.execute("DESCRIBE SELECT * FROM read_parquet(?)", [str(path)]).fetchall()]
+    if "source_file" not in cols:
+        return [path.name]
+    rows = con.execute("SELECT DISTINCT source_file FROM read_parquet(?)", [str(path)]).fetchall()
+    return [r[0] for r in rows if r[0] is not None]
+
+
+def _manifest_source_files(con, path: str):
+    row = con.execute(f"SELECT source_files FROM {MANIFEST_TABLE} WHERE path = ?", [path]).fetchone()
+    return row[0] if row else []
+
+
+def _delete_file_rows(con, path: str):
+    """Delete the rows a previously loaded Parquet file contributed."""
+    if star_schema.is_star(con):
+        star_schema.delete_source_files(con, _manifest_source_files(con, path))
+        return
+    con.execute(
+        f"DELETE FROM hospital_charges WHERE source_file IN "
+        f"(SELECT unnest(source_files) FROM {MANIFEST_TABLE} WHERE path = ?)", [path]
+    )
+
+
+def _insert_file(con, path: Path, schema: str = "flat"):
+    """Append one Parquet file by column name, adding any columns the table doesn't have yet."""
+    file_cols = con.execute("DESCRIBE SELECT * FROM read_parquet(?)", [str(path)]).fetchall()
+    if schema == "star":
+        source = "read_parquet('" + str(path).replace("'", "''") + "')"
+        if "source_file" not in {c[0] for c in file_cols}:
+            source = "(SELECT *, '" + path.name.replace("'", "''") + f"' AS source_file FROM {source})"
+        star_schema.insert_rows(con, source)
+        return
+    if not _table_exists(con, "hospital_charges"):
+        con.execute("CREATE TABLE hospital_charges AS SELECT * FROM read_parquet(?) LIMIT 0", [str(path)])
+    table_cols = {r[0] for r in con.execute("DESCRIBE hospital_charges").fetchall()}
+    for name, col_type, *_ in file_cols:
+        if name not in table_cols:
+            con.execute(f'ALTER TABLE hospital_charges ADD COLUMN "{name}" {col_type}')
+    # each appended file is sorted on its own, keeping its row groups' zone maps narrow
+    keys = [c for c in CLUSTER_KEYS if c in {r[0] for r in file_cols}]
+    order = f" ORDER BY {', '.join(keys)}" if keys else ""
+    if "source_file" in {c[0] for c in file_cols}:
+        con.execute(f"INSERT INTO hospital_charges BY NAME SELECT * FROM read_parquet(?){order}", [str(path)])
+    else:
+        # rows are keyed on source_file; files written without one are keyed on their own name
+        if "source_file" not in table_cols:
+            con.execute("ALTER TABLE hospital_charges ADD COLUMN source_file VARCHAR")
+        con.execute(f"INSERT INTO hospital_charges BY NAME SELECT *, ? AS source_file FROM read_parquet(?){order}",
+                    [path.name, str(path)])
+
+
+def _drop_indexes(con) -> bool:
+    """Drop hospital_charges' indexes (they block ALTER TABLE and slow bulk inserts). True if any existed."""
+    names = [r[0] for r in con.execute(
+        "SELECT index_name FROM duckdb_indexes() WHERE table_name = 'hospital_charges'").fetchall()]
+    for name in names:
+        con.execute(f'DROP INDEX "{name}"')
+    return bool(names)
+
+
+def create_indexes(con):
+    """ART indexes on INDEX_COLUMNS (skipped for columns the table doesn't have)."""
+    if star_schema.is_star(con):
+        star_schema.create_indexes(con, INDEX_COLUMNS)
+        return
+    for col in present_columns(con, "hospital_charges", INDEX_COLUMNS):
+        with stage("duckdb_index"):
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_hospital_charges_{col} ON hospital_charges ({col})")
 
-    parquet_glob = str(PROCESSED_DIR / "*.parquet")
 
+def _schema(con) -> str:
+    return "star" if star_schema.is_star(con) else "flat"
+
+
+def _drop_charges(con):
+    """Drop hospital_charges in either layout."""
+    star_schema.drop_star(con)
     con.execute("DROP TABLE IF EXISTS hospital_charges;")
-    con.execute(f"""
-        CREATE TABLE hospital_charges AS 
-        SELECT * FROM parquet_scan('{parquet_glob}', union_by_name = true);
-    """)
 
-    count = con.execute("SELECT COUNT(*) FROM hospital_charges").fetchone()[0]
-    print(f"Unified table created with {count} rows.")
 
+def _write_report(results, report: Path, started: float):
+    profiling.write_report(results, report, run_info={
+        "command": "load_duckdb", "argv": sys.argv, "seconds": time.perf_counter() - started,
+    })
+    print(f"Run report written to {report}.")
+
+
+def load_incremental(indexes: bool = False, report: Path = None, summaries: bool = True, search: bool = True,
+                     schema: str = None):
+    """
+    Load only new or changed Parquet files into hospital_charges.
+    A file is unchanged if its size and mtime match the manifest (or, failing that, its
+    content hash does). Rows of changed and removed files are deleted by source_file and
+    changed files are re-inserted, all in one transaction.
+    With summaries, price_summary rows of the codes those files touch are recomputed.
+    With search, the procedure search index is rebuilt when anything changed.
+    With report set, per-file duckdb_load timings are written there (.json or .csv).
+    schema keeps the database's layout by default (flat for a new one); asking for the
+    other layout rebuilds it.
+    """
+    started = time.perf_counter()
+    con = duckdb.connect(str(DUCKDB_PATH))
+    exists = _table_exists(con, "hospital_charges")
+    current = _schema(con) if exists else schema or "flat"
+    rebuild = None
+    if exists and not _table_exists(con, MANIFEST_TABLE):
+        # database built before the manifest existed: nothing to diff against
+        rebuild = "No load manifest found; running a full rebuild."
+    elif schema and schema != current:
+        rebuild = f"Switching hospital_charges from the {current} to the {schema} schema; running a full rebuild."
+    if rebuild:
+        con.close()
+        print(rebuild)
+        create_unified_table(indexes=indexes, report=report, summaries=summaries, search=search,
+                             schema=schema or current)
+        return
+    _ensure_manifest(con)
+
+    manifest = {
+        row[0]: row[1:]
+        for row in con.execute(f"SELECT path, size, mtime, content_hash FROM {MANIFEST_TABLE}").fetchall()
+    }
+    files = sorted(PROCESSED_DIR.glob("*.parquet"))
+    changed, touched = [], []
+    for f in files:
+        st = f.stat()
+        prev = manifest.get(str(f))
+        if prev and prev[0] == st.st_size and prev[1] == st.st_mtime:
+            continue
+        # src.utils imports pandas; a no-op run never needs it
+        from src.utils import file_sha256
+        content_hash = file_sha256(f)
+        if prev and prev[2] == content_hash:
+            touched.append((f, st))
+        else:
+            changed.append((f, content_hash))
+    removed = sorted(set(manifest) - {str(f) for f in files})
+
+    results = []
+    con.begin()
+    try:
+        had_indexes = (changed or removed) and _drop_indexes(con)
+        for path in removed:
+            if summaries:
+                mark_codes(con, _manifest_source_files(con, path))
+            _delete_file_rows(con, path)
+            con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE path = ?", [path])
+        for f, content_hash in changed:
+            file_start = time.perf_counter()
+            with profiling.collect() as stages, stage("duckdb_load", bytes_read=f.stat().st_size) as rec:
+                if str(f) in manifest:
+                    if summaries:
+                        mark_codes(con, _manifest_source_files(con, str(f)))
+                    _delete_file_rows(con, str(f))
+                _insert_file(con, f, current)
+                sources = _source_files(con, f)
+                rec["rows_out"] = _record_manifest(con, f, content_hash, sources)
+                if summaries:
+                    mark_codes(con, sources)
+            results.append({"file": str(f), "seconds": time.perf_counter() - file_start, "stages": stages})
+        for f, st in touched:
+            con.execute(f"UPDATE {MANIFEST_TABLE} SET mtime = ? WHERE path = ?", [st.st_mtime, str(f)])
+        if (indexes or had_indexes) and _table_exists(con, "hospital_charges"):
+            index_start = time.perf_counter()
+            with profiling.collect() as stages:
+                create_indexes(con)
+            results.append({"file": "hospital_charges", "seconds": time.perf_counter() - index_start,
+                            "stages": stages})
+        if summaries and _table_exists(con, "hospital_charges") and (
+                changed or removed or not _table_exists(con, SUMMARY_TABLE)):
+            summary_start = time.perf_counter()
+            with profiling.collect() as stages:
+                refresh_summaries(con)
+            results.append({"file": SUMMARY_TABLE, "seconds": time.perf_counter() - summary_start,
+                            "stages": stages})
+        if search and _table_exists(con, "hospital_charges") and (
+                changed or removed or not _table_exists(con, DOCS_TABLE)):
+            search_start = time.perf_counter()
+            with profiling.collect() as stages:
+                build_search_index(con)
+            results.append({"file": DOCS_TABLE, "seconds": time.perf_counter() - search_start,
+                            "stages": stages})
+        con.commit()
+    except Exception:
+        con.rollback()
+        con.close()
+        raise
+
+    new = sum(str(f) not in manifest for f, _ in changed)
+    count = 0
+    if _table_exists(con, "hospital_charges"):
+        count = con.execute("SELECT COUNT(*) FROM hospital_charges").fetchone()[0]
+    print(f"Incremental load: {new} new, {len(changed) - new} changed, {len(removed)} removed, "
+          f"{len(files) - len(changed)} unchanged. hospital_charges has {count} rows.")
     con.close()
+    if report:
+        _write_report(results, report, started)
+
 
+def _rebuild_source(con, parquet_glob: str) -> str:
+    """
+    Every Parquet file as one relation, keyed like _insert_file: rows from files written
+    without a source_file column (or with NULLs in it) get the file's own name, so a later
+    incremental load can match and delete them.
+    """
+    scan = "parquet_scan('" + parquet_glob.replace("'", "''") + "', union_by_name = true, filename = true)"
+    cols = {c[0] for c in con.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()}
+    if "source_file" in cols:
+        select = "* EXCLUDE (filename) REPLACE (coalesce(source_file, parse_filename(filename)) AS source_file)"
+    else:
+        select = "* EXCLUDE (filename), parse_filename(filename) AS source_file"
+    return f"(SELECT {select} FROM {scan})"
+
+
+def create_unified_table(indexes: bool = False, report: Path = None, summaries: bool = True,
+                         search: bool = True, schema: str = None):
+    started = time.perf_counter()
+    con = duckdb.connect(str(DUCKDB_PATH))
+    if schema is None:
+        schema = _schema(con)
+
+    parquet_glob = str(PROCESSED_DIR / "*.parquet")
+    source = _rebuild_source(con, parquet_glob)
+    keys = present_columns(con, f"SELECT * FROM {source}", CLUSTER_KEYS)
+    order = f"ORDER BY {', '.join(keys)}" if keys else ""
+
+    with profiling.collect() as stages:
+        with stage("duckdb_load", bytes_read=sum(f.stat().st_size for f in PROCESSED_DIR.glob("*.parquet"))) as rec:
+            _drop_charges(con)
+            if schema == "star":
+                star_schema.insert_rows(con, source)
+            else:
+                con.execute(f"""
+                    CREATE TABLE hospital_charges AS 
+                    SELECT * FROM {source}
+                    {order};
+                """)
+            rec["rows_out"] = con.execute("SELECT COUNT(*) FROM hospital_charges").fetchone()[0]
+        if indexes:
+            create_indexes(con)
+        if summaries:
+            build_summaries(con)
+        if search:
+            build_search_index(con)
+
+    count = rec["rows_out"]
+    print(f"Unified table created with {count} rows ({schema} schema).")
+
+    # reset the manifest so later incremental loads diff against this rebuild
+    con.execute(f"DROP TABLE IF EXISTS {MANIFEST_TABLE};")
+    _ensure_manifest(con)
+    from src.utils import file_sha256
+    for f in sorted(PROCESSED_DIR.glob("*.parquet")):
+        _record_manifest(con, f, file_sha256(f), _source_files(con, f))
+
+    con.close()
+    if report:
+        _write_report([{"file": parquet_glob, "seconds": time.perf_counter() - started, "stages": stages}],
+                      report, started)
 
 
 if __name__ == "__main__":
-    create_unified_table()
+    # flags are defined once, in src.cli
+    from src.cli import main
+    main(["load", *sys.argv[1:]])
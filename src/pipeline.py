@@ -0,0 +1,231 @@
+# src/pipeline.py
+"""
+Overlapped read -> transform -> write pipeline for the chunks of one file.
+
+The chunked engines parse a chunk, unify it and write it to Parquet one step after the
+other, so the disk, the parser and the Parquet encoder take turns. run_pipeline gives
+each step its own thread(s), connected by bounded queues:
+
+    reader     1 thread     pulls chunks from the source iterator (file read + parse)
+      -> "parsed" queue
+    transform  N threads    transform(chunk), e.g. unify_record + Arrow conversion
+      -> "transformed" queue
+    writer     caller       write(result) in source order (Parquet encode, compress, write)
+
+A full queue blocks its producer (backpressure), so at most queue_size chunks wait
+between two steps and memory stays around 2 * queue_size + workers + 2 chunks however
+large the file is. pandas' C parser, Arrow conversion and Parquet compression release
+the GIL, so the steps run on separate cores. Each queue reports (profiling.record_queue)
+how full it ran and how long its producer was blocked / its consumer starved; bottleneck
+reads those back into the step that limited the run.
+
+prefetching() warms the OS page cache with the head of the next file while the current one is
+processed, on a single background thread.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from src import profiling
+
+# chunks buffered between two steps
+DEFAULT_QUEUE_SIZE = 4
+# bytes per read when the OS has no readahead hint (posix_fadvise)
+PREFETCH_BLOCK = 8 << 20
+# head of the next file warmed while the current one is processed
+PREFETCH_WINDOW = 32 << 20
+
+# end-of-stream marker passed down the queues
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised in a pipeline thread when another step failed and the run is being torn down."""
+
+
+class MonitoredQueue:
+    """
+    Bounded queue that tracks its depth and the time spent blocked on either end; stats()
+    reports the wait per producer / consumer thread so the two ends compare directly.
+    """
+
+    def __init__(self, name: str, maxsize: int, stop: threading.Event, producers: int = 1, consumers: int = 1):
+        self.name = name
+        self.maxsize = maxsize
+        self.producers = producers
+        self.consumers = consumers
+        self._queue = queue.Queue(maxsize)
+        self._stop = stop
+        self._lock = threading.Lock()
+        self.items = 0
+        self.depth_sum = 0
+        self.max_depth = 0
+        self.put_wait_s = 0.0
+        self.get_wait_s = 0.0
+
+    def put(self, item) -> None:
+        start = time.perf_counter()
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    raise PipelineStopped
+        waited, depth = time.perf_counter() - start, self._queue.qsize()
+        with self._lock:
+            self.put_wait_s += waited
+            if item is not _DONE:
+                self.items += 1
+                self.depth_sum += depth
+                self.max_depth = max(self.max_depth, depth)
+
+    def get(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise PipelineStopped
+        with self._lock:
+            self.get_wait_s += time.perf_counter() - start
+        return item
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "capacity": self.maxsize, "items": self.items,
+                "mean_depth": self.depth_sum / self.items if self.items else 0.0,
+                "max_depth": self.max_depth, "put_wait_s": self.put_wait_s / self.producers,
+                "get_wait_s": self.get_wait_s / self.consumers}
+
+
+def run_pipeline(chunks: Iterable, transform: Callable, write: Callable, workers: int = 2,
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> List[Dict]:
+    """
+    Feed chunks through transform (on `workers` threads) into write (on the calling thread,
+    in source order). The first exception raised by any step stops the others and is
+    re-raised here. Returns the queue stats (also recorded with profiling.record_queue).
+    """
+    workers = max(1, workers)
+    stop = threading.Event()
+    parsed = MonitoredQueue("parsed", queue_size, stop, consumers=workers)
+    transformed = MonitoredQueue("transformed", queue_size, stop, producers=workers)
+    errors = []
+
+    def guarded(step: Callable) -> Callable:
+        def run():
+            try:
+                step()
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return run
+
+    def read():
+        for seq, chunk in enumerate(chunks):
+            parsed.put((seq, chunk))
+        for _ in range(workers):
+            parsed.put(_DONE)
+
+    def work():
+        while True:
+            item = parsed.get()
+            if item is _DONE:
+                transformed.put(_DONE)
+                return
+            seq, chunk = item
+            transformed.put((seq, transform(chunk)))
+
+    threads = [threading.Thread(target=guarded(read), name="pipeline-reader", daemon=True)]
+    threads += [threading.Thread(target=guarded(work), name=f"pipeline-transform-{i}", daemon=True)
+                for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    def drain():
+        # transform threads finish out of order; hold results until their turn comes
+        pending, next_seq, done = {}, 0, 0
+        while done < workers:
+            item = transformed.get()
+            if item is _DONE:
+                done += 1
+                continue
+            pending[item[0]] = item[1]
+            while next_seq in pending:
+                write(pending.pop(next_seq))
+                next_seq += 1
+
+    try:
+        guarded(drain)()
+    finally:
+        # after a failure, wake any step still blocked on a queue so it can exit
+        stop.set()
+        for t in threads:
+            t.join()
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    if errors:
+        raise errors[0]
+
+    stats = [parsed.stats(), transformed.stats()]
+    for s in stats:
+        profiling.record_queue(**s)
+    return stats
+
+
+def bottleneck(queues: Dict[str, Dict]) -> str:
+    """
+    The step that limited a run, from its queue stats keyed by queue name: a queue whose
+    producer waited longer on it than its consumer did was kept full by a slow consumer.
+    """
+    parsed, transformed = queues.get("parsed"), queues.get("transformed")
+    if transformed and transformed["put_wait_s"] > transformed["get_wait_s"]:
+        return "write"
+    if parsed and parsed["put_wait_s"] > parsed["get_wait_s"]:
+        return "transform"
+    return "read"
+
+
+def prefetch_file(path: Path, window: int = PREFETCH_WINDOW) -> None:
+    """
+    Ask the OS to read the first `window` bytes of `path` into the page cache (reads them
+    through where there is no hint); the rest of the file is left to the kernel's own
+    readahead once the real read starts. Best effort: a file that can't be read is left
+    for the real read to report.
+    """
+    try:
+        with open(path, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, window, os.POSIX_FADV_WILLNEED)
+                return
+            remaining = window
+            while remaining > 0:
+                block = f.read(min(PREFETCH_BLOCK, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+    except OSError:
+        pass
+
+
+def prefetching(files: List[Path], window: int = PREFETCH_WINDOW) -> Iterator[Path]:
+    """
+    Yield files in order while one background thread prefetches the head of the next file.
+    The thread is shut down (a queued prefetch cancelled) when the iteration ends or stops early.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    try:
+        for i, file in enumerate(files):
+            if i + 1 < len(files):
+                executor.submit(prefetch_file, files[i + 1], window)
+            yield file
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
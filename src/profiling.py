@@ -0,0 +1,184 @@
+# src/profiling.py
+"""
+Lightweight stage instrumentation for the pipeline.
+
+Code marks its stages with `stage(name)` (or `timed_iter` for streamed chunks); inside a
+`collect()` block every stage's wall time, CPU time, rows in/out, bytes read and peak RSS
+are accumulated per stage name. Outside collect() the marks cost two clock reads. Nested
+stages (e.g. "unify" and its "unify.*" sub-steps) are each reported in full.
+
+Stages: header_detection, parse, unify (+ unify.fill_metadata, unify.map_columns,
+unify.extract_state, unify.clean_money), arrow_convert, parquet_write, duckdb_transform,
+cache_lookup, duckdb_load (+ star.hospitals, star.procedures, star.payers, star.charge_facts
+with --schema star), duckdb_index, summaries, search_index.
+
+Stages may be recorded from several threads (src.pipeline); cpu_s is process CPU time, so
+stages that overlap each count the other's CPU. The pipeline's bounded queues are reported
+as "queue.<name>" entries with QUEUE_FIELDS (see record_queue).
+"""
+import cProfile
+import csv
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# per-stage totals of the innermost active collect() block (None = not collecting)
+_active: Optional[Dict[str, Dict]] = None
+_lock = threading.Lock()
+
+STAGE_FIELDS = ["calls", "wall_s", "cpu_s", "rows_in", "rows_out", "bytes_read", "peak_rss_mb"]
+QUEUE_FIELDS = ["capacity", "items", "mean_depth", "max_depth", "put_wait_s", "get_wait_s"]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB (best effort, cross-platform)."""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil exposes the peak working set instead
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def record(name: str, wall_s: float, cpu_s: float, **counts) -> None:
+    """Add one call's measurements to the active collector (no-op when not collecting)."""
+    if _active is None:
+        return
+    rss = peak_rss_mb()
+    with _lock:
+        rec = _active.setdefault(name, {"stage": name, **{f: 0 for f in STAGE_FIELDS}})
+        rec["calls"] += 1
+        rec["wall_s"] += wall_s
+        rec["cpu_s"] += cpu_s
+        for k in ("rows_in", "rows_out", "bytes_read"):
+            rec[k] += counts.get(k) or 0
+        # process high-water mark when the stage ended; in a long-lived process it never goes down
+        rec["peak_rss_mb"] = max(rec["peak_rss_mb"], rss)
+
+
+def record_queue(name: str, capacity: int, items: int, mean_depth: float, max_depth: int,
+                 put_wait_s: float, get_wait_s: float) -> None:
+    """
+    Add one run of a bounded queue to the active collector as stage "queue.<name>":
+    items passed through, depth seen by each put (mean / max, out of capacity), and the
+    time each producer thread spent blocked on a full queue / each consumer thread waited
+    on an empty one.
+    """
+    if _active is None:
+        return
+    with _lock:
+        rec = _active.setdefault(f"queue.{name}", {"stage": f"queue.{name}", **{f: 0 for f in STAGE_FIELDS},
+                                                   **{f: 0 for f in QUEUE_FIELDS}})
+        rec["calls"] += 1
+        total = rec["items"] + items
+        rec["mean_depth"] = (rec["mean_depth"] * rec["items"] + mean_depth * items) / total if total else 0.0
+        rec["items"] = total
+        rec["capacity"] = max(rec["capacity"], capacity)
+        rec["max_depth"] = max(rec["max_depth"], max_depth)
+        rec["put_wait_s"] += put_wait_s
+        rec["get_wait_s"] += get_wait_s
+
+
+@contextmanager
+def stage(name: str, **counts):
+    """
+    Time the enclosed block as one call of stage `name`. Yields a dict the block can fill
+    with rows_in / rows_out / bytes_read.
+    """
+    counts = dict(counts)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield counts
+    finally:
+        record(name, time.perf_counter() - wall, time.process_time() - cpu, **counts)
+
+
+def timed_iter(name: str, items: Iterable, bytes_read: int = 0,
+               rows: Callable = len) -> Iterator:
+    """
+    Wrap a chunk iterator so the time spent producing each chunk counts as stage `name`
+    (the consumer's work between chunks is not included). rows_out = sum of rows(chunk).
+    """
+    it = iter(items)
+    first = True
+    while True:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            item = next(it)
+        except StopIteration:
+            record(name, time.perf_counter() - wall, time.process_time() - cpu,
+                   bytes_read=bytes_read if first else 0)
+            return
+        record(name, time.perf_counter() - wall, time.process_time() - cpu,
+               rows_out=rows(item), bytes_read=bytes_read if first else 0)
+        first = False
+        yield item
+
+
+@contextmanager
+def collect():
+    """Collect stage metrics recorded in this process; the yielded list is filled on exit."""
+    global _active
+    prev, _active = _active, {}
+    stages: List[Dict] = []
+    try:
+        yield stages
+    finally:
+        stages.extend(_active.values())
+        _active = prev
+
+
+@contextmanager
+def profile_to(path: Optional[Path]):
+    """Run the block under cProfile and dump stats to `path` (view with snakeviz/pstats); no-op if None."""
+    if path is None:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(str(path))
+
+
+def stage_rows(results: List[Dict]) -> List[Dict]:
+    """Flatten per-file results into one row per file x stage."""
+    return [{"file": r["file"], **s} for r in results for s in r.get("stages") or []]
+
+
+def write_report(results: List[Dict], path: Path, run_info: Optional[Dict] = None) -> None:
+    """
+    Write a run report: .csv gives one row per file x stage; anything else is JSON with
+    the run info and the full per-file results (stages nested).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["file", "stage"] + STAGE_FIELDS + QUEUE_FIELDS, restval="")
+            writer.writeheader()
+            writer.writerows(stage_rows(results))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"run": run_info or {}, "files": results}, f, indent=2, default=str)
+
+
+def slowest_files(results: List[Dict], top: int = 5) -> List[Dict]:
+    """The `top` files with the largest total wall time, with their slowest stage."""
+    out = []
+    for r in results:
+        stages = [s for s in r.get("stages") or [] if "." not in s["stage"]]
+        slowest = max(stages, key=lambda s: s["wall_s"], default=None)
+        out.append({"file": r["file"], "seconds": r.get("seconds", 0.0),
+                    "slowest_stage": slowest["stage"] if slowest else None})
+    return sorted(out, key=lambda r: r["seconds"], reverse=True)[:top]
@@ -0,0 +1,207 @@
+# src/query_service.py
+"""
+Query layer for the Streamlit explorer.
+
+- one shared read-only DuckDB connection per database file version; each query runs on
+  its own cursor, so concurrent sessions don't share statement state. The connection is
+  dropped after idle_seconds so its file lock doesn't block load_duckdb for good
+- SELECT-like queries are paged: wrapped in LIMIT/OFFSET and fetched as Arrow record
+  batches, so a bare `SELECT *` never pulls the whole table into memory
+- page results are kept in an LRU cache keyed on normalized SQL + page + DB file version,
+  with a TTL and a total-size budget
+- a per-query timeout interrupts DuckDB when exceeded
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import duckdb
+import pyarrow as pa
+
+# string literals ('...', $$...$$), quoted identifiers and comments: kept (or dropped) verbatim by normalize_sql
+_SQL_TOKEN_RE = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|\$\$.*?\$\$|--[^\n]*|/\*.*?\*/)""", re.S)
+# statements that produce a row set we can wrap as a subquery
+_PAGEABLE = {"select", "with", "from", "values", "table"}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a query for cache keys: comments removed, whitespace collapsed,
+    keywords and identifiers lower-cased (outside quotes), trailing semicolons dropped.
+    """
+    parts, code = [], ""
+    for tok in _SQL_TOKEN_RE.split(sql):
+        if tok.startswith(("'", '"', "$$")):
+            parts.append(re.sub(r"\s+", " ", code.lower()))
+            parts.append(tok)
+            code = ""
+        else:
+            code += " " if tok.startswith(("--", "/*")) else tok
+    parts.append(re.sub(r"\s+", " ", code.lower()))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def is_pageable(normalized_sql: str) -> bool:
+    """True for a single SELECT-like statement that can be wrapped in LIMIT/OFFSET."""
+    unquoted = _SQL_TOKEN_RE.sub("", normalized_sql)
+    first = re.match(r"[\s(]*([a-z_]*)", unquoted).group(1)
+    return first in _PAGEABLE and ";" not in unquoted
+
+
+def _strip_semicolons(sql: str) -> str:
+    """sql without its statement-ending semicolons (a pageable query has no others), verbatim otherwise."""
+    return "".join(tok if _SQL_TOKEN_RE.fullmatch(tok) else tok.replace(";", "")
+                   for tok in _SQL_TOKEN_RE.split(sql)).strip()
+
+
+def db_version(db_path: Path) -> Tuple:
+    """(mtime_ns, size) of the database file and its WAL; changes whenever a load commits."""
+    version = ()
+    for p in (db_path, Path(f"{db_path}.wal")):
+        if p.exists():
+            st = p.stat()
+            version += (st.st_mtime_ns, st.st_size)
+    return version
+
+
+class ResultCache:
+    """Thread-safe LRU of Arrow tables with a TTL and a byte budget."""
+
+    def __init__(self, max_bytes: int = 256 * 2**20, ttl_seconds: float = 600):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Tuple, Tuple[float, pa.Table]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[pa.Table]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl_seconds:
+                if item is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Tuple, table: pa.Table) -> None:
+        if table.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._pop(key)
+            self._items[key] = (time.monotonic(), table)
+            self._bytes += table.nbytes
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._items)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def _pop(self, key: Tuple) -> None:
+        _, table = self._items.pop(key)
+        self._bytes -= table.nbytes
+
+
+class QueryService:
+    """Read-only, paged, cached access to the hospital DuckDB file."""
+
+    def __init__(self, db_path: Path, cache: Optional[ResultCache] = None,
+                 timeout_seconds: float = 30, batch_rows: int = 10_000, idle_seconds: float = 60):
+        self.db_path = Path(db_path)
+        self.cache = cache or ResultCache()
+        self.timeout_seconds = timeout_seconds
+        self.batch_rows = batch_rows
+        self.idle_seconds = idle_seconds
+        self._con = None
+        self._con_version = None
+        self._idle_timer = None
+        self._lock = threading.Lock()
+
+    def _cursor(self, version: Tuple):
+        # reopen when the file changed: a read-only connection keeps serving its old snapshot
+        with self._lock:
+            if self._con is None or self._con_version != version:
+                # not closed explicitly: cursors still running on the old one keep it alive
+                self._con = duckdb.connect(str(self.db_path), read_only=True)
+                self._con_version = version
+            if self._idle_timer:
+                self._idle_timer.cancel()
+            self._idle_timer = threading.Timer(self.idle_seconds, self.release)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+            return self._con.cursor()
+
+    def release(self) -> None:
+        """Drop the shared connection; DuckDB closes the file once running cursors finish."""
+        with self._lock:
+            self._con = None
+            self._con_version = None
+
+    def query_page(self, sql: str, page: int = 0, page_size: int = 500,
+                   timeout_seconds: Optional[float] = None) -> Dict:
+        """
+        Run one page of `sql`. Returns {"table": pa.Table, "has_more": bool, "paged": bool,
+        "cached": bool, "seconds": float}. Non-SELECT statements (SHOW, DESCRIBE, ...) run as-is.
+        """
+        start = time.perf_counter()
+        normalized = normalize_sql(sql)
+        paged = is_pageable(normalized)
+        version = db_version(self.db_path)
+        key = (normalized, page if paged else 0, page_size if paged else 0, version)
+
+        table = self.cache.get(key)
+        cached = table is not None
+        if not cached:
+            if paged:
+                # fetch one extra row to learn whether another page exists
+                # the user's SQL, not the cache-key form: normalizing changes aliases, literals
+                # and $$ strings. Newlines keep a trailing -- comment off the closing parenthesis.
+                run_sql = (f"SELECT * FROM (\n{_strip_semicolons(sql)}\n) "
+                           f"LIMIT {page_size + 1} OFFSET {page * page_size}")
+            else:
+                run_sql = sql
+            table = self._fetch(run_sql, version, max_rows=page_size + 1 if paged else None,
+                                timeout_seconds=timeout_seconds)
+            self.cache.put(key, table)
+
+        has_more = paged and table.num_rows > page_size
+        if has_more:
+            table = table.slice(0, page_size)
+        return {"table": table, "has_more": has_more, "paged": paged, "cached": cached,
+                "seconds": time.perf_counter() - start}
+
+    def list_tables(self) -> pa.Table:
+        return self.query_page("SHOW TABLES")["table"]
+
+    def _fetch(self, sql: str, version: Tuple, max_rows: Optional[int],
+               timeout_seconds: Optional[float]) -> pa.Table:
+        cur = self._cursor(version)
+        timeout = timeout_seconds if timeout_seconds is not None else self.timeout_seconds
+        timer = threading.Timer(timeout, cur.interrupt) if timeout else None
+        try:
+            if timer:
+                timer.start()
+            reader = cur.execute(sql).fetch_record_batch(self.batch_rows)
+            batches, rows = [], 0
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if max_rows is not None and rows >= max_rows:
+                    break
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+            return table.slice(0, max_rows) if max_rows is not None else table
+        except duckdb.InterruptException:
+            raise TimeoutError(f"Query exceeded {timeout:g}s and was cancelled.") from None
+        finally:
+            if timer:
+                timer.cancel()
+            cur.close()
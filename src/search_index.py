@@ -0,0 +1,155 @@
+# src/search_index.py
+"""
+Ranked procedure search over code_1 and description.
+
+build_search_index collapses hospital_charges to its distinct (code_1, code_1_type,
+description) documents in one GROUP BY and indexes their words in plain DuckDB tables
+(DuckDB's fts extension needs a download, which offline installs can't do):
+
+    search_docs      doc_id, code_1, code_1_type, description, n_rows, doc_len
+    search_postings  term -> doc_id, tf
+    search_vocab     term -> df, idf
+    search_trigrams  trigram -> term (for typo-tolerant / prefix matching)
+
+search_sql expands each query word to similar vocabulary terms (trigram candidates kept
+on trigram overlap or edit distance; words with digits, i.e. codes, only match exactly or
+as a prefix), scores documents with BM25 weighted by that similarity, and ranks
+codes by how many query words they match, then by score. The chosen code then drives an
+ordinary code_1 lookup, which hits the clustered / indexed hospital_charges.
+"""
+import re
+from typing import List
+
+from src.layout import present_columns
+from src.profiling import stage
+
+DOCS_TABLE = "search_docs"
+POSTINGS_TABLE = "search_postings"
+VOCAB_TABLE = "search_vocab"
+TRIGRAMS_TABLE = "search_trigrams"
+SEARCH_TABLES = [DOCS_TABLE, POSTINGS_TABLE, VOCAB_TABLE, TRIGRAMS_TABLE]
+
+# a term is a run of lowercase letters/digits ("MRI BRAIN W/O DYE" -> mri, brain, w, o, dye)
+TOKEN_PATTERN = "[a-z0-9]+"
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# a vocabulary term stands in for a query word when their similarity (the better of trigram
+# Jaccard and 1 - Damerau-Levenshtein distance / length) is at least this; a term the word
+# is a prefix of (3+ characters) counts as PREFIX_SIMILARITY
+MIN_SIMILARITY = 0.5
+PREFIX_SIMILARITY = 0.9
+# vocabulary terms kept per query word
+MAX_EXPANSIONS = 10
+# the indexed text of a document: its code and description
+DOC_TEXT = "lower(coalesce(code_1, '') || ' ' || coalesce(description, ''))"
+
+
+def build_search_index(con) -> int:
+    """(Re)build the search tables from hospital_charges; returns the number of documents."""
+    wanted = ["code_1", "code_1_type", "description"]
+    present = set(present_columns(con, "hospital_charges", wanted))
+    cols = ", ".join(c if c in present else f"NULL::VARCHAR AS {c}" for c in wanted)
+    with stage("search_index") as rec:
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {DOCS_TABLE} AS
+            SELECT row_number() OVER (ORDER BY code_1, code_1_type, description) AS doc_id,
+                   code_1, code_1_type, description, n_rows,
+                   len(regexp_extract_all({DOC_TEXT}, '{TOKEN_PATTERN}')) AS doc_len
+            FROM (SELECT code_1, code_1_type, description, count(*) AS n_rows
+                  FROM (SELECT {cols} FROM hospital_charges) AS charges
+                  WHERE code_1 IS NOT NULL OR description IS NOT NULL
+                  GROUP BY ALL) AS docs
+        """)
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {POSTINGS_TABLE} AS
+            SELECT term, doc_id, count(*)::INTEGER AS tf
+            FROM (SELECT doc_id, unnest(regexp_extract_all({DOC_TEXT}, '{TOKEN_PATTERN}')) AS term
+                  FROM {DOCS_TABLE}) AS terms
+            GROUP BY ALL ORDER BY term
+        """)
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {VOCAB_TABLE} AS
+            SELECT term, count(*) AS df,
+                   ln(1 + ((SELECT count(*) FROM {DOCS_TABLE}) - count(*) + 0.5) / (count(*) + 0.5)) AS idf
+            FROM {POSTINGS_TABLE} GROUP BY term ORDER BY term
+        """)
+        # trigrams of ' term ', so short terms get one and word starts weigh in
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {TRIGRAMS_TABLE} AS
+            SELECT trigram, term, count(*) OVER (PARTITION BY term) AS n_trigrams
+            FROM (SELECT DISTINCT term, substr(padded, i, 3) AS trigram
+                  FROM (SELECT term, padded, unnest(range(1, length(padded) - 1)) AS i
+                        FROM (SELECT term, ' ' || term || ' ' AS padded FROM {VOCAB_TABLE}) AS v) AS p) AS g
+            ORDER BY trigram
+        """)
+        rec["rows_out"] = con.execute(f"SELECT count(*) FROM {DOCS_TABLE}").fetchone()[0]
+    return rec["rows_out"]
+
+
+def tokenize(text: str) -> List[str]:
+    """The terms of text, as the index splits descriptions."""
+    return re.findall(TOKEN_PATTERN, text.lower())
+
+
+def trigrams(term: str) -> List[str]:
+    padded = f" {term} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def search_sql(query: str, limit: int = 50) -> str:
+    """SELECT of the codes best matching query (free text and/or codes), best first."""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        raise ValueError("Search query has no letters or digits")
+    grams = ", ".join(f"('{t}', '{g}', {len(trigrams(t))})" for t in tokens for g in trigrams(t))
+    return f"""
+        WITH query_grams(token, trigram, n_grams) AS (VALUES {grams}),
+        candidates AS (
+            SELECT q.token, t.term,
+                   CASE WHEN t.term = q.token THEN 1
+                        WHEN length(q.token) >= 3 AND starts_with(t.term, q.token) THEN {PREFIX_SIMILARITY}
+                        WHEN regexp_matches(q.token, '[0-9]') THEN 0
+                        ELSE greatest(count(*) / (q.n_grams + t.n_trigrams - count(*)),
+                                      1 - damerau_levenshtein(q.token, t.term)
+                                          / greatest(length(q.token), length(t.term))) END AS sim
+            FROM query_grams q JOIN {TRIGRAMS_TABLE} t USING (trigram)
+            GROUP BY q.token, t.term, q.n_grams, t.n_trigrams
+        ),
+        expanded AS (
+            SELECT token, term, sim FROM candidates WHERE sim >= {MIN_SIMILARITY}
+            QUALIFY row_number() OVER (PARTITION BY token ORDER BY sim DESC, term) <= {MAX_EXPANSIONS}
+        ),
+        token_scores AS (
+            -- a query word counts once per document: its best-matching term
+            SELECT p.doc_id, e.token,
+                   max(e.sim * v.idf * p.tf * {K1 + 1}
+                       / (p.tf + {K1} * (1 - {B} + {B} * d.doc_len
+                                          / (SELECT avg(doc_len) FROM {DOCS_TABLE})))) AS score
+            FROM expanded e
+            JOIN {VOCAB_TABLE} v USING (term)
+            JOIN {POSTINGS_TABLE} p USING (term)
+            JOIN {DOCS_TABLE} d ON d.doc_id = p.doc_id
+            GROUP BY p.doc_id, e.token
+        ),
+        doc_scores AS (
+            SELECT doc_id, count(*) AS matched, sum(score) AS score FROM token_scores GROUP BY doc_id
+        )
+        SELECT d.code_1, d.code_1_type,
+               arg_max(d.description, s.score) AS description,
+               max(s.matched) AS matched_terms, round(max(s.score), 3) AS score,
+               sum(d.n_rows)::BIGINT AS n_rows
+        FROM doc_scores s JOIN {DOCS_TABLE} d USING (doc_id)
+        WHERE d.code_1 IS NOT NULL
+        GROUP BY d.code_1, d.code_1_type
+        ORDER BY matched_terms DESC, score DESC, n_rows DESC
+        LIMIT {int(limit)}
+    """
+
+
+def code_lookup_sql(code: str, code_type: str = None) -> str:
+    """SELECT of a code's rows in hospital_charges (clustered/indexed on code_1)."""
+    where = "code_1 = '" + code.replace("'", "''") + "'"
+    if code_type:
+        where += " AND code_1_type = '" + code_type.replace("'", "''") + "'"
+    return f"SELECT * FROM hospital_charges WHERE {where}"
@@ -0,0 +1,193 @@
+# src/sniff.py
+"""
+Bounded-read CSV sniffing: everything the readers need to know about a file's top, from
+one block of bytes.
+
+sniff_csv reads SNIFF_BYTES from the start of the file (more only while the block ends before
+the header and a data line, e.g. a wide header longer than the block) and from that buffer
+alone works out
+
+- the encoding: a UTF-8 / UTF-16 byte-order mark, else UTF-8 if the block decodes, else cp1252
+- the logical lines (a newline inside quotes doesn't end a line), up to n_preview of them
+- the header line: the first line with a known CMS header token, else the line with the most
+  fields; the lines above it are the metadata rows
+- the delimiter and quote character: the candidates under which the lines below the header
+  split into as many fields as the header ("code|1" keeps '|' from winning on CMS headers)
+- byte offsets of the header line and of the first data line, so the pandas, Arrow and
+  DuckDB readers seek straight to the data instead of re-reading the top of the file.
+
+Startup cost no longer depends on file size, and files shorter than the preview are fine.
+"""
+import codecs
+import csv
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from src.profiling import stage
+
+# bytes read per sniff block
+SNIFF_BYTES = 64 << 10
+# stop growing the buffer here even if no line has ended yet
+MAX_SNIFF_BYTES = 64 << 20
+# logical lines kept for header / metadata detection
+N_PREVIEW = 25
+
+KNOWN_HEADER_TOKENS = {
+    "description", "code", "code|1", "code|1|type", "standard_charge|gross",
+    "standard_charge|discounted_cash", "payer_name", "plan_name", "billing_class",
+    "setting", "modifiers"
+}
+
+# in order of preference when several split the lines equally well
+DELIMITERS = [",", "\t", ";", "|"]
+QUOTECHARS = ['"', "'"]
+
+_BOMS = [(codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")]
+
+
+class CsvSniff(NamedTuple):
+    """What sniff_csv learned from the top of a CSV; offsets are bytes from the start of the file."""
+    encoding: str
+    delimiter: str
+    quotechar: str
+    header_idx: int
+    lines: List[str]
+    # length of the byte-order mark the lines start after
+    bom: int = 0
+    # bytes each line takes in the file (undecodable bytes show up in lines as U+FFFD)
+    line_bytes: Tuple[int, ...] = ()
+
+    def line_offset(self, i: int) -> int:
+        """Byte offset of preview line i (i == len(lines) is the end of the preview)."""
+        return self.bom + sum(self.line_bytes[:i])
+
+    @property
+    def header_offset(self) -> int:
+        return self.line_offset(self.header_idx)
+
+    @property
+    def data_offset(self) -> int:
+        return self.line_offset(self.header_idx + 1)
+
+    @property
+    def header(self) -> List[str]:
+        """The raw header names ([] for an empty file)."""
+        if not self.lines:
+            return []
+        return next(csv.reader([self.lines[self.header_idx]], delimiter=self.delimiter, quotechar=self.quotechar), [])
+
+    @property
+    def metadata_lines(self) -> List[str]:
+        """The top lines metadata is read from (the rows above the header, and the header itself)."""
+        return self.lines[: max(5, self.header_idx + 2)]
+
+
+def header_token_index(lines: List[str]) -> Optional[int]:
+    """Index of the first line containing a known header token, or None."""
+    for i, line in enumerate(lines):
+        low = line.lower()
+        if any(token in low for token in KNOWN_HEADER_TOKENS):
+            return i
+    return None
+
+
+def _errors(encoding: str) -> str:
+    """
+    Decode error handler that keeps every character's byte length recoverable: undecodable
+    bytes become lone surrogates that re-encode to the same bytes. UTF-16 has no such
+    handler, but its replacement characters take the 2 bytes of the code unit they replace.
+    """
+    return "replace" if encoding.startswith("utf-16") else "surrogateescape"
+
+
+def _decode(block: bytes, eof: bool):
+    """(encoding, BOM length, text) of a block; a multi-byte character cut off at the end is dropped."""
+    for bom, encoding in _BOMS:
+        if block.startswith(bom):
+            decoder = codecs.getincrementaldecoder(encoding)(_errors(encoding))
+            return encoding, len(bom), decoder.decode(block[len(bom):], eof)
+    try:
+        return "utf-8", 0, codecs.getincrementaldecoder("utf-8")().decode(block, eof)
+    except UnicodeDecodeError:
+        return "cp1252", 0, block.decode("cp1252", errors=_errors("cp1252"))
+
+
+def _split_lines(text: str, eof: bool, limit: int, quotechar: str = '"') -> List[str]:
+    """Up to `limit` complete logical lines of text, line endings kept."""
+    lines, start, quoted = [], 0, False
+    for m in re.finditer(re.escape(quotechar) + "|\n", text):
+        if m.group() == quotechar:
+            quoted = not quoted
+        elif not quoted:
+            lines.append(text[start:m.end()])
+            start = m.end()
+            if len(lines) == limit:
+                return lines
+    if eof and text[start:].strip():
+        lines.append(text[start:])
+    return lines
+
+
+def _field_count(line: str, delimiter: str, quotechar: str) -> int:
+    """Fields in one logical line (0 if it doesn't parse, e.g. an unbalanced quote)."""
+    try:
+        return len(next(csv.reader([line], delimiter=delimiter, quotechar=quotechar), []))
+    except csv.Error:
+        return 0
+
+
+def _dialect(lines: List[str], header_idx: Optional[int]):
+    """(delimiter, quotechar, header_idx): the dialect whose data lines best match the header's width."""
+    best = None
+    for delimiter in DELIMITERS:
+        for quotechar in QUOTECHARS:
+            counts = [_field_count(line, delimiter, quotechar) for line in lines]
+            idx = header_idx if header_idx is not None else max(range(len(counts)), key=counts.__getitem__)
+            width = counts[idx]
+            if width < 2:
+                continue
+            below = counts[idx + 1:]
+            score = sum(c == width for c in below) / len(below) if below else 1.0
+            if best is None or score > best[0]:
+                best = (score, delimiter, quotechar, idx)
+    if best is None:
+        return DELIMITERS[0], QUOTECHARS[0], header_idx or 0
+    return best[1:]
+
+
+def sniff_csv(file_path: Path, n_preview: int = N_PREVIEW, block_size: int = SNIFF_BYTES) -> CsvSniff:
+    """Sniff the encoding, dialect, header line and data offset of a CSV from its first block."""
+    with stage("header_detection") as rec:
+        with open(file_path, "rb") as f:
+            block = f.read(block_size)
+            eof = len(block) < block_size
+            while True:
+                encoding, bom, text = _decode(block, eof)
+                lines = _split_lines(text, eof, n_preview)
+                idx = header_token_index(lines)
+                # enough once the preview is full or it holds the header and a line below it
+                if (len(lines) >= n_preview or (idx is not None and idx + 1 < len(lines))
+                        or eof or len(block) >= MAX_SNIFF_BYTES):
+                    break
+                more = f.read(len(block))
+                eof = len(more) < len(block)
+                block += more
+        rec["bytes_read"] = len(block)
+
+    if not lines:
+        return CsvSniff(encoding, DELIMITERS[0], QUOTECHARS[0], 0, [], bom)
+    delimiter, quotechar, header_idx = _dialect(_clean(lines, encoding), idx)
+    if quotechar != '"':
+        # newlines inside the file's own quotes don't end a line either
+        lines = _split_lines(text, eof, n_preview, quotechar)
+        delimiter, quotechar, header_idx = _dialect(_clean(lines, encoding), header_token_index(lines))
+    line_bytes = tuple(len(line.encode(encoding, errors=_errors(encoding))) for line in lines)
+    return CsvSniff(encoding, delimiter, quotechar, header_idx, _clean(lines, encoding), bom, line_bytes)
+
+
+def _clean(lines: List[str], encoding: str) -> List[str]:
+    """The lines with undecodable bytes as U+FFFD instead of the surrogates _decode keeps them as."""
+    if _errors(encoding) == "replace":
+        return lines
+    return [line.encode(encoding, errors="surrogateescape").decode(encoding, errors="replace") for line in lines]
@@ -0,0 +1,10 @@
+# src/sql.py
+"""
+SQL text helpers shared by the DuckDB stages (engine, dataset layout), kept free of pandas /
+pyarrow so any stage can import them.
+"""
+
+
+def literal(value) -> str:
+    """A DuckDB string literal for value (NULL for None), single quotes doubled."""
+    return "NULL" if value is None else "'" + str(value).replace("'", "''") + "'"
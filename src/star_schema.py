@@ -0,0 +1,160 @@
+# src/star_schema.py
+"""
+Normalized (star-schema) storage for the unified charges (load_duckdb --schema star).
+
+    hospitals     hospital_id  -> state, hospital_name, hospital_address, license_number,
+                                  last_updated_on, version, hospital_location, source_file
+    procedures    procedure_id -> code_1, code_1_type, code_2, code_2_type, code_3, code_3_type, description
+    payers        payer_id     -> payer_name, plan_name
+    charge_facts  hospital_id, procedure_id, payer_id + the per-charge columns (FACT_COLUMNS and
+                  any non-canonical columns the Parquet files carry)
+
+A hospitals row is one published file's metadata (keyed with its source_file), so deleting or
+reloading a file touches only its own facts. Procedure and payer rows are shared by every
+file: a description is stored once however many hospitals bill the code. Identical charge
+rows are collapsed as they are loaded: the batch's fact rows EXCEPT the facts already stored
+for the same hospital files (a hash aggregate, exact on every column, NULLs equal).
+
+hospital_charges becomes a view joining the tables back into the flat CANONICAL_COLUMNS
+layout, so the app, price summaries and search index read it unchanged. Ids follow the
+natural sort order (procedures by code_1, ...) and facts are stored in (procedure_id,
+payer_id) order, so a code lookup through the view reads only the matching fact row groups.
+Procedure and payer rows no facts refer to any more are kept until the next full rebuild.
+"""
+from typing import Dict, List, Tuple
+
+from src.columns import CANONICAL_COLUMNS, MONEY_COLUMNS
+from src.profiling import stage
+
+VIEW = "hospital_charges"
+FACT_TABLE = "charge_facts"
+
+# table -> (surrogate key, natural key columns in id order)
+DIMENSIONS: Dict[str, Tuple[str, List[str]]] = {
+    "hospitals": ("hospital_id", ["state", "hospital_name", "hospital_address", "license_number",
+                                  "last_updated_on", "version", "hospital_location", "source_file"]),
+    "procedures": ("procedure_id", ["code_1", "code_1_type", "code_2", "code_2_type", "code_3", "code_3_type",
+                                    "description"]),
+    "payers": ("payer_id", ["payer_name", "plan_name"]),
+}
+DIMENSION_COLUMNS = {c for _, cols in DIMENSIONS.values() for c in cols}
+FACT_KEYS = [key for key, _ in DIMENSIONS.values()]
+FACT_COLUMNS = [c for c in CANONICAL_COLUMNS if c not in DIMENSION_COLUMNS]
+FACT_ORDER = ["procedure_id", "payer_id"]
+STAR_TABLES = [FACT_TABLE] + list(DIMENSIONS)
+
+
+def is_star(con) -> bool:
+    """True if the database holds the star schema (hospital_charges is then a view)."""
+    # no bound parameter: binding one makes duckdb import pandas (see load_duckdb._table_exists)
+    return con.execute(f"SELECT count(*) FROM information_schema.tables WHERE table_name = '{FACT_TABLE}'"
+                       ).fetchone()[0] > 0
+
+
+def drop_star(con) -> None:
+    """Drop the view and every star table (a flat hospital_charges table is left alone)."""
+    if is_star(con):
+        con.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    for table in STAR_TABLES:
+        con.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _ensure_tables(con, source_types: Dict[str, str]) -> None:
+    for table, (key, cols) in DIMENSIONS.items():
+        defs = ", ".join([f"{key} INTEGER"] + [f"{c} VARCHAR" for c in cols])
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} ({defs})")
+    wanted = [(k, "INTEGER") for k in FACT_KEYS]
+    wanted += [(c, source_types.get(c, "DOUBLE" if c in MONEY_COLUMNS else "VARCHAR")) for c in FACT_COLUMNS]
+    # columns outside the canonical layout (e.g. demo-mode files) are kept on the facts
+    wanted += [(c, t) for c, t in source_types.items() if c not in DIMENSION_COLUMNS and c not in FACT_COLUMNS]
+    con.execute(f"CREATE TABLE IF NOT EXISTS {FACT_TABLE} "
+                f"({', '.join(f'{_quote(c)} {t}' for c, t in wanted)})")
+    have = {r[0] for r in con.execute(f"DESCRIBE {FACT_TABLE}").fetchall()}
+    for c, t in wanted:
+        if c not in have:
+            con.execute(f"ALTER TABLE {FACT_TABLE} ADD COLUMN {_quote(c)} {t}")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _fact_columns(con) -> List[str]:
+    return [r[0] for r in con.execute(f"DESCRIBE {FACT_TABLE}").fetchall() if r[0] not in FACT_KEYS]
+
+
+def _same(cols: List[str], left: str, right: str) -> str:
+    return " AND ".join(f"{left}.{c} IS NOT DISTINCT FROM {right}.{c}" for c in cols)
+
+
+def insert_rows(con, source: str) -> int:
+    """
+    Load the rows of relation `source` (a table function or subquery over canonical
+    Parquet) into the star tables: new dimension rows get the next ids, and fact rows not
+    already stored are appended. Returns the number of fact rows inserted.
+    """
+    source_types = {r[0]: r[1] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+    _ensure_tables(con, source_types)
+    staged = ", ".join([f"{c}::VARCHAR AS {c}" if c in source_types else f"NULL::VARCHAR AS {c}"
+                        for c in sorted(DIMENSION_COLUMNS)]
+                       + [_quote(c) for c in source_types if c not in DIMENSION_COLUMNS])
+    con.execute(f"CREATE OR REPLACE TEMP TABLE star_batch AS SELECT {staged} FROM {source}")
+
+    for table, (key, cols) in DIMENSIONS.items():
+        with stage(f"star.{table}"):
+            keys = ", ".join(cols)
+            con.execute(f"""
+                INSERT INTO {table}
+                SELECT (SELECT coalesce(max({key}), 0) FROM {table}) + row_number() OVER (ORDER BY {keys}), {keys}
+                FROM (SELECT DISTINCT {keys} FROM star_batch) AS b
+                WHERE NOT EXISTS (SELECT 1 FROM {table} d WHERE {_same(cols, 'd', 'b')})
+            """)
+
+    with stage(f"star.{FACT_TABLE}") as rec:
+        fact_cols = _fact_columns(con)
+        present = {c for c in fact_cols if c in source_types}
+        joins = " ".join(f"JOIN {table} ON {_same(cols, table, 'b')}" for table, (_, cols) in DIMENSIONS.items())
+        values = ", ".join(FACT_KEYS + [f"b.{_quote(c)}" if c in present else f"NULL AS {_quote(c)}"
+                                        for c in fact_cols])
+        columns = ", ".join(FACT_KEYS + [_quote(c) for c in fact_cols])
+        before = con.execute(f"SELECT count(*) FROM {FACT_TABLE}").fetchone()[0]
+        con.execute(f"""
+            INSERT INTO {FACT_TABLE} ({columns})
+            WITH batch AS MATERIALIZED (SELECT {values} FROM star_batch b {joins})
+            SELECT * FROM (
+                SELECT * FROM batch
+                EXCEPT
+                SELECT {columns} FROM {FACT_TABLE}
+                WHERE hospital_id IN (SELECT DISTINCT hospital_id FROM batch)
+            ) AS new_rows
+            ORDER BY {', '.join(FACT_ORDER)}
+        """)
+        rec["rows_out"] = con.execute(f"SELECT count(*) FROM {FACT_TABLE}").fetchone()[0] - before
+    con.execute("DROP TABLE star_batch")
+    create_view(con)
+    return rec["rows_out"]
+
+
+def delete_source_files(con, source_files: List[str]) -> None:
+    """Delete the facts and hospital rows that came from these source files."""
+    hospital_ids = "SELECT hospital_id FROM hospitals WHERE list_contains(?, source_file)"
+    con.execute(f"DELETE FROM {FACT_TABLE} WHERE hospital_id IN ({hospital_ids})", [source_files])
+    con.execute("DELETE FROM hospitals WHERE list_contains(?, source_file)", [source_files])
+
+
+def create_view(con) -> None:
+    """(Re)create hospital_charges over the star tables: CANONICAL_COLUMNS, then any extra fact columns."""
+    owner = {c: table for table, (_, cols) in DIMENSIONS.items() for c in cols}
+    fact_cols = _fact_columns(con)
+    select = [f"{owner.get(c, 'f')}.{c}" for c in CANONICAL_COLUMNS]
+    select += [f"f.{_quote(c)}" for c in fact_cols if c not in CANONICAL_COLUMNS]
+    joins = " ".join(f"JOIN {table} USING ({key})" for table, (key, _) in DIMENSIONS.items())
+    con.execute(f"CREATE OR REPLACE VIEW {VIEW} AS SELECT {', '.join(select)} FROM {FACT_TABLE} f {joins}")
+
+
+def create_indexes(con, columns: List[str]) -> None:
+    """ART indexes on the dimension tables holding `columns` (the view itself can't be indexed)."""
+    for table, (_, cols) in DIMENSIONS.items():
+        for col in [c for c in columns if c in cols]:
+            with stage("duckdb_index"):
+                con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col} ON {table} ({col})")
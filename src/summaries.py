@@ -0,0 +1,138 @@
+# src/summaries.py
+"""
+Materialized price summaries for the explorer.
+
+price_summary holds negotiated-dollar statistics per code_1 at several grains (code,
+code x state, code x payer, code x state x payer, code x hospital), computed in one
+GROUPING SETS scan of hospital_charges. Quartiles are exact (quantile_cont): most groups
+hold a few prices, and a fixed-size approx_quantile sketch per group costs far more
+memory than the values themselves. The table is stored ordered by code_1, so a
+"compare prices for a code" lookup reads a handful of rows instead of scanning every charge.
+
+Quantiles don't merge, so incremental loads refresh by code: load_duckdb marks the
+code_1 values of every file it deletes or inserts (mark_codes), and refresh_summaries
+recomputes just those codes' rows.
+"""
+from typing import Dict, List
+
+from src.layout import present_columns
+from src.profiling import stage
+
+SUMMARY_TABLE = "price_summary"
+# temp table of code_1 values whose summary rows are stale
+CHANGED_CODES_TABLE = "summary_changed_codes"
+
+# grain name -> grouping columns (all start with code_1)
+SUMMARY_LEVELS: Dict[str, List[str]] = {
+    "code": ["code_1"],
+    "code_state": ["code_1", "state"],
+    "code_payer": ["code_1", "payer_name"],
+    "code_state_payer": ["code_1", "state", "payer_name"],
+    "code_hospital": ["code_1", "hospital_name"],
+}
+DIMENSIONS = ["state", "payer_name", "hospital_name"]
+PRICE_COLUMN = "standard_charge_negotiated_dollar"
+SOURCE_COLUMNS = ["code_1", "description", "hospital_name", "state", "payer_name", PRICE_COLUMN,
+                  "standard_charge_gross", "standard_charge_discounted_cash"]
+
+
+def _level_case() -> str:
+    """CASE over GROUPING(DIMENSIONS) naming each grouping set's level."""
+    whens = []
+    for level, cols in SUMMARY_LEVELS.items():
+        # GROUPING sets a dimension's bit (first = most significant) when it is rolled up
+        mask = sum(1 << (len(DIMENSIONS) - 1 - i) for i, d in enumerate(DIMENSIONS) if d not in cols)
+        whens.append(f"WHEN {mask} THEN '{level}'")
+    return f"CASE GROUPING({', '.join(DIMENSIONS)}) {' '.join(whens)} END"
+
+
+def summary_sql(con, where: str = "") -> str:
+    """The summary SELECT over hospital_charges (columns it lacks are read as NULL)."""
+    present = set(present_columns(con, "hospital_charges", SOURCE_COLUMNS))
+    src = ", ".join(c if c in present else
+                    f"NULL::{'DOUBLE' if c.startswith('standard_charge') else 'VARCHAR'} AS {c}"
+                    for c in SOURCE_COLUMNS)
+    sets = ", ".join("(" + ", ".join(cols) + ")" for cols in SUMMARY_LEVELS.values())
+    price = PRICE_COLUMN
+    return f"""
+        SELECT level, code_1, {', '.join(DIMENSIONS)}, description, n_rows, n_hospitals, n_prices,
+               min_price, quartiles[1] AS p25_price, quartiles[2] AS median_price, quartiles[3] AS p75_price,
+               max_price, avg_price, median_gross, median_cash
+        FROM (
+            SELECT {_level_case()} AS level, code_1, {', '.join(DIMENSIONS)},
+                   min(description) AS description,
+                   count(*) AS n_rows,
+                   count(DISTINCT hospital_name) AS n_hospitals,
+                   count({price}) AS n_prices,
+                   min({price}) AS min_price,
+                   quantile_cont({price}, [0.25, 0.5, 0.75]) AS quartiles,
+                   max({price}) AS max_price,
+                   avg({price}) AS avg_price,
+                   quantile_cont(standard_charge_gross, 0.5) AS median_gross,
+                   quantile_cont(standard_charge_discounted_cash, 0.5) AS median_cash
+            FROM (SELECT {src} FROM hospital_charges) AS charges
+            WHERE code_1 IS NOT NULL {where}
+            GROUP BY GROUPING SETS ({sets})
+        ) AS grouped
+    """
+
+
+def build_summaries(con) -> int:
+    """(Re)build price_summary from the whole of hospital_charges; returns its row count."""
+    with stage("summaries") as rec:
+        con.execute(f"CREATE OR REPLACE TABLE {SUMMARY_TABLE} AS {summary_sql(con)} ORDER BY code_1, level")
+        rec["rows_out"] = con.execute(f"SELECT count(*) FROM {SUMMARY_TABLE}").fetchone()[0]
+    con.execute(f"DROP TABLE IF EXISTS {CHANGED_CODES_TABLE}")
+    return rec["rows_out"]
+
+
+def mark_codes(con, source_files: List[str]) -> None:
+    """Remember the code_1 values hospital_charges currently has for these source files as stale."""
+    con.execute(f"CREATE TEMP TABLE IF NOT EXISTS {CHANGED_CODES_TABLE} (code_1 VARCHAR)")
+    if "code_1" in present_columns(con, "hospital_charges", ["code_1"]):
+        con.execute(f"INSERT INTO {CHANGED_CODES_TABLE} SELECT DISTINCT code_1 FROM hospital_charges "
+                    f"WHERE list_contains(?, source_file) AND code_1 IS NOT NULL", [source_files])
+
+
+def refresh_summaries(con) -> int:
+    """
+    Recompute price_summary rows for the codes marked since the last refresh (a full build
+    if the table doesn't exist yet). Returns the number of summary rows written.
+    """
+    exists = con.execute("SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+                         [SUMMARY_TABLE]).fetchone()[0]
+    if not exists:
+        return build_summaries(con)
+    con.execute(f"CREATE TEMP TABLE IF NOT EXISTS {CHANGED_CODES_TABLE} (code_1 VARCHAR)")
+    with stage("summaries") as rec:
+        codes = f"SELECT DISTINCT code_1 FROM {CHANGED_CODES_TABLE}"
+        con.execute(f"DELETE FROM {SUMMARY_TABLE} WHERE code_1 IN ({codes})")
+        before = con.execute(f"SELECT count(*) FROM {SUMMARY_TABLE}").fetchone()[0]
+        con.execute(f"INSERT INTO {SUMMARY_TABLE} {summary_sql(con, f'AND code_1 IN ({codes})')} "
+                    f"ORDER BY code_1, level")
+        rec["rows_out"] = con.execute(f"SELECT count(*) FROM {SUMMARY_TABLE}").fetchone()[0] - before
+    con.execute(f"DROP TABLE {CHANGED_CODES_TABLE}")
+    return rec["rows_out"]
+
+
+# explorer views over price_summary: label -> level
+COMPARE_VIEWS = {
+    "Payer x state": "code_state_payer",
+    "State": "code_state",
+    "Payer": "code_payer",
+    "Hospital": "code_hospital",
+    "All hospitals": "code",
+}
+
+
+def compare_prices_sql(code: str, level: str = "code_state_payer") -> str:
+    """SELECT of one code's summary rows at `level`, cheapest median first."""
+    if level not in SUMMARY_LEVELS:
+        raise ValueError(f"Unknown summary level: {level}")
+    dims = SUMMARY_LEVELS[level][1:]
+    literal = "'" + code.replace("'", "''") + "'"
+    columns = ", ".join(["code_1", "description"] + dims + [
+        "n_hospitals", "n_prices", "min_price", "p25_price", "median_price", "p75_price", "max_price",
+        "median_gross", "median_cash"])
+    return (f"SELECT {columns} FROM {SUMMARY_TABLE} WHERE code_1 = {literal} AND level = '{level}' "
+            f"ORDER BY median_price NULLS LAST")
@@ -0,0 +1,44 @@
+# src/tests/test_cli.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import duckdb
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _python(code, cwd, **env):
+    env = dict(os.environ, PYTHONPATH=str(ROOT), **env)
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def test_help_and_config_import_nothing_heavy(tmp_path):
+    out = _python(
+        "import sys\n"
+        "from src.cli import build_parser\n"
+        "build_parser().format_help()\n"
+        "import src.config\n"
+        "print(sorted(m for m in ('pandas', 'pyarrow', 'duckdb', 'tqdm') if m in sys.modules))\n"
+        "print(src.config.DUCKDB_PATH.as_posix())",
+        tmp_path, HOSPITAL_ETL_DATA_DIR="elsewhere",
+    ).stdout.splitlines()
+    assert out == ["[]", "elsewhere/processed/hospitals.duckdb"]
+    # importing the config creates no directories
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_noop_load_never_imports_pandas(tmp_path):
+    processed = tmp_path / "data" / "processed"
+    processed.mkdir(parents=True)
+    duckdb.sql(f"COPY (SELECT range::VARCHAR AS code_1, 'a.csv' AS source_file FROM range(5)) "
+               f"TO '{processed / 'a.parquet'}' (FORMAT PARQUET)")
+    load = ("import sys\n"
+            "from src.cli import main\n"
+            "main(['--data-dir', 'data', 'load'])\n"
+            "print('pandas' in sys.modules)")
+    _python(load, tmp_path)
+    out = _python(load, tmp_path).stdout
+    assert "0 new, 0 changed, 0 removed, 1 unchanged" in out
+    assert out.splitlines()[-1] == "False"
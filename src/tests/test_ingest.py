@@ -0,0 +1,299 @@
+# src/tests/test_ingest.py
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import pyarrow.parquet as pq
+
+from src.ingest import write_parquet_chunked
+from src.transform import CANONICAL_SCHEMA, unify_record
+from src.utils import read_generic
+
+
+def _write_csv(path, rows=60):
+    lines = [
+        "hospital_name,last_updated_on,version,hospital_address,license_number",
+        'Test Hospital,2025-01-01,2.0.0,"1 Main St, Springfield, IL 62701",123',
+        "description,code|1,code|1|type,payer_name,standard_charge|gross,standard_charge|negotiated_dollar",
+    ]
+    for i in range(rows):
+        lines.append(f'Proc {i},{1000 + i},CPT,Payer {i % 3},"${i},000.00",{"other" if i % 5 == 0 else i}')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_chunked_matches_in_memory(tmp_path):
+    src = tmp_path / "hosp_standardcharges.csv"
+    out = tmp_path / "hosp.parquet"
+    _write_csv(src)
+
+    rows = write_parquet_chunked(src, out, chunk_rows=7)
+
+    assert rows == 60
+    assert pq.ParquetFile(out).metadata.num_row_groups == 9
+    got = pd.read_parquet(out)
+    df, meta = read_generic(src)
+    expected = unify_record(df, source_file=src.name, metadata=meta)
+    assert list(got.columns) == CANONICAL_SCHEMA.names
+    assert got["hospital_name"].eq("Test Hospital").all()
+    assert got["state"].eq("IL").all()
+    pd.testing.assert_series_equal(
+        got["standard_charge_negotiated_dollar"],
+        pd.to_numeric(expected["standard_charge_negotiated_dollar"]).astype("float64"),
+    )
+    assert not (tmp_path / "hosp.parquet.tmp").exists()
+
+
+def test_parallel_ingest_collects_results(tmp_path, monkeypatch):
+    import time
+    import src.ingest as ingest
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for name in ["a_standardcharges.csv", "b_standardcharges.csv"]:
+        _write_csv(data_dir / name)
+    (data_dir / "notes.md").write_text("not a price file")
+    (data_dir / "slow_standardcharges.csv").write_text("x")
+    monkeypatch.setattr(ingest, "DATA_DIR", data_dir)
+    monkeypatch.setattr(ingest, "PROCESSED_DIR", tmp_path / "processed")
+
+    real_convert = ingest.convert_file
+
+    def convert_or_hang(file, **kwargs):
+        if file.name.startswith("slow"):
+            time.sleep(60)
+        return real_convert(file, **kwargs)
+
+    # worker processes are forked, so they see the patched function
+    monkeypatch.setattr(ingest, "convert_file", convert_or_hang)
+    results = ingest.run_ingest(chunk_rows=10, workers=2, file_timeout=2)
+
+    status = {Path(r["file"]).name: r["status"] for r in results}
+    assert status == {
+        "a_standardcharges.csv": "ok",
+        "b_standardcharges.csv": "ok",
+        "notes.md": "skipped",
+        "slow_standardcharges.csv": "timeout",
+    }
+    assert all(Path(r["parquet"]).exists() for r in results if r["status"] == "ok")
+
+
+def test_ingest_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    import src.ingest as ingest
+    from src import cache
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write_csv(data_dir / "a_standardcharges.csv")
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(ingest, "DATA_DIR", data_dir)
+    monkeypatch.setattr(ingest, "PROCESSED_DIR", tmp_path / "processed")
+
+    first = ingest.run_ingest(chunk_rows=10, cache_dir=cache_dir)
+    out = Path(first[0]["parquet"])
+    mtime = out.stat().st_mtime_ns
+    second = ingest.run_ingest(chunk_rows=10, cache_dir=cache_dir)
+    assert [r["cache"] for r in first + second] == ["miss", "hit"]
+    assert out.stat().st_mtime_ns == mtime  # output left untouched on a hit
+
+    out.unlink()
+    third = ingest.run_ingest(chunk_rows=10, cache_dir=cache_dir)
+    assert third[0]["cache"] == "hit" and out.exists()
+
+    _write_csv(data_dir / "a_standardcharges.csv", rows=61)
+    assert ingest.run_ingest(chunk_rows=10, cache_dir=cache_dir)[0]["cache"] == "miss"
+    assert len(cache.entries(cache_dir)) == 2
+    assert len(cache.evict(cache_dir, max_bytes=0)) == 2
+
+
+def test_ingest_cache_keeps_identical_files_apart(tmp_path, monkeypatch):
+    import src.ingest as ingest
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write_csv(data_dir / "a_standardcharges.csv")
+    _write_csv(data_dir / "b_standardcharges.csv")
+    monkeypatch.setattr(ingest, "DATA_DIR", data_dir)
+    monkeypatch.setattr(ingest, "PROCESSED_DIR", tmp_path / "processed")
+
+    for _ in range(2):
+        results = ingest.run_ingest(chunk_rows=10, cache_dir=tmp_path / "cache")
+        for r in results:
+            sources = set(pd.read_parquet(r["parquet"], columns=["source_file"])["source_file"])
+            assert sources == {Path(r["file"]).name}
+    a, b = sorted(Path(r["parquet"]) for r in results)
+    assert not a.samefile(b)
+
+
+def test_arrow_engine_matches_pandas_engine(tmp_path):
+    import json
+    from src.arrow_pipeline import write_parquet_arrow
+    from src.tests.test_json_stream import _mrf
+
+    csv_src = tmp_path / "hosp_standardcharges.csv"
+    _write_csv(csv_src)
+    json_src = tmp_path / "hosp_mrf.json"
+    json_src.write_text(json.dumps(_mrf()), encoding="utf-8")
+
+    for src in [csv_src, json_src]:
+        write_parquet_chunked(src, tmp_path / "pandas.parquet", chunk_rows=16)
+        write_parquet_arrow(src, tmp_path / "arrow.parquet", chunk_rows=16)
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(tmp_path / "arrow.parquet"), pd.read_parquet(tmp_path / "pandas.parquet")
+        )
+
+
+def test_categorical_mode_writes_dictionary_columns_with_same_values(tmp_path):
+    from src.arrow_pipeline import write_parquet_arrow
+    from src.transform import CANONICAL_SCHEMA_CATEGORICAL
+
+    src = tmp_path / "hosp_standardcharges.csv"
+    _write_csv(src)
+    write_parquet_chunked(src, tmp_path / "plain.parquet", chunk_rows=16)
+    write_parquet_chunked(src, tmp_path / "pandas_cat.parquet", chunk_rows=16, categorical=True)
+    write_parquet_arrow(src, tmp_path / "arrow_cat.parquet", chunk_rows=16, categorical=True)
+
+    def as_objects(df):
+        df = df.astype(object)
+        return df.where(df.notna(), None)
+
+    plain = pd.read_parquet(tmp_path / "plain.parquet")
+    for name in ["pandas_cat.parquet", "arrow_cat.parquet"]:
+        assert pq.read_schema(tmp_path / name).remove_metadata() == CANONICAL_SCHEMA_CATEGORICAL
+        df = pd.read_parquet(tmp_path / name)
+        assert isinstance(df["payer_name"].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(as_objects(df), as_objects(plain))
+
+
+def test_excel_single_pass_reads_every_sheet(tmp_path):
+    import openpyxl
+    from src.arrow_pipeline import write_parquet_arrow
+
+    src = tmp_path / "hosp_standardcharges.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["hospital_name", "last_updated_on", "version", "hospital_address"])
+    ws.append(["Test Hospital", "2025-01-01", "2.0.0", "1 Main St, Springfield, IL 62701"])
+    ws.append(["description", "code|1", "payer_name", "standard_charge|gross"])
+    for i in range(30):
+        ws.append([f"Proc {i}", 1000 + i, f"Payer {i % 3}", 100.0 + i])
+    wb.create_sheet("notes").append(["Prices are estimates"])
+    extra = wb.create_sheet("outpatient")
+    extra.append(["description", "code|1", "payer_name", "standard_charge|gross"])
+    for i in range(5):
+        extra.append([f"Visit {i}", 2000 + i, "Payer 0", 50.5])
+    wb.save(src)
+
+    df, meta = read_generic(src)
+    assert meta["hospital_address"] == "1 Main St, Springfield, IL 62701"
+    assert len(df) == 35
+    first = pd.read_excel(src, header=2, dtype=str)
+    assert df["code_1"].head(30).tolist() == first["code|1"].tolist()
+    assert df["standard_charge_gross"].head(30).tolist() == first["standard_charge|gross"].tolist()
+
+    assert write_parquet_chunked(src, tmp_path / "pandas.parquet", chunk_rows=8) == 35
+    assert write_parquet_arrow(src, tmp_path / "arrow.parquet", chunk_rows=8) == 35
+    got = pd.read_parquet(tmp_path / "arrow.parquet")
+    assert got["state"].eq("IL").all()
+    assert got["code_1"].tail(5).tolist() == [str(2000 + i) for i in range(5)]
+
+
+def test_duckdb_engine_matches_pandas(tmp_path):
+    from src.duckdb_pipeline import write_parquet_duckdb
+
+    tall = tmp_path / "tall_standardcharges.csv"
+    _write_csv(tall)
+    mixed = tmp_path / "mixed_standardcharges.csv"
+    lines = [
+        "hospital_name,last_updated_on,version",
+        "Mixed Hospital,2025-02-01,2.0.0",
+        "description,code|1,hospital_name,hospital_address,standard_charge|gross,standard_charge|discounted_cash",
+    ]
+    money = ["$1,200.50", "other", "N/A", "", "12e2", "1.2.3", "-45", "$ 99 *"]
+    addresses = ["1 Main St, Dover, DE 19901", "PO Box 7 Austin TX", "", "no state here"]
+    for i in range(40):
+        lines.append(f'Proc {i},{i},,"{addresses[i % 4]}","{money[i % 8]}","{money[(i + 3) % 8]}"')
+    mixed.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    for src in [tall, mixed]:
+        rows = write_parquet_duckdb(src, tmp_path / "duck.parquet", chunk_rows=16)
+        assert rows == write_parquet_chunked(src, tmp_path / "pandas.parquet", chunk_rows=16)
+        duck = pq.read_table(tmp_path / "duck.parquet")
+        assert duck.schema.equals(CANONICAL_SCHEMA)
+        got = duck.to_pandas().sort_values("description").reset_index(drop=True)
+        expected = pd.read_parquet(tmp_path / "pandas.parquet").sort_values("description").reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
+
+
+
+def test_duckdb_engine_skips_multiline_preamble_and_counts_rejects(tmp_path):
+    from src import profiling
+    from src.duckdb_pipeline import write_parquet_duckdb
+
+    path = tmp_path / "quoted_standardcharges.csv"
+    path.write_text('hospital_name,hospital_address\n'
+                    '"Quoted Hospital","1 Main St\nDover, DE 19901"\n'
+                    "description,code|1,standard_charge|gross\n"
+                    "MRI,70553,100\n"
+                    "CT,70450,200,extra,extra\n"
+                    "X-ray,70030,300\n", encoding="utf-8")
+    with profiling.collect() as stages, pytest.warns(UserWarning, match="skipped 1 malformed row"):
+        rows = write_parquet_duckdb(path, tmp_path / "duck.parquet", memory_limit="256MB")
+    assert rows == 2
+    got = pq.read_table(tmp_path / "duck.parquet").to_pydict()
+    assert got["description"] == ["MRI", "X-ray"]
+    assert got["hospital_name"] == ["Quoted Hospital"] * 2
+    transform = next(s for s in stages if s["stage"] == "duckdb_transform")
+    assert (transform["rows_in"], transform["rows_out"]) == (3, 2)
+
+def test_pipelined_writes_match_sequential(tmp_path):
+    from src import profiling
+    from src.arrow_pipeline import write_parquet_arrow
+    from src.ingest import write_parquet_pipelined
+
+    src = tmp_path / "pipe_standardcharges.csv"
+    _write_csv(src, rows=200)
+    for engine, sequential in [("pandas", write_parquet_chunked), ("arrow", write_parquet_arrow)]:
+        sequential(src, tmp_path / "seq.parquet", chunk_rows=16)
+        with profiling.collect() as stages:
+            rows = write_parquet_pipelined(src, tmp_path / "pipe.parquet", chunk_rows=16, engine=engine,
+                                           workers=3)
+        assert rows == 200
+        pipe = pq.ParquetFile(tmp_path / "pipe.parquet")
+        assert pipe.metadata.num_row_groups == pq.ParquetFile(tmp_path / "seq.parquet").metadata.num_row_groups
+        assert pipe.read().equals(pq.read_table(tmp_path / "seq.parquet"))
+        queues = {s["stage"]: s for s in stages if s["stage"].startswith("queue.")}
+        assert queues["queue.parsed"]["items"] == queues["queue.transformed"]["items"] == pipe.metadata.num_row_groups
+
+
+def test_pipeline_failure_stops_every_step():
+    from src.pipeline import run_pipeline
+
+    def transform(chunk):
+        if chunk == 5:
+            raise ValueError("bad chunk")
+        return chunk
+
+    written = []
+    with pytest.raises(ValueError, match="bad chunk"):
+        run_pipeline(iter(range(1000)), transform, written.append, workers=2, queue_size=2)
+    assert len(written) < 1000
+
+
+def test_prefetching_uses_one_thread_and_stops_with_the_loop(tmp_path):
+    import threading
+
+    from src.pipeline import prefetching
+
+    files = []
+    for i in range(20):
+        files.append(tmp_path / f"{i}.csv")
+        files[-1].write_bytes(b"x" * 1000)
+    before = threading.active_count()
+    seen = []
+    for file in prefetching(files, window=100):
+        seen.append(file)
+        assert threading.active_count() <= before + 1
+        if len(seen) == 10:
+            break
+    assert seen == files[:10]
+    assert not [t for t in threading.enumerate() if t.name.startswith("prefetch")]
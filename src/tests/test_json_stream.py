@@ -0,0 +1,134 @@
+# src/tests/test_json_stream.py
+import json
+import time
+
+import pandas as pd
+
+from src.json_stream import open_json_records, flatten_mrf_item
+from src.utils import iter_json_chunks, read_generic
+
+
+def _mrf(n_items=25):
+    return {
+        "hospital_name": "Test Hospital",
+        "last_updated_on": "2025-01-01",
+        "version": "2.0.0",
+        "hospital_location": ["Main Campus"],
+        "hospital_address": ["1 Main St, Springfield, IL 62701"],
+        "license_information": {"license_number": 123, "state": "IL"},
+        "standard_charge_information": [
+            {
+                "description": f"Proc {i}",
+                "code_information": [{"code": str(1000 + i), "type": "CPT"}],
+                "standard_charges": [{
+                    "setting": "outpatient",
+                    "gross_charge": 100.0 + i,
+                    "minimum": 10, "maximum": 1e3,
+                    "modifier_code": ["26"],
+                    "payers_information": [
+                        {"payer_name": "Aetna", "plan_name": "PPO", "standard_charge_dollar": 50 + i,
+                         "methodology": "fee schedule"},
+                        {"payer_name": "Cigna", "plan_name": "HMO", "standard_charge_percentage": 40,
+                         "additional_payer_notes": "carve-out"},
+                    ],
+                }],
+            }
+            for i in range(n_items)
+        ],
+        "modifier_information": [],
+    }
+
+
+def test_records_stream_with_tiny_buffer(tmp_path):
+    doc = _mrf()
+    path = tmp_path / "mrf.json"
+    path.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+
+    records, top = open_json_records(path, block_size=7)
+    assert list(records) == doc["standard_charge_information"]
+    assert top["hospital_address"] == ["1 Main St, Springfield, IL 62701"]
+    assert "standard_charge_information" not in top
+
+
+def test_charges_are_found_behind_other_object_arrays(tmp_path):
+    doc = _mrf(n_items=3)
+    charges = doc.pop("standard_charge_information")
+    doc["modifier_information"] = [{"code": "26", "description": "Professional component",
+                                    "modifier_payer_information": [{"payer_name": "Aetna"}]}]
+    doc["standard_charge_information"] = charges
+    path = tmp_path / "mrf.json"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+
+    records, top = open_json_records(path, block_size=16)
+    assert list(records) == charges
+    assert top["modifier_information"] == doc["modifier_information"]
+    df, meta = read_generic(path)
+    assert len(df) == 6 and set(df["code_1"]) == {"1000", "1001", "1002"}
+    assert meta["hospital_name"] == "Test Hospital"
+
+    other = tmp_path / "other.json"
+    other.write_text(json.dumps({"hospital_name": "H", "rows": [{"description": "a"}, {"description": "b"}]}))
+    records, top = open_json_records(other)
+    assert list(records) == [{"description": "a"}, {"description": "b"}]
+    assert top == {"hospital_name": "H"}
+
+
+def test_iter_json_chunks_flattens_payers(tmp_path):
+    path = tmp_path / "mrf.json"
+    path.write_text(json.dumps(_mrf()), encoding="utf-8")
+
+    chunks, meta = iter_json_chunks(path, chunk_rows=10)
+    frames = list(chunks)
+    assert [len(f) for f in frames] == [10, 10, 10, 10, 10]
+    df = pd.concat(frames, ignore_index=True)
+    assert meta["hospital_name"] == "Test Hospital"
+    assert meta["license_number"] == "123"
+    assert meta["hospital_address"] == "1 Main St, Springfield, IL 62701"
+    first = df.iloc[1]
+    assert (first["code_1"], first["payer_name"], first["modifiers"]) == ("1000", "Cigna", "26")
+    assert first["additional_generic_notes"] == "carve-out"
+    assert df["payer_name"].tolist()[:2] == ["Aetna", "Cigna"]
+
+
+def test_read_generic_json_layouts(tmp_path):
+    flat = tmp_path / "flat.json"
+    flat.write_text(json.dumps([{"Description": "a", "Code": 1}, {"Description": "b", "Code": 2}]))
+    df, _ = read_generic(flat, nrows=1)
+    assert df.to_dict("records") == [{"description": "a", "code": 1}]
+
+    lines = tmp_path / "lines.json"
+    lines.write_text('{"description": "a"}\n{"description": "b"}\n')
+    df, _ = read_generic(lines)
+    assert df["description"].tolist() == ["a", "b"]
+
+    single = tmp_path / "single.json"
+    single.write_text(json.dumps({"hospital_name": "H", "info": {"beds": 3}}))
+    df, meta = read_generic(single)
+    assert df.to_dict("records") == [{"hospital_name": "H", "info_beds": 3}]
+    assert meta == {"hospital_name": "H"}
+
+
+def test_flatten_item_without_payers():
+    rows = flatten_mrf_item({"description": "x", "standard_charges": [{"gross_charge": 5}]})
+    assert rows == [{
+        "description": "x", "drug_unit_of_measurement": None, "drug_type_of_measurement": None,
+        "setting": None, "billing_class": None, "modifiers": None, "standard_charge_gross": 5,
+        "standard_charge_discounted_cash": None, "standard_charge_min": None, "standard_charge_max": None,
+        "additional_generic_notes": None,
+    }]
+
+
+def test_scan_cost_does_not_grow_with_block_size(tmp_path):
+    # many small records per block: re-copying the buffer per record would make this quadratic
+    records = [{"i": i, "description": "x" * 20} for i in range(50_000)]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+    def seconds(block_size):
+        start = time.perf_counter()
+        items, _ = open_json_records(path, block_size=block_size)
+        assert sum(1 for _ in items) == len(records)
+        return time.perf_counter() - start
+
+    small, whole_file = seconds(1 << 12), seconds(1 << 22)
+    assert whole_file < 3 * small + 0.1
@@ -0,0 +1,49 @@
+import duckdb
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.layout import dataset_sql, write_partitioned_dataset
+
+
+def test_partitioned_dataset_is_sorted_within_each_state(tmp_path):
+    paths = []
+    for i in range(2):
+        df = pd.DataFrame({
+            "code_1": [str(90000 - 7 * j % 50000) for j in range(6000)],
+            "payer_name": [f"Payer {j % 3}" for j in range(6000)],
+            "state": ["CA", "TX", None, "CA"] * 1500,
+            "source_file": f"h{i}.csv",
+        })
+        paths.append(str(tmp_path / f"h{i}.parquet"))
+        df.to_parquet(paths[-1], index=False)
+
+    rows = write_partitioned_dataset(paths, tmp_path / "dataset", row_group_size=2048)
+    assert rows == 12000
+    assert sorted(p.name for p in (tmp_path / "dataset").iterdir()) == [
+        "state=CA", "state=TX", "state=__HIVE_DEFAULT_PARTITION__"]
+
+    for part in (tmp_path / "dataset").iterdir():
+        meta = pq.ParquetFile(part / "data_0.parquet").metadata
+        assert "state" not in meta.schema.names
+        bounds = [(meta.row_group(g).column(0).statistics.min, meta.row_group(g).column(0).statistics.max)
+                  for g in range(meta.num_row_groups)]
+        assert meta.num_row_groups > 1
+        assert all(prev[1] <= cur[0] for prev, cur in zip(bounds, bounds[1:]))
+
+    counts = dict(duckdb.sql(f"SELECT state, count(*) FROM {dataset_sql(tmp_path / 'dataset')} GROUP BY 1").fetchall())
+    assert counts == {"CA": 6000, "TX": 3000, None: 3000}
+    # Hive readers (pyarrow here) map the default partition back to NULL, not to a string
+    states = ds.dataset(tmp_path / "dataset", partitioning="hive").to_table(columns=["state"]).column("state")
+    assert states.null_count == 3000
+    assert set(states.drop_null().to_pylist()) == {"CA", "TX"}
+
+
+def test_partition_paths_with_quotes_are_escaped(tmp_path):
+    src = tmp_path / "it's here"
+    src.mkdir()
+    pd.DataFrame({"code_1": ["1", "2"], "state": ["O'K", None]}).to_parquet(src / "h.parquet", index=False)
+    out = tmp_path / "o'dataset"
+    assert write_partitioned_dataset([str(src / "h.parquet")], out) == 2
+    rows = duckdb.sql(f"SELECT state, code_1 FROM {dataset_sql(out)} ORDER BY code_1").fetchall()
+    assert rows == [("O'K", "1"), (None, "2")]
@@ -0,0 +1,155 @@
+# src/tests/test_load_duckdb.py
+import duckdb
+import pandas as pd
+import pytest
+
+import src.load_duckdb as load_duckdb
+from src.search_index import code_lookup_sql, search_sql
+
+
+@pytest.fixture
+def processed(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_duckdb, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(load_duckdb, "DUCKDB_PATH", tmp_path / "hospitals.duckdb")
+    return tmp_path
+
+
+def _write(path, source_file, n):
+    pd.DataFrame({
+        "description": [f"proc {i}" for i in range(n)],
+        "standard_charge_gross": [float(i) for i in range(n)],
+        "source_file": source_file,
+    }).to_parquet(path, index=False)
+
+
+def _counts(db_path):
+    with duckdb.connect(str(db_path), read_only=True) as con:
+        return dict(con.execute(
+            "SELECT source_file, count(*) FROM hospital_charges GROUP BY 1"
+        ).fetchall())
+
+
+def test_incremental_load_replaces_only_changed_files(processed):
+    _write(processed / "a.parquet", "a.csv", 3)
+    _write(processed / "b.parquet", "b.csv", 4)
+    load_duckdb.load_incremental()
+    assert _counts(processed / "hospitals.duckdb") == {"a.csv": 3, "b.csv": 4}
+
+    _write(processed / "b.parquet", "b.csv", 6)   # changed
+    _write(processed / "c.parquet", "c.csv", 2)   # new
+    (processed / "a.parquet").unlink()            # removed
+    load_duckdb.load_incremental()
+    assert _counts(processed / "hospitals.duckdb") == {"b.csv": 6, "c.csv": 2}
+
+    with duckdb.connect(str(processed / "hospitals.duckdb"), read_only=True) as con:
+        manifest = dict(con.execute(
+            f"SELECT path, row_count FROM {load_duckdb.MANIFEST_TABLE}"
+        ).fetchall())
+    assert manifest == {str(processed / "b.parquet"): 6, str(processed / "c.parquet"): 2}
+
+
+def test_full_rebuild_then_incremental_is_noop(processed, capsys):
+    _write(processed / "a.parquet", "a.csv", 3)
+    load_duckdb.create_unified_table()
+    load_duckdb.load_incremental()
+    assert "0 new, 0 changed, 0 removed, 1 unchanged" in capsys.readouterr().out
+    assert _counts(processed / "hospitals.duckdb") == {"a.csv": 3}
+
+
+@pytest.mark.parametrize("schema", ["flat", "star"])
+def test_full_rebuild_keys_legacy_files_on_their_name(processed, capsys, schema):
+    _write(processed / "a.parquet", "a.csv", 3)
+    pd.DataFrame({"description": ["old 1", "old 2"]}).to_parquet(processed / "legacy.parquet", index=False)
+    load_duckdb.create_unified_table(schema=schema)
+    assert _counts(processed / "hospitals.duckdb") == {"a.csv": 3, "legacy.parquet": 2}
+
+    pd.DataFrame({"description": ["new"]}).to_parquet(processed / "legacy.parquet", index=False)
+    load_duckdb.load_incremental()
+    assert "0 new, 1 changed, 0 removed, 1 unchanged" in capsys.readouterr().out
+    assert _counts(processed / "hospitals.duckdb") == {"a.csv": 3, "legacy.parquet": 1}
+
+
+def _write_priced(path, source_file, hospital, state, prices):
+    codes = ["100", "200", "300"]
+    pd.DataFrame({
+        "hospital_name": hospital,
+        "state": state,
+        "code_1": [codes[i % 3] for i in range(len(prices))],
+        "description": [f"proc {codes[i % 3]}" for i in range(len(prices))],
+        "payer_name": [f"Payer {i % 2}" for i in range(len(prices))],
+        "standard_charge_negotiated_dollar": prices,
+        "source_file": source_file,
+    }).to_parquet(path, index=False)
+
+
+def _summary(con):
+    return con.execute(
+        f"SELECT * FROM {load_duckdb.SUMMARY_TABLE} ORDER BY ALL"
+    ).fetchdf()
+
+
+def test_price_summary_refreshes_like_a_rebuild(processed):
+    _write_priced(processed / "a.parquet", "a.csv", "A", "DE", [10.0, 20.0, 30.0, 40.0, 50.0, 60.0])
+    _write_priced(processed / "b.parquet", "b.csv", "B", "PA", [15.0, 25.0, 35.0])
+    load_duckdb.load_incremental()
+
+    # b.parquet drops code 300 and reprices the rest; a new file adds code 400
+    pd.DataFrame({"hospital_name": "B", "state": "PA", "code_1": ["100", "200"], "description": "x",
+                  "payer_name": "Payer 0", "standard_charge_negotiated_dollar": [99.0, 1.0],
+                  "source_file": "b.csv"}).to_parquet(processed / "b.parquet", index=False)
+    _write_priced(processed / "c.parquet", "c.csv", "C", "NJ", [5.0])
+    load_duckdb.load_incremental()
+
+    with duckdb.connect(str(processed / "hospitals.duckdb")) as con:
+        refreshed = _summary(con)
+        load_duckdb.build_summaries(con)
+        rebuilt = _summary(con)
+        by_state = dict(con.execute(
+            f"SELECT state, max_price FROM {load_duckdb.SUMMARY_TABLE} WHERE code_1 = '100' AND level = 'code_state'"
+        ).fetchall())
+    pd.testing.assert_frame_equal(refreshed, rebuilt)
+    assert by_state == {"DE": 40.0, "PA": 99.0, "NJ": 5.0}
+
+
+def test_search_index_ranks_codes_for_free_text(processed):
+    pd.DataFrame({
+        "code_1": ["70553", "70553", "70551", "70450", "99213"],
+        "code_1_type": "CPT",
+        "description": ["MRI BRAIN W/O & W/DYE", "MRI BRAIN WITHOUT AND WITH CONTRAST", "MRI BRAIN W/O DYE",
+                        "CT HEAD/BRAIN W/O DYE", "OFFICE VISIT EST"],
+        "source_file": "a.csv",
+    }).to_parquet(processed / "a.parquet", index=False)
+    load_duckdb.load_incremental()
+
+    with duckdb.connect(str(processed / "hospitals.duckdb"), read_only=True) as con:
+        def codes(query):
+            return [r[0] for r in con.execute(search_sql(query)).fetchall()]
+        assert codes("MRI brian w contrast")[0] == "70553"
+        assert codes("ofice visit") == ["99213"]
+        assert sorted(codes("7055")) == ["70551", "70553"]
+        assert codes("70553") == ["70553"]
+        assert len(con.execute(code_lookup_sql("70553", "CPT")).fetchall()) == 2
+
+
+def test_star_schema_view_matches_flat_table_without_duplicates(processed, monkeypatch):
+    # row 6 repeats row 0 (code 100, Payer 0, 10.0)
+    _write_priced(processed / "a.parquet", "a.csv", "A", "DE", [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 10.0])
+    _write_priced(processed / "b.parquet", "b.csv", "B", "PA", [15.0, 25.0, 35.0])
+    load_duckdb.load_incremental(schema="star")
+    _write_priced(processed / "b.parquet", "b.csv", "B", "PA", [15.0, 26.0])
+    _write_priced(processed / "c.parquet", "c.csv", "C", "NJ", [10.0])
+    load_duckdb.load_incremental()   # keeps the star schema
+
+    star_db = load_duckdb.DUCKDB_PATH
+    monkeypatch.setattr(load_duckdb, "DUCKDB_PATH", processed / "flat.duckdb")
+    load_duckdb.create_unified_table()
+    with duckdb.connect(str(processed / "flat.duckdb"), read_only=True) as con:
+        flat = con.execute("SELECT DISTINCT * FROM hospital_charges ORDER BY ALL").fetchdf()
+    with duckdb.connect(str(star_db), read_only=True) as con:
+        # the view has every canonical column; compare the ones the files carry
+        star = con.execute(f"SELECT {', '.join(flat.columns)} FROM hospital_charges ORDER BY ALL").fetchdf()
+        dims = con.execute("SELECT (SELECT count(*) FROM hospitals), (SELECT count(*) FROM procedures)").fetchone()
+        assert con.execute(search_sql("proc 100")).fetchone()[0] == "100"
+    pd.testing.assert_frame_equal(star, flat)
+    assert len(star) == 6 + 2 + 1
+    assert dims == (3, 3)
@@ -0,0 +1,36 @@
+import csv
+
+from src import profiling
+from src.ingest import ingest_one
+from src.tests.test_ingest import _write_csv
+
+
+def test_collect_aggregates_stages_and_timed_iter_counts_rows():
+    with profiling.collect() as stages:
+        chunks = list(profiling.timed_iter("parse", iter([[1, 2], [3]]), bytes_read=10))
+        for _ in range(2):
+            with profiling.stage("unify", rows_in=3) as rec:
+                rec["rows_out"] = 2
+    by_name = {s["stage"]: s for s in stages}
+    assert chunks == [[1, 2], [3]]
+    assert by_name["parse"]["rows_out"] == 3 and by_name["parse"]["bytes_read"] == 10
+    assert by_name["unify"]["calls"] == 2 and by_name["unify"]["rows_in"] == 6
+    assert all(s["wall_s"] >= 0 and s["peak_rss_mb"] > 0 for s in stages)
+
+
+def test_ingest_one_reports_stages_and_profile(tmp_path, monkeypatch):
+    import src.ingest as ingest
+    monkeypatch.setattr(ingest, "PROCESSED_DIR", tmp_path)
+    raw = tmp_path / "hospital_a.csv"
+    _write_csv(raw)
+
+    result = ingest_one(raw, chunk_rows=25, profile_dir=tmp_path / "prof")
+    stages = {s["stage"]: s for s in result["stages"]}
+    assert {"header_detection", "parse", "unify", "unify.clean_money", "parquet_write"} <= set(stages)
+    assert stages["parse"]["rows_out"] == stages["parquet_write"]["rows_in"] == 60
+    assert (tmp_path / "prof" / "hospital_a.csv.prof").exists()
+
+    profiling.write_report([result], tmp_path / "report.csv")
+    with open(tmp_path / "report.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert {r["stage"] for r in rows} == set(stages)
@@ -0,0 +1,62 @@
+# src/tests/test_query_service.py
+import duckdb
+import pyarrow as pa
+import pytest
+
+from src.query_service import QueryService, ResultCache, is_pageable, normalize_sql
+
+
+@pytest.fixture
+def service(tmp_path):
+    db = tmp_path / "hospitals.duckdb"
+    with duckdb.connect(str(db)) as con:
+        con.execute("CREATE TABLE hospital_charges AS SELECT range AS id, 'Aetna' AS payer_name FROM range(25)")
+    return QueryService(db, timeout_seconds=5)
+
+
+def test_normalize_sql_keeps_literals():
+    sql = "SELECT *\n  FROM Hospital_Charges -- all rows\nWHERE payer_name = 'Aetna  PPO';;"
+    assert normalize_sql(sql) == "select * from hospital_charges where payer_name = 'Aetna  PPO'"
+    assert is_pageable(normalize_sql("WITH t AS (SELECT 1) SELECT * FROM t"))
+    assert not is_pageable(normalize_sql("SHOW TABLES"))
+    assert not is_pageable(normalize_sql("SELECT 1; SELECT 2"))
+    assert is_pageable(normalize_sql("select*from t"))
+    assert not is_pageable(normalize_sql("SELECT $$a;b$$; SELECT 2"))
+
+
+def test_paged_query_runs_the_sql_as_written(service):
+    sql = """SELECT payer_name AS "Payer Name", 'Mixed  Case' AS label, $$X$$ AS d
+             FROM hospital_charges ORDER BY id; -- trailing comment"""
+    page = service.query_page(sql, page=0, page_size=2)
+    assert page["paged"]
+    assert page["table"].to_pylist() == [{"Payer Name": "Aetna", "label": "Mixed  Case", "d": "X"}] * 2
+    assert service.query_page("select*from hospital_charges", page_size=3)["table"].num_rows == 3
+
+
+def test_query_page_paginates_and_caches(service):
+    first = service.query_page("SELECT * FROM hospital_charges ORDER BY id", page=0, page_size=10)
+    assert first["table"].column("id").to_pylist() == list(range(10))
+    assert first["has_more"] and not first["cached"]
+
+    last = service.query_page("select *  from hospital_charges order by id;", page=2, page_size=10)
+    assert last["table"].column("id").to_pylist() == list(range(20, 25))
+    assert not last["has_more"]
+
+    again = service.query_page("SELECT * FROM hospital_charges\nORDER BY id", page=0, page_size=10)
+    assert again["cached"]
+    assert service.list_tables().column("name").to_pylist() == ["hospital_charges"]
+
+
+def test_query_timeout_interrupts(service):
+    with pytest.raises(TimeoutError):
+        service.query_page("SELECT count(*) FROM range(100000000000) a", timeout_seconds=0.2)
+
+
+def test_result_cache_evicts_by_size():
+    table = pa.table({"x": list(range(1000))})
+    cache = ResultCache(max_bytes=table.nbytes * 2, ttl_seconds=60)
+    for key in "abc":
+        cache.put((key,), table)
+    assert cache.get(("a",)) is None
+    assert cache.get(("c",)) is not None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,51 @@
+# src/tests/test_sniff.py
+import pandas as pd
+import pytest
+
+from src.sniff import sniff_csv
+
+META = "hospital_name,last_updated_on\nTiny Hospital,2025-01-01\n"
+
+
+@pytest.mark.parametrize("data, encoding, delimiter, header_idx, first_data", [
+    ((META + "description,code|1\nMRI,70553\n").encode(), "utf-8", ",", 2, b"MRI,70553"),
+    # BOM, ';' delimiter ('|' inside header names must not win)
+    (b"\xef\xbb\xbf" + (META + "description;code|1;payer_name\nMRI;70553;A\nCT;70450;B\n").encode(),
+     "utf-8", ";", 2, b"MRI;70553"),
+    # cp1252 bytes (not UTF-8), tab-delimited
+    ("description\tcode|1\nCaf\xe9 visit\t99213\n".encode("cp1252"), "cp1252", "\t", 0, b"Caf\xe9"),
+    ("description,code|1\nMRI,70553\n".encode("utf-16"), "utf-16-le", ",", 0, "MRI".encode("utf-16-le")),
+    # a quoted newline in a metadata row doesn't end the line
+    (b'hospital_name,notes\n"H","two\nlines"\ndescription,code|1\nMRI,70553', "utf-8", ",", 2, b"MRI,70553"),
+    # an undecodable byte above the header doesn't shift the offsets
+    (b"\xef\xbb\xbfhospital_name,notes\nSt. \xff Mary,x\ndescription,code|1\nMRI,70553\n",
+     "utf-8", ",", 2, b"MRI,70553"),
+    # a newline inside the file's own quote character doesn't end the line
+    (b"hospital_name,notes\n'H','two\nlines'\ndescription,code|1\n'MRI, brain',70553\n",
+     "utf-8", ",", 2, b"'MRI, brain',70553"),
+    # no known header token: the widest line
+    (b"a,b,c\n1,2,3\n", "utf-8", ",", 0, b"1,2,3"),
+])
+def test_sniff_finds_dialect_and_data_offset(tmp_path, data, encoding, delimiter, header_idx, first_data):
+    path = tmp_path / "f.csv"
+    path.write_bytes(data)
+    sniff = sniff_csv(path, block_size=16)
+    assert (sniff.encoding, sniff.delimiter, sniff.header_idx) == (encoding, delimiter, header_idx)
+    assert data[sniff.data_offset:].startswith(first_data)
+
+
+def test_short_files_read_through_every_engine(tmp_path):
+    from src.arrow_pipeline import iter_arrow_tables
+    from src.duckdb_pipeline import write_parquet_duckdb
+    from src.utils import read_generic, read_generic_chunks
+
+    path = tmp_path / "tiny_standardcharges.csv"
+    path.write_text(META.replace(",", ";") + "description;code|1\nMRI;70553\nCT;70450\n", encoding="cp1252")
+    df, meta = read_generic(path)
+    assert meta["hospital_name"] == "Tiny Hospital"
+    assert df.to_dict("list") == {"description": ["MRI", "CT"], "code_1": ["70553", "70450"]}
+    chunks, _ = read_generic_chunks(path)
+    pd.testing.assert_frame_equal(pd.concat(list(chunks), ignore_index=True), df)
+    tables, _ = iter_arrow_tables(path)
+    assert [t.to_pydict() for t in tables] == [df.to_dict("list")]
+    assert write_parquet_duckdb(path, tmp_path / "tiny.parquet") == 2
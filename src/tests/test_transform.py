@@ -0,0 +1,74 @@
+# src/tests/test_transform.py
+import random
+
+import numpy as np
+import pandas as pd
+
+from src.transform import (CANONICAL_COLUMNS, canonical_rename_map, clean_money_columns,
+                           compile_schema_plan, extract_state_from_address, extract_state_series,
+                           map_columns_to_canonical, parse_money, parse_money_series)
+
+MESSY_VALUES = [
+    "$1,234.56", "1234", " 12.5 ", "other", "Other Nonnumeric", "none", "NaN", "", "   ",
+    "$-45.00", "1.2e3", "3.5E-2", "100*", "$250 (see note 2)", "1.2.3", "-", "e", ".5", "5.",
+    "--5", "1e", "N/A", "١٢٣", "€ 99,95", None, np.nan, pd.NA, 42, 7.25, "1e999",
+]
+
+
+def _reference(values: pd.Series) -> pd.Series:
+    return values.apply(parse_money).astype("Float64")
+
+
+def test_parse_money_series_matches_scalar_on_messy_values():
+    values = pd.Series(MESSY_VALUES, dtype=object)
+    pd.testing.assert_series_equal(parse_money_series(values), _reference(values))
+
+
+def test_parse_money_series_matches_scalar_on_random_strings():
+    rng = random.Random(0)
+    alphabet = "0123456789.,-$eE xo*()/"
+    values = pd.Series(
+        ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8))) for _ in range(20_000)],
+        index=[i % 100 for i in range(20_000)],  # duplicate labels must not matter
+    )
+    pd.testing.assert_series_equal(parse_money_series(values), _reference(values))
+
+
+def test_clean_money_columns_only_touches_money_columns():
+    df = pd.DataFrame({"description": ["MRI", "X-ray"], "standard_charge_gross": ["$1,000", "other"]})
+    out = clean_money_columns(df)
+    assert out["description"].tolist() == ["MRI", "X-ray"]
+    assert out["standard_charge_gross"].iloc[0] == 1000.0
+    assert out["standard_charge_gross"].isna().iloc[1]
+
+
+def test_schema_plan_matches_per_column_mapping_and_is_cached():
+    df = pd.DataFrame({
+        "description": ["a", "b"], "code": ["1", "2"], "standard_charge_gross_charge": ["$5", "6"],
+        "discounted_cash_price": ["1", None], "payer_name": ["p", "q"], "extra": ["x", "y"],
+    })
+    # the previous implementation: rename, add missing columns one by one, reorder
+    expected = df.rename(columns=canonical_rename_map(df.columns))
+    for c in CANONICAL_COLUMNS:
+        if c not in expected.columns:
+            expected[c] = pd.NA
+    expected = expected[CANONICAL_COLUMNS]
+
+    compile_schema_plan.cache_clear()
+    for _ in range(3):
+        pd.testing.assert_frame_equal(map_columns_to_canonical(df), expected)
+    assert compile_schema_plan.cache_info().hits == 2
+
+
+def test_schema_plan_keeps_first_of_duplicate_targets():
+    df = pd.DataFrame([["first", "second"]], columns=["code", "code_1"])
+    assert map_columns_to_canonical(df)["code_1"].tolist() == ["first"]
+
+
+def test_extract_state_series_matches_per_row_apply():
+    addresses = pd.Series(
+        ["1 Main St, Springfield, IL 62701", None, np.nan, "PO Box 9, Austin, TX", "no state here",
+         "1 Main St, Springfield, IL 62701"],
+        index=[3, 3, 0, 1, 2, 5],
+    )
+    pd.testing.assert_series_equal(extract_state_series(addresses), addresses.apply(extract_state_from_address))
@@ -0,0 +1,64 @@
+import csv
+
+import pandas as pd
+
+from src.arrow_pipeline import write_parquet_arrow
+from src.ingest import write_parquet_chunked
+from src.unpivot import parse_wide_header
+
+HEADER = [
+    "description", "code|1", "code|1|type", "setting", "standard_charge|gross", "additional_generic_notes",
+    "standard_charge|Aetna|PPO|negotiated_dollar", "standard_charge|Aetna|PPO|methodology",
+    "estimated_amount|Aetna|PPO",
+    "standard_charge|Cigna|HMO Plus|negotiated_dollar", "standard_charge|Cigna|HMO Plus|negotiated_percentage",
+    "additional_payer_notes|Cigna|HMO Plus",
+]
+ROWS = [
+    ["MRI", "70551", "CPT", "outpatient", "$2,000", "note", "1500", "fee schedule", "1400", "1600", "", "cap"],
+    ["X-ray", "71045", "CPT", "outpatient", "300", "", "", "", "", "", "80", ""],
+    ["Aspirin", "J0001", "HCPCS", "inpatient", "5", "", "", "", "", "", "", ""],
+]
+
+
+def _write_wide(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["hospital_name", "last_updated_on", "version", "hospital_address", "license_number"])
+        w.writerow(["Wide General", "2025-01-01", "2.0.0", "9 Elm St, Dover, DE 19901", "77"])
+        w.writerow(HEADER)
+        w.writerows(ROWS)
+        # filler items without payer values (header detection previews 25 lines)
+        w.writerows([f"Filler {i}", str(90000 + i), "CPT", "outpatient", "1"] + [""] * 7 for i in range(25))
+
+
+def test_parse_wide_header_groups_payer_plan_columns():
+    plan = parse_wide_header(HEADER)
+    assert plan.base == (0, 1, 2, 3, 4, 5)
+    assert plan.groups == (("Aetna", "PPO"), ("Cigna", "HMO Plus"))
+    assert plan.fields["standard_charge_negotiated_dollar"] == (6, 9)
+    assert plan.fields["standard_charge_negotiated_percentage"] == (None, 10)
+    assert parse_wide_header(["description", "standard_charge|gross", "payer_name"]) is None
+
+
+def test_wide_csv_unpivots_to_tall_rows_in_both_engines(tmp_path):
+    src = tmp_path / "wide_standardcharges.csv"
+    _write_wide(src)
+    # standard_charge_methodology is a float column under the money-token rule, so text comes out null
+    expected = [
+        ("70551", "Aetna", "PPO", 1500.0, None, 1400.0, None, "note"),
+        ("70551", "Cigna", "HMO Plus", 1600.0, None, None, None, "note; cap"),
+        ("71045", "Cigna", "HMO Plus", None, 80.0, None, None, None),
+        ("J0001", None, None, None, None, None, None, None),
+    ]
+    cols = ["code_1", "payer_name", "plan_name", "standard_charge_negotiated_dollar",
+            "standard_charge_negotiated_percentage", "estimated_amount", "standard_charge_methodology",
+            "additional_generic_notes"]
+    for write in [lambda out: write_parquet_chunked(src, out, chunk_rows=2),
+                  lambda out: write_parquet_arrow(src, out, chunk_rows=2)]:
+        assert write(tmp_path / "out.parquet") == 4 + 25
+        df = pd.read_parquet(tmp_path / "out.parquet")
+        assert (df["state"] == "DE").all() and df["standard_charge_gross"].notna().all()
+        assert df["payer_name"].isna().sum() == 1 + 25
+        got = [tuple(None if pd.isna(v) else v for v in row)
+               for row in df.loc[~df["description"].str.startswith("Filler"), cols].itertuples(index=False)]
+        assert sorted(got, key=str) == sorted(expected, key=str)
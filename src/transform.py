@@ -1,23 +1,14 @@
 # src/transform.py
-from pathlib import Path
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
 
-CANONICAL_COLUMNS = [
-    # metadata
-    "hospital_name", "last_updated_on", "version", "hospital_location", "hospital_address", "license_number",
-    # main data
-    "description", "code_1", "code_1_type", "code_2", "code_2_type", "code_3", "code_3_type",
-    "billing_class", "setting", "modifiers", "drug_unit_of_measurement", "drug_type_of_measurement",
-    "standard_charge_gross", "standard_charge_discounted_cash", "payer_name", "plan_name",
-    "standard_charge_negotiated_dollar", "standard_charge_negotiated_percentage",
-    "standard_charge_negotiated_algorithm", "estimated_amount", "standard_charge_methodology",
-    "standard_charge_min", "standard_charge_max", "additional_generic_notes",
-    # bookkeeping
-    "source_file", "state"
-]
+from src.columns import CANONICAL_COLUMNS, FLOAT_RE, money_columns
+from src.profiling import stage
 
 # mapping of common alt names to canonical columns (keys normalized)
 COMMON_REMAP = {
@@ -36,11 +27,10 @@ COMMON_REMAP = {
     "standard_charge|estimated_amount": "estimated_amount",
 }
 
-def map_columns_to_canonical(df: pd.DataFrame) -> pd.DataFrame:
-    """Rename columns using COMMON_REMAP and then ensure canonical columns exist."""
-    df = df.copy()
+def canonical_rename_map(columns) -> Dict[str, str]:
+    """Raw (normalized) column name -> canonical name, from COMMON_REMAP and token heuristics."""
     rename_map = {}
-    for c in df.columns:
+    for c in columns:
         if c in COMMON_REMAP:
             rename_map[c] = COMMON_REMAP[c]
         # also handle raw names containing tokens
@@ -52,34 +42,124 @@ def map_columns_to_canonical(df: pd.DataFrame) -> pd.DataFrame:
         if lc.startswith("code") and "_" in lc:
             # code_1, code_2 etc usually fine
             pass
-    df = df.rename(columns=rename_map)
-    # ensure canonical columns exist
-    for c in CANONICAL_COLUMNS:
-        if c not in df.columns:
-            df[c] = pd.NA
-    # keep only canonical columns and reorder
-    df = df[[c for c in CANONICAL_COLUMNS]]
-    return df
+    return rename_map
+
+class SchemaPlan(NamedTuple):
+    """
+    Compiled mapping from one raw header to CANONICAL_COLUMNS: for each canonical column,
+    the position of the raw column that fills it, or -1 if it is missing. When several raw
+    columns map to the same canonical name the first one wins.
+    """
+    positions: Tuple[int, ...]
+
+@lru_cache(maxsize=4096)
+def compile_schema_plan(columns: Tuple[str, ...]) -> SchemaPlan:
+    """
+    Resolve a raw header (normalized names, in file order) into a SchemaPlan. Cached per
+    header signature, so a hospital template shared by many files and chunks runs the
+    COMMON_REMAP/token heuristics once.
+    """
+    rename_map = canonical_rename_map(columns)
+    first = {}
+    for i, c in enumerate(columns):
+        first.setdefault(rename_map.get(c, c), i)
+    return SchemaPlan(tuple(first.get(c, -1) for c in CANONICAL_COLUMNS))
+
+def apply_schema_plan(df: pd.DataFrame, plan: SchemaPlan) -> pd.DataFrame:
+    """Select, rename and reorder df to CANONICAL_COLUMNS in one take + reindex (missing columns pd.NA)."""
+    present = [(c, i) for c, i in zip(CANONICAL_COLUMNS, plan.positions) if i >= 0]
+    out = df.iloc[:, [i for _, i in present]]
+    out.columns = [c for c, _ in present]
+    return out.reindex(columns=CANONICAL_COLUMNS, fill_value=pd.NA)
+
+def map_columns_to_canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename columns using COMMON_REMAP and then ensure canonical columns exist (via a cached SchemaPlan)."""
+    return apply_schema_plan(df, compile_schema_plan(tuple(df.columns)))
+
+# Arrow/Parquet schema of unify_record output: money columns float64, everything else string
+CANONICAL_SCHEMA = pa.schema(
+    [(c, pa.float64() if c in money_columns(CANONICAL_COLUMNS) else pa.string()) for c in CANONICAL_COLUMNS]
+)
+
+# few distinct values repeated over millions of rows: stored as pandas categoricals /
+# Arrow dictionary arrays in categorical mode
+LOW_CARDINALITY_COLUMNS = [
+    "hospital_name", "last_updated_on", "version", "hospital_location", "hospital_address", "license_number",
+    "code_1_type", "code_2_type", "code_3_type", "billing_class", "setting", "payer_name", "plan_name",
+    "source_file", "state",
+]
+
+# CANONICAL_SCHEMA with LOW_CARDINALITY_COLUMNS as dictionary<int32, string>
+CANONICAL_SCHEMA_CATEGORICAL = pa.schema(
+    [pa.field(f.name, pa.dictionary(pa.int32(), pa.string())) if f.name in LOW_CARDINALITY_COLUMNS else f
+     for f in CANONICAL_SCHEMA]
+)
+
+def canonical_schema(categorical: bool = False) -> pa.Schema:
+    return CANONICAL_SCHEMA_CATEGORICAL if categorical else CANONICAL_SCHEMA
+
+def parse_money(x):
+    """Scalar money parser: strip '$', commas and footnotes; sentinels like 'other' become pd.NA."""
+    if pd.isna(x):
+        return pd.NA
+    s = str(x).strip()
+    if s.lower() in {"", "none", "nan", "other", "other nonnumeric"}:
+        return pd.NA
+    # remove currency and footnotes
+    s = re.sub(r"[^\d\.\-eE]", "", s)
+    try:
+        return float(s) if s != "" else pd.NA
+    except Exception:
+        return pd.NA
+
+def parse_money_arrow(arr: pa.Array) -> pa.Array:
+    """
+    Vectorized parse_money over an Arrow string array, returning float64 (null for missing).
+    Runs on pyarrow compute kernels: strip non-numeric characters with a regex, keep
+    strings that float() would accept, and cast. The sentinels ('other', 'none', ...)
+    reduce to strings float() rejects, so they come out null without a separate check.
+    Non-ASCII strings go through parse_money, since Python's \\d also matches
+    non-ASCII digits that RE2 does not.
+    """
+    result = np.full(len(arr), np.nan)
+    mask = np.ones(len(arr), dtype=bool)  # True = missing
+    present = np.flatnonzero(pc.is_valid(arr).to_numpy(zero_copy_only=False))
+    if len(present):
+        arr = arr.take(present) if len(present) < len(arr) else arr
+        is_ascii = pc.string_is_ascii(arr).to_numpy(zero_copy_only=False)
+        # most cells are already plain numbers; only run the strip regex on the rest
+        direct = pc.match_substring_regex(arr, pattern=FLOAT_RE).to_numpy(zero_copy_only=False)
+        rest = np.flatnonzero(~direct & is_ascii)
+        cleaned = pc.replace_substring_regex(arr.take(rest), pattern=r"[^0-9.\-eE]", replacement="")
+        ok = pc.match_substring_regex(cleaned, pattern=FLOAT_RE).to_numpy(zero_copy_only=False)
+        for rows, strings in [(np.flatnonzero(direct), pc.filter(arr, direct)), (rest[ok], pc.filter(cleaned, ok))]:
+            result[present[rows]] = pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+            mask[present[rows]] = False
+        for i in np.flatnonzero(~is_ascii):
+            v = parse_money(arr[i].as_py())
+            if v is not pd.NA:
+                result[present[i]] = v
+                mask[present[i]] = False
+    return pa.array(result, type=pa.float64(), mask=mask)
+
+def parse_money_series(values: pd.Series) -> pd.Series:
+    """Vectorized parse_money over a Series (see parse_money_arrow), returning nullable Float64."""
+    raw = values.to_numpy(dtype=object)
+    try:
+        arr = pa.array(raw, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # ints/floats/dates from JSON or Excel: parse their str() like parse_money does
+        arr = pa.array([None if pd.isna(v) else str(v) for v in raw], type=pa.string())
+    parsed = parse_money_arrow(arr)
+    floats = pd.arrays.FloatingArray(parsed.to_numpy(zero_copy_only=False),
+                                     parsed.is_null().to_numpy(zero_copy_only=False))
+    return pd.Series(floats, index=values.index, name=values.name)
 
 def clean_money_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert money-like string columns to numeric floats. Operates in-place (returns df)."""
+    """Convert money-like string columns to nullable Float64 via parse_money_series (returns a copy)."""
     df = df.copy()
-    money_tokens = [c for c in df.columns if any(tok in c for tok in ["charge", "amount", "estimated", "min", "max"])]
-    for col in money_tokens:
-        # try to coerce: strip '$', commas, and non numeric; treat 'other' as NaN
-        def _to_float(x):
-            if pd.isna(x):
-                return pd.NA
-            s = str(x).strip()
-            if s.lower() in {"", "none", "nan", "other", "other nonnumeric"}:
-                return pd.NA
-            # remove currency and footnotes
-            s = re.sub(r"[^\d\.\-eE]", "", s)
-            try:
-                return float(s) if s != "" else pd.NA
-            except Exception:
-                return pd.NA
-        df[col] = df[col].apply(_to_float)
+    for col in money_columns(df.columns):
+        df[col] = parse_money_series(df[col])
     return df
 
 def extract_state_from_address(addr: str) -> str:
@@ -96,41 +176,65 @@ def extract_state_from_address(addr: str) -> str:
         return toks[-1]
     return None
 
-def unify_record(df: pd.DataFrame, source_file: str, metadata: Dict) -> pd.DataFrame:
+def extract_state_series(addresses: pd.Series) -> pd.Series:
+    """extract_state_from_address run once per distinct address and broadcast back (object dtype)."""
+    codes, uniques = pd.factorize(addresses)
+    states = np.array([extract_state_from_address(a) for a in uniques] + [None], dtype=object)
+    # code -1 (missing address) picks the trailing None
+    return pd.Series(states[codes], index=addresses.index, dtype=object)
+
+def encode_low_cardinality(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert LOW_CARDINALITY_COLUMNS to categoricals of strings (in place; returns df)."""
+    for c in LOW_CARDINALITY_COLUMNS:
+        if c in df.columns:
+            col = df[c]
+            df[c] = col.where(col.isna(), col.astype(str)).astype("category")
+    return df
+
+def unify_record(df: pd.DataFrame, source_file: str, metadata: Dict, categorical: bool = False) -> pd.DataFrame:
     """
     Take df from utils.read_generic and metadata extracted, map to canonical schema,
     fill hospital metadata columns, clean numeric columns, add source_file and state.
+    With categorical=True, LOW_CARDINALITY_COLUMNS come back as pandas categoricals.
     """
     df = df.copy()
-    # fill hospital-level metadata columns if present in df or metadata
-    # some metadata fields (hospital_name etc.) may be in 'metadata' dict
-    # ensure lowercase normalized metadata keys
-    meta_norm = {k.lower(): v for k, v in (metadata or {}).items()}
-    # if hospital_name exists as a column and its header is repeated across all rows we can use it;
-    # otherwise use metadata
-    if "hospital_name" in df.columns and df["hospital_name"].notna().any():
-        # keep column as-is
-        pass
-    else:
-        if meta_norm.get("hospital_name"):
-            df["hospital_name"] = meta_norm.get("hospital_name")
-
-    # similarly for other fields
-    for field in ["last_updated_on", "version", "hospital_location", "hospital_address", "license_number"]:
-        if field not in df.columns or df[field].isna().all():
-            if meta_norm.get(field):
-                df[field] = meta_norm.get(field)
+    with stage("unify.fill_metadata"):
+        # fill hospital-level metadata columns if present in df or metadata
+        # some metadata fields (hospital_name etc.) may be in 'metadata' dict
+        # ensure lowercase normalized metadata keys
+        meta_norm = {k.lower(): v for k, v in (metadata or {}).items()}
+        # if hospital_name exists as a column and its header is repeated across all rows we can use it;
+        # otherwise use metadata
+        if "hospital_name" in df.columns and df["hospital_name"].notna().any():
+            # keep column as-is
+            pass
+        else:
+            if meta_norm.get("hospital_name"):
+                df["hospital_name"] = meta_norm.get("hospital_name")
+
+        # similarly for other fields
+        for field in ["last_updated_on", "version", "hospital_location", "hospital_address", "license_number"]:
+            if field not in df.columns or df[field].isna().all():
+                if meta_norm.get(field):
+                    df[field] = meta_norm.get(field)
 
     # normalize column names & remap
-    df = map_columns_to_canonical(df)
+    with stage("unify.map_columns"):
+        df = map_columns_to_canonical(df)
 
     # add source_file column
     df["source_file"] = source_file
 
     # extract state heuristically from address
-    df["state"] = df["hospital_address"].apply(extract_state_from_address)
+    with stage("unify.extract_state"):
+        df["state"] = extract_state_series(df["hospital_address"])
 
     # Clean money-like columns
-    df = clean_money_columns(df)
+    with stage("unify.clean_money"):
+        df = clean_money_columns(df)
+
+    if categorical:
+        with stage("unify.categorical"):
+            df = encode_low_cardinality(df)
 
     return df
@@ -0,0 +1,173 @@
+# src/unpivot.py
+"""
+Wide-to-long unpivot for the CMS "wide" CSV/Excel layout, where every payer/plan pair
+has its own columns:
+
+    standard_charge|<payer>|<plan>|negotiated_dollar    (also negotiated_percentage,
+                                                         negotiated_algorithm, methodology)
+    estimated_amount|<payer>|<plan>
+    additional_payer_notes|<payer>|<plan>
+
+parse_wide_header compiles the raw header once into a WidePlan of column positions
+(normalize_colname would merge payer, plan and field into one name). unpivot_frame /
+unpivot_table then reshape a chunk into the canonical tall shape - one row per item x
+payer/plan that has any payer value - with whole-column reshapes, never a Python loop
+over rows. Output is yielded in pieces of at most max_rows rows, so a chunk times 500+
+payers is never materialized at once. Items with no payer values at all are kept as a
+single row with no payer, like a tall file's gross/cash-only rows.
+"""
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.profiling import stage
+
+# last token of standard_charge|<payer>|<plan>|<field> -> canonical column
+WIDE_CHARGE_FIELDS = {
+    "negotiated_dollar": "standard_charge_negotiated_dollar",
+    "negotiated_percentage": "standard_charge_negotiated_percentage",
+    "negotiated_algorithm": "standard_charge_negotiated_algorithm",
+    "methodology": "standard_charge_methodology",
+}
+# first token of <field>|<payer>|<plan> -> canonical column
+WIDE_PREFIX_FIELDS = {
+    "estimated_amount": "estimated_amount",
+    "additional_payer_notes": "additional_payer_notes",
+}
+# payer notes are folded into additional_generic_notes, as json_stream.flatten_mrf_item does
+NOTES_FIELD = "additional_payer_notes"
+
+
+class WidePlan(NamedTuple):
+    """Column positions of a wide header: base (non-payer) columns and, per field, one position per payer/plan."""
+    base: Tuple[int, ...]
+    groups: Tuple[Tuple[str, str], ...]                # (payer, plan) in header order
+    fields: Dict[str, Tuple[Optional[int], ...]]       # canonical field -> position per group (None = absent)
+
+
+def parse_wide_header(columns: Iterable[str]) -> Optional[WidePlan]:
+    """WidePlan for a raw (un-normalized) header, or None if it has no per-payer columns."""
+    groups: Dict[Tuple[str, str], Dict[str, int]] = {}
+    base = []
+    for i, c in enumerate(columns):
+        parts = [p.strip() for p in str(c).split("|")]
+        first, field = parts[0].lower(), None
+        if first == "standard_charge" and len(parts) == 4:
+            field = WIDE_CHARGE_FIELDS.get(parts[3].lower())
+        elif first in WIDE_PREFIX_FIELDS and len(parts) == 3:
+            field = WIDE_PREFIX_FIELDS[first]
+        if field is None:
+            base.append(i)
+        else:
+            groups.setdefault((parts[1], parts[2]), {}).setdefault(field, i)
+    if not groups:
+        return None
+    names = [*WIDE_CHARGE_FIELDS.values(), *WIDE_PREFIX_FIELDS.values()]
+    fields = {f: tuple(g.get(f) for g in groups.values()) for f in names if any(f in g for g in groups.values())}
+    return WidePlan(tuple(base), tuple(groups), fields)
+
+
+def _group_slices(n_rows: int, n_groups: int, max_rows: int) -> Iterator[slice]:
+    """Consecutive payer/plan ranges whose unpivoted size (rows x groups) stays within max_rows."""
+    step = max(1, max_rows // max(n_rows, 1))
+    for start in range(0, n_groups, step):
+        yield slice(start, min(start + step, n_groups))
+
+
+def _merge_notes(out: pd.DataFrame) -> pd.DataFrame:
+    if NOTES_FIELD not in out.columns:
+        return out
+    notes = out.pop(NOTES_FIELD)
+    if "additional_generic_notes" not in out.columns:
+        out["additional_generic_notes"] = notes
+        return out
+    generic = out["additional_generic_notes"]
+    out["additional_generic_notes"] = generic.str.cat(notes, sep="; ").fillna(generic).fillna(notes)
+    return out
+
+
+def unpivot_frame(df: pd.DataFrame, plan: WidePlan, max_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield the tall form of one wide chunk (column names as in df for base columns)."""
+    n = len(df)
+    base = df.iloc[:, list(plan.base)]
+    payers = np.array([p for p, _ in plan.groups], dtype=object)
+    plans = np.array([p for _, p in plan.groups], dtype=object)
+    has_any = np.zeros(n, dtype=bool)
+    for sl in _group_slices(n, len(plan.groups), max_rows):
+        with stage("unpivot", rows_in=n) as rec:
+            g = sl.stop - sl.start
+            values, keep = {}, np.zeros(n * g, dtype=bool)
+            for field, positions in plan.fields.items():
+                block = np.full((n, g), None, dtype=object)
+                present = [j for j, p in enumerate(positions[sl]) if p is not None]
+                if present:
+                    block[:, present] = df.iloc[:, [positions[sl][j] for j in present]].to_numpy(dtype=object)
+                # column-major: payer/plan j's rows are flat[j * n:(j + 1) * n]
+                flat = block.ravel(order="F")
+                valid = pd.notna(flat)
+                values[field] = np.where(valid, flat, None)
+                keep |= valid
+            has_any |= keep.reshape(g, n).any(axis=0)
+            rows = np.flatnonzero(keep)
+            rec["rows_out"] = len(rows)
+            if not len(rows):
+                continue
+            out = pd.concat([
+                base.take(rows % n).reset_index(drop=True),
+                pd.DataFrame({"payer_name": payers[sl][rows // n], "plan_name": plans[sl][rows // n],
+                              **{f: v[rows] for f, v in values.items()}}),
+            ], axis=1)
+        yield _merge_notes(out)
+    missing = np.flatnonzero(~has_any)
+    if len(missing):
+        yield base.take(missing).reset_index(drop=True)
+
+
+def unpivot_frames(chunks: Iterable[pd.DataFrame], plan: WidePlan, max_rows: int) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        yield from unpivot_frame(chunk, plan, max_rows)
+
+
+def unpivot_table(table: pa.Table, plan: WidePlan, max_rows: int) -> Iterator[pa.Table]:
+    """Arrow version of unpivot_frame: all-string input table, pieces of at most max_rows rows."""
+    n = table.num_rows
+    base = table.select(list(plan.base))
+    null_col = pa.nulls(n, pa.string())
+    has_any = np.zeros(n, dtype=bool)
+    for sl in _group_slices(n, len(plan.groups), max_rows):
+        with stage("unpivot", rows_in=n) as rec:
+            g = sl.stop - sl.start
+            # zero-copy concatenation: payer/plan j's rows are [j * n, (j + 1) * n)
+            values = {f: pa.chunked_array([chunk for p in positions[sl]
+                                           for chunk in (table.column(p).chunks if p is not None else [null_col])],
+                                          type=pa.string())
+                      for f, positions in plan.fields.items()}
+            keep = np.zeros(n * g, dtype=bool)
+            for col in values.values():
+                keep |= pc.is_valid(col).to_numpy(zero_copy_only=False)
+            has_any |= keep.reshape(g, n).any(axis=0)
+            rows = np.flatnonzero(keep)
+            rec["rows_out"] = len(rows)
+            if not len(rows):
+                continue
+            group_idx = sl.start + rows // n
+            columns = {name: col for name, col in zip(base.column_names, base.take(rows % n).columns)}
+            columns["payer_name"] = pa.array([p for p, _ in plan.groups], type=pa.string()).take(group_idx)
+            columns["plan_name"] = pa.array([p for _, p in plan.groups], type=pa.string()).take(group_idx)
+            mask = pa.array(keep)
+            for f, col in values.items():
+                # rows are in order, so a filter (chunk by chunk) selects them without a gather
+                columns[f] = pc.filter(col, mask)
+            notes = columns.pop(NOTES_FIELD, None)
+            if notes is not None:
+                generic = columns.get("additional_generic_notes")
+                columns["additional_generic_notes"] = notes if generic is None else pc.coalesce(
+                    pc.binary_join_element_wise(generic, notes, "; "), generic, notes)
+            out = pa.table(columns)
+        yield out
+    missing = np.flatnonzero(~has_any)
+    if len(missing):
+        yield base.take(missing)
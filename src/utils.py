@@ -1,16 +1,23 @@
 # src/utils.py
 import re
-import json
+import io
+import hashlib
 import csv
+from itertools import chain, islice
 from pathlib import Path
-from typing import Tuple, Dict, List, Optional
+from typing import Tuple, Dict, List, Optional, Iterator
 import pandas as pd
 
-KNOWN_HEADER_TOKENS = {
-    "description", "code", "code|1", "code|1|type", "standard_charge|gross",
-    "standard_charge|discounted_cash", "payer_name", "plan_name", "billing_class",
-    "setting", "modifiers"
-}
+from src.json_stream import open_json_records, is_ndjson, mrf_metadata, flatten_mrf_item
+from src.profiling import peak_rss_mb, stage, timed_iter
+from src.sniff import KNOWN_HEADER_TOKENS, CsvSniff, header_token_index, sniff_csv
+from src.unpivot import parse_wide_header, unpivot_frame, unpivot_frames
+
+# default number of rows per chunk in streaming mode
+DEFAULT_CHUNK_ROWS = 250_000
+
+# rows of each sheet searched for the header (and, on the first sheet, metadata)
+EXCEL_PREVIEW_ROWS = 25
 
 def normalize_colname(c: str) -> str:
     """Normalize column names to snake_case, replace '|' and spaces with underscores."""
@@ -26,33 +33,28 @@ def normalize_colname(c: str) -> str:
 
 def detect_header_line_csv(file_path: Path, n_preview: int = 25) -> Tuple[int, List[str]]:
     """
-    Read the first n_preview lines and heuristically detect the header line index (0-based).
-    Returns (header_line_index, preview_lines).
+    Heuristically detect the header line index (0-based) from the top of the file (one
+    bounded read, see src.sniff). Returns (header_line_index, preview_lines).
     """
-    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-        lines = [next(f) for _ in range(n_preview)]
-    # check for a line that contains known header tokens
-    for i, line in enumerate(lines):
-        low = line.lower()
-        # quick check: does it contain a token like 'description' or 'code|1'?
-        for token in KNOWN_HEADER_TOKENS:
-            if token in low:
-                return i, lines
-    # fallback: use the line with the largest number of delimiters (commas)
-    max_commas = -1
-    best_idx = 0
-    for i, line in enumerate(lines):
-        ccount = line.count(",")
-        if ccount > max_commas:
-            max_commas = ccount
-            best_idx = i
-    return best_idx, lines
+    sniff = sniff_csv(file_path, n_preview=n_preview)
+    return sniff.header_idx, sniff.lines
+
+def _open_at(file_path: Path, offset: int):
+    """Binary handle positioned at byte `offset` (pandas decodes it with the sniffed encoding)."""
+    f = open(file_path, "rb")
+    f.seek(offset)
+    return f
+
+def _csv_options(sniff: CsvSniff) -> Dict:
+    """pandas read_csv options for the sniffed dialect and encoding."""
+    return {"sep": sniff.delimiter, "quotechar": sniff.quotechar, "encoding": sniff.encoding,
+            "encoding_errors": "replace"}
 
-def extract_metadata_from_lines(lines: List[str]) -> Dict[str, str]:
+def extract_metadata_from_lines(lines: List[str], delimiter: str = ",") -> Dict[str, str]:
     """
     Given top-of-file lines (list of strings), attempt to extract metadata like hospital_name,
     last_updated_on, version, address, license_number. This is heuristic: many hospital files
-    put a header row followed by a row with those values.
+    put a header row followed by a row with those values. Lines are split on `delimiter`.
     """
     meta = {}
     # try to find line that contains 'hospital_name'
@@ -64,8 +66,8 @@ def extract_metadata_from_lines(lines: List[str]) -> Dict[str, str]:
                 # attempt to parse as CSV/quoted CSV
                 try:
                     # use csv.reader to parse
-                    data = next(csv.reader([nxt]))
-                    header = next(csv.reader([line]))
+                    data = next(csv.reader([nxt], delimiter=delimiter))
+                    header = next(csv.reader([line], delimiter=delimiter))
                     # pair them
                     for k, v in zip(header, data):
                         k_n = normalize_colname(k)
@@ -75,8 +77,8 @@ def extract_metadata_from_lines(lines: List[str]) -> Dict[str, str]:
                     continue
     # fallback: try first two lines (many files put metadata in the first two)
     try:
-        header = next(csv.reader([lines[0]]))
-        data = next(csv.reader([lines[1]]))
+        header = next(csv.reader([lines[0]], delimiter=delimiter))
+        data = next(csv.reader([lines[1]], delimiter=delimiter))
         for k, v in zip(header, data):
             k_n = normalize_colname(k)
             meta[k_n] = v.strip()
@@ -89,90 +91,239 @@ def read_generic(file_path: Path, nrows: Optional[int] = None) -> Tuple[pd.DataF
     Robust reader for CSV, JSON, XLSX. Returns (df, metadata).
     For demo we use nrows to limit read size.
     """
+    with stage("parse", bytes_read=0 if nrows else file_path.stat().st_size) as rec:
+        df, meta = _read_generic(file_path, nrows)
+        rec["rows_out"] = len(df)
+    return df, meta
+
+def _read_generic(file_path: Path, nrows: Optional[int] = None) -> Tuple[pd.DataFrame, Dict]:
     ext = file_path.suffix.lower()
     meta = {}
     if ext in {".csv", ".txt"}:
-        header_idx, lines = detect_header_line_csv(file_path)
-        meta = extract_metadata_from_lines(lines[: max(5, header_idx + 2)])
-        # read with pandas using skiprows up to header_idx
+        sniff = sniff_csv(file_path)
+        meta = extract_metadata_from_lines(sniff.metadata_lines, sniff.delimiter)
+        # read with pandas from the header line on
         try:
-            df = pd.read_csv(
-                file_path,
-                skiprows=header_idx,
-                nrows=nrows,
-                low_memory=False,
-                dtype=str,
-                engine="python",
-            )
+            with _open_at(file_path, sniff.header_offset) as f:
+                df = pd.read_csv(f, nrows=nrows, low_memory=False, dtype=str, engine="c", **_csv_options(sniff))
         except Exception:
-            # fallback: read with default parameters and try to recover
-            df = pd.read_csv(file_path, nrows=nrows, low_memory=False, dtype=str, engine="python", error_bad_lines=False)
-        # normalize column names
-        df.columns = [normalize_colname(c) for c in df.columns]
-        return df, meta
+            # fallback: skip rows that don't parse and try to recover
+            with _open_at(file_path, sniff.header_offset) as f:
+                df = pd.read_csv(f, nrows=nrows, low_memory=False, dtype=str, engine="c", on_bad_lines="skip",
+                                 **_csv_options(sniff))
+        return _unpivot_if_wide(df), meta
 
     elif ext in {".json"}:
-        # try multiple possible json layouts
-        text = file_path.read_text(encoding="utf-8", errors="replace").strip()
-        try:
-            obj = json.loads(text)
-            # if top-level has metadata fields
-            if isinstance(obj, dict):
-                # if there's a 'hospital_name' top-level key, extract it
-                if "hospital_name" in obj:
-                    meta = {normalize_colname(k): v for k, v in obj.items() if not isinstance(v, list)}
-                # find a list of records inside the JSON
-                for k, v in obj.items():
-                    if isinstance(v, list):
-                        df = pd.DataFrame(v)
-                        df.columns = [normalize_colname(c) for c in df.columns]
-                        if nrows:
-                            df = df.head(nrows)
-                        return df, meta
-                # fallback: wrap dict into single-row DataFrame
-                df = pd.json_normalize(obj)
-                df.columns = [normalize_colname(c) for c in df.columns]
-                if nrows:
-                    df = df.head(nrows)
-                return df, meta
-            elif isinstance(obj, list):
-                df = pd.DataFrame(obj)
-                df.columns = [normalize_colname(c) for c in df.columns]
-                if nrows:
-                    df = df.head(nrows)
-                return df, meta
-        except json.JSONDecodeError:
-            # maybe it's newline-delimited JSON
-            try:
-                df = pd.read_json(file_path, lines=True, nrows=nrows)
-                df.columns = [normalize_colname(c) for c in df.columns]
-                return df, meta
-            except Exception:
-                raise
+        # stream records instead of json.loads on the whole document; only the rows kept
+        # (up to nrows) are ever materialized
+        chunks, meta = iter_json_chunks(file_path, chunk_rows=nrows or DEFAULT_CHUNK_ROWS, nrows=nrows)
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return df, meta
 
     elif ext in {".xlsx", ".xls"}:
-        # use pandas.read_excel but try to detect header row similarly
-        # read first 10 rows as text with openpyxl to find header string
-        try:
-            import openpyxl
-            wb = openpyxl.load_workbook(file_path, read_only=True)
-            sheet = wb[wb.sheetnames[0]]
-            preview = []
-            header_row_idx = 0
-            for i, row in enumerate(sheet.iter_rows(max_row=25, max_col=50, values_only=True), start=1):
-                row_str = ",".join([str(c) if c is not None else "" for c in row])
-                preview.append(row_str)
-                if any(tok in row_str.lower() for tok in KNOWN_HEADER_TOKENS):
-                    header_row_idx = i - 1  # pandas skiprows expects 0-based
-                    break
-            meta = extract_metadata_from_lines(preview[: max(5, header_row_idx + 2)])
-            df = pd.read_excel(file_path, header=header_row_idx, nrows=nrows, engine="openpyxl", dtype=str)
-            df.columns = [normalize_colname(c) for c in df.columns]
-            return df, meta
-        except Exception:
-            # fallback to simple read
-            df = pd.read_excel(file_path, nrows=nrows, engine="openpyxl", dtype=str)
-            df.columns = [normalize_colname(c) for c in df.columns]
-            return df, meta
+        # one streaming pass over every sheet (no separate header-preview open)
+        chunks, meta = iter_excel_chunks(file_path, chunk_rows=nrows or DEFAULT_CHUNK_ROWS, nrows=nrows)
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return df, meta
     else:
         raise ValueError(f"Unsupported extension: {ext}")
+
+def _unpivot_if_wide(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize column names; a wide (per-payer column) frame is unpivoted to the tall layout first."""
+    plan = parse_wide_header(df.columns)
+    df.columns = [normalize_colname(c) for c in df.columns]
+    if plan is None:
+        return df
+    pieces = list(unpivot_frame(df, plan, max_rows=max(len(df), 1) * len(plan.groups)))
+    return pd.concat(pieces, ignore_index=True) if pieces else df.iloc[:0, list(plan.base)]
+
+def iter_csv_chunks(file_path: Path, sniff: CsvSniff, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    nrows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV in fixed-size row chunks using pandas' C parser, starting at the sniffed
+    header offset. Only one chunk is held in memory at a time; column names are normalized per chunk.
+    """
+    with _open_at(file_path, sniff.header_offset) as f, \
+            pd.read_csv(f, nrows=nrows, chunksize=chunk_rows, dtype=str, engine="c", **_csv_options(sniff)) as reader:
+        for chunk in reader:
+            chunk.columns = [normalize_colname(c) for c in chunk.columns]
+            yield chunk
+
+def iter_json_chunks(file_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     nrows: Optional[int] = None) -> Tuple[Iterator[pd.DataFrame], Dict]:
+    """
+    Stream a JSON file as DataFrame chunks of about chunk_rows rows. Returns (chunks, metadata).
+    CMS items (with standard_charges) are flattened to canonical rows; other records are
+    flattened with json_normalize. JSON Lines files are read with pandas' chunked reader.
+    """
+    if is_ndjson(file_path):
+        reader = pd.read_json(file_path, lines=True, chunksize=chunk_rows, nrows=nrows, dtype=False)
+
+        def _lines():
+            with reader:
+                for chunk in reader:
+                    chunk.columns = [normalize_colname(c) for c in chunk.columns]
+                    yield chunk
+        return _lines(), {}
+
+    records, top = open_json_records(file_path)
+    meta = {normalize_colname(k): v for k, v in mrf_metadata(top).items()}
+
+    def _chunks():
+        rows, total = [], 0
+        found = False
+        for rec in records:
+            found = True
+            rows.extend(flatten_mrf_item(rec) if isinstance(rec, dict) else [{"value": rec}])
+            if nrows and total + len(rows) >= nrows:
+                rows = rows[: nrows - total]
+                break
+            if len(rows) >= chunk_rows:
+                total += len(rows)
+                yield _records_frame(rows)
+                rows = []
+        records.close()
+        if rows:
+            yield _records_frame(rows)
+        elif not found and top:
+            # an object with no record array: one row, as pd.json_normalize would give
+            yield _records_frame([top])
+    return _chunks(), meta
+
+def _records_frame(rows: List[Dict]) -> pd.DataFrame:
+    df = pd.json_normalize(rows)
+    df.columns = [normalize_colname(c) for c in df.columns]
+    return df
+
+def _excel_value(v) -> Optional[str]:
+    """A cell value as read_excel(dtype=str) gives it: integral floats without '.0', '' as missing."""
+    if v is None or v.__class__ is str:
+        return v or None
+    if v.__class__ is float and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+def _csv_line(row: Tuple) -> str:
+    """A worksheet row as one CSV line (quoted, so addresses with commas survive metadata parsing)."""
+    cells = list(row)
+    while cells and cells[-1] is None:
+        cells.pop()
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["" if v is None else v for v in cells])
+    return buf.getvalue()
+
+def _excel_names(header: Tuple, width: int) -> List[str]:
+    """Normalized column names; blanks become unnamed_<i> and repeats get .1, .2 first, like read_excel."""
+    names, seen = [], {}
+    for j, c in enumerate(header[:width]):
+        name = str(c) if c is not None and str(c).strip() else f"Unnamed: {j}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(normalize_colname(name))
+    return names
+
+def iter_excel_chunks(file_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                      nrows: Optional[int] = None) -> Tuple[Iterator[pd.DataFrame], Dict]:
+    """
+    Stream every sheet of a workbook as DataFrame chunks in a single read-only pass.
+    Returns (chunks, metadata). Each sheet's header is detected from its first rows;
+    sheets after the first without a recognizable header (notes, legends) are skipped.
+    Metadata comes from the first sheet. Values are strings as with read_excel(dtype=str),
+    and wide sheets are unpivoted. nrows caps the data rows read across all sheets.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    sheets = iter(wb.worksheets)
+    first = next(sheets, None)
+    if first is None:
+        wb.close()
+        return iter([]), {}
+    rows = first.iter_rows(values_only=True)
+    preview = list(islice(rows, EXCEL_PREVIEW_ROWS))
+    lines = [_csv_line(r) for r in preview]
+    header_idx = header_token_index(lines)
+    header_idx = 0 if header_idx is None else header_idx
+    meta = extract_metadata_from_lines(lines[: max(5, header_idx + 2)]) if len(lines) > 1 else {}
+    remaining = nrows
+
+    def _frames(data: Iterator[Tuple], names: List[str], width: int, source_rows: int) -> Iterator[pd.DataFrame]:
+        nonlocal remaining
+        pad = (None,) * width
+        data = (r for r in data if any(v is not None and v != "" for v in r))
+        while remaining is None or remaining > 0:
+            block = list(islice(data, source_rows if remaining is None else min(source_rows, remaining)))
+            if not block:
+                return
+            if remaining is not None:
+                remaining -= len(block)
+            yield pd.DataFrame([[_excel_value(v) for v in (r + pad)[:width]] for r in block], columns=names)
+
+    def _sheet(preview: List[Tuple], rows: Iterator[Tuple], header_idx: int) -> Iterator[pd.DataFrame]:
+        header = preview[header_idx]
+        width = max((j + 1 for j, c in enumerate(header) if c is not None), default=0)
+        names = _excel_names(header, width)
+        plan = parse_wide_header(["" if c is None else str(c) for c in header[:width]])
+        data = chain(preview[header_idx + 1:], rows)
+        if plan is None:
+            yield from _frames(data, names, width, chunk_rows)
+        else:
+            # as for CSV: fewer source rows per chunk so a chunk x payers stays near chunk_rows
+            source_rows = max(100, chunk_rows // len(plan.groups))
+            yield from unpivot_frames(_frames(data, names, width, source_rows), plan, max_rows=chunk_rows)
+
+    def _chunks():
+        try:
+            if preview:
+                yield from _sheet(preview, rows, header_idx)
+            for ws in sheets:
+                if remaining is not None and remaining <= 0:
+                    break
+                ws_rows = ws.iter_rows(values_only=True)
+                ws_preview = list(islice(ws_rows, EXCEL_PREVIEW_ROWS))
+                idx = header_token_index([_csv_line(r) for r in ws_preview])
+                if idx is not None:
+                    yield from _sheet(ws_preview, ws_rows, idx)
+        finally:
+            wb.close()
+    return _chunks(), meta
+
+def read_generic_chunks(file_path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        nrows: Optional[int] = None) -> Tuple[Iterator[pd.DataFrame], Dict]:
+    """
+    Streaming variant of read_generic. Returns (iterator of DataFrame chunks, metadata).
+    CSV/TXT, JSON and Excel files are read chunk by chunk with bounded memory.
+    """
+    ext = file_path.suffix.lower()
+    size = 0 if nrows else file_path.stat().st_size
+    if ext in {".csv", ".txt"}:
+        sniff = sniff_csv(file_path)
+        meta = extract_metadata_from_lines(sniff.metadata_lines, sniff.delimiter)
+        plan = parse_wide_header(sniff.header)
+        if plan is None:
+            chunks = iter_csv_chunks(file_path, sniff, chunk_rows=chunk_rows, nrows=nrows)
+        else:
+            # wide files: read fewer source rows per chunk so a chunk x payers stays near chunk_rows
+            source_rows = max(100, chunk_rows // len(plan.groups))
+            chunks = unpivot_frames(iter_csv_chunks(file_path, sniff, chunk_rows=source_rows, nrows=nrows),
+                                    plan, max_rows=chunk_rows)
+        return timed_iter("parse", chunks, bytes_read=size), meta
+    if ext == ".json":
+        chunks, meta = iter_json_chunks(file_path, chunk_rows=chunk_rows, nrows=nrows)
+        return timed_iter("parse", chunks, bytes_read=size), meta
+    if ext in {".xlsx", ".xls"}:
+        chunks, meta = iter_excel_chunks(file_path, chunk_rows=chunk_rows, nrows=nrows)
+        return timed_iter("parse", chunks, bytes_read=size), meta
+    raise ValueError(f"Unsupported extension: {ext}")
+
+def file_sha256(file_path: Path, block_size: int = 1 << 20) -> str:
+    """Hex SHA-256 of a file's contents, read in blocks so large files aren't loaded whole."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()